@@ -0,0 +1,322 @@
+"""
+Offline micro-benchmarks for the client hot paths.
+
+Run with `python -m benchmarks.run`, results are written as json and can be compared against a stored baseline:
+
+    python -m benchmarks.run --output bench.json --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.25
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from decimal import Decimal
+from importlib import metadata
+from typing import Any, Callable, Dict, List
+
+import respx
+from httpx import Response
+
+from hundred_x.async_client import AsyncHundredXClient
+from hundred_x.client import HundredXClient
+from hundred_x.constants import LOGIN_MESSAGE, REFERRAL_CODE
+from hundred_x.eip_712 import CancelOrder, CancelOrders, LoginMessage, Order, Referral, Withdraw
+from hundred_x.enums import Environment, LoginMode, OrderSide, OrderType, TimeInForce
+from hundred_x.fixed_point import WEI, ladder_to_units, to_wei
+from hundred_x.metrics import Histogram, Metrics
+from hundred_x.models import Position
+from hundred_x.transport import Transport
+from hundred_x.utils import from_message_to_payload
+
+IMPORT_TIMER = "import time; start = time.perf_counter_ns(); import {module}; print(time.perf_counter_ns() - start)"
+
+PRIVATE_KEY = "0x8f58e47491ac5fe6897216208fe1fed316d6ee89de6c901bfc521c2178ebe6dd"
+ACCOUNT = "0xEEF7faba495b4875d67E3ED8FB3a32433d3DB3b3"
+TIMESTAMP = 1711722373
+
+ORDER = {
+    "subaccount_id": 0,
+    "product_id": 1002,
+    "quantity": 0.25,
+    "price": 3000.13,
+    "side": OrderSide.BUY,
+    "order_type": OrderType.LIMIT,
+    "time_in_force": TimeInForce.GTC,
+}
+
+PRODUCTS = [
+    {
+        "id": 1002,
+        "symbol": "ethperp",
+        "increment": str(10**16),
+        "quantityIncrement": str(10**15),
+        "minQuantity": str(10**15),
+    }
+]
+
+LADDER = [[str((3000 * 100 - level) * WEI // 100), str((level % 7 + 1) * WEI // 10)] for level in range(500)]
+
+POSITIONS = [
+    {
+        "account": ACCOUNT,
+        "subAccountId": 0,
+        "productId": 1002,
+        "productSymbol": "ethperp",
+        "quantity": str(index * WEI // 10),
+        "avgEntryPrice": str(3000 * WEI),
+    }
+    for index in range(1000)
+]
+
+REPLACE_ORDER = {
+    "product_id": 1002,
+    "quantity": 0.25,
+    "price": 3000.13,
+    "side": OrderSide.BUY,
+    "order_id_to_cancel": "0x01",
+}
+
+MESSAGES = {
+    Order: {
+        "subAccountId": 0,
+        "productId": 1002,
+        "isBuy": True,
+        "orderType": 0,
+        "timeInForce": 0,
+        "expiration": (TIMESTAMP + 1000 * 60 * 60 * 24) * 1000,
+        "price": 3000 * 10**18,
+        "quantity": 10**18,
+        "nonce": TIMESTAMP,
+    },
+    CancelOrder: {"subAccountId": 0, "productId": 1002, "orderId": "0x01"},
+    CancelOrders: {"subAccountId": 0, "productId": 1002},
+    Withdraw: {"subAccountId": 0, "asset": ACCOUNT, "quantity": 10**20, "nonce": TIMESTAMP},
+    LoginMessage: {"message": LOGIN_MESSAGE, "timestamp": TIMESTAMP},
+    Referral: {"code": REFERRAL_CODE},
+}
+
+
+class StaticResponse:
+    """
+    Canned successful response.
+    """
+
+    status_code = 200
+    text = "{}"
+
+    def json(self):
+        return {"value": "session"}
+
+
+class StaticTransport(Transport):
+    """
+    Transport answering every request without touching the network.
+    """
+
+    def request(self, method, url, params=None, headers=None, json=None, timeout=None):
+        return StaticResponse()
+
+
+def measure(function: Callable[[], Any], iterations: int, warmup: int) -> Dict[str, float]:
+    """
+    Time each call of a function, returning statistics in microseconds.
+    """
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        function()
+        samples.append(time.perf_counter_ns() - start)
+    return summarise(samples)
+
+
+def measure_async(function: Callable[[], Any], iterations: int, warmup: int) -> Dict[str, float]:
+    """
+    Time each awaited call of a coroutine function, returning statistics in microseconds.
+    """
+
+    async def _run():
+        for _ in range(warmup):
+            await function()
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter_ns()
+            await function()
+            samples.append(time.perf_counter_ns() - start)
+        return samples
+
+    return summarise(asyncio.run(_run()))
+
+
+def summarise(samples: List[int]) -> Dict[str, float]:
+    samples = sorted(sample / 1000 for sample in samples)
+    return {
+        "iterations": len(samples),
+        "min_us": samples[0],
+        "median_us": statistics.median(samples),
+        "mean_us": statistics.fmean(samples),
+        "p95_us": samples[min(int(len(samples) * 0.95), len(samples) - 1)],
+        "max_us": samples[-1],
+    }
+
+
+def sync_benchmarks(iterations: int, warmup: int) -> Dict[str, Dict[str, float]]:
+    client = HundredXClient(Environment.PROD, PRIVATE_KEY, transport=StaticTransport())
+    client.products.load(PRODUCTS)
+    results = {}
+    for message_class, values in MESSAGES.items():
+        values = {**values, **client.get_shared_params()}
+        results[f"sign_{message_class.__name__}"] = measure(
+            lambda: client.generate_and_sign_message(message_class, **values), iterations, warmup
+        )
+    signed = client.generate_and_sign_message(Order, **MESSAGES[Order], **client.get_shared_params())
+    results["from_message_to_payload"] = measure(lambda: from_message_to_payload(dict(signed)), iterations, warmup)
+    results["decimal_scaling"] = measure(
+        lambda: (
+            int(Decimal(str(ORDER["quantity"])) * Decimal(1e18)),
+            int(Decimal(str(ORDER["price"])) * Decimal(1e18)),
+        ),
+        iterations,
+        warmup,
+    )
+    results["fixed_point_scaling"] = measure(
+        lambda: (to_wei(ORDER["quantity"]), to_wei(ORDER["price"])), iterations, warmup
+    )
+    results["decimal_ladder_500"] = measure(
+        lambda: [(Decimal(price) / WEI, Decimal(quantity) / WEI) for price, quantity in LADDER], iterations, warmup
+    )
+    results["fixed_point_ladder_500"] = measure(lambda: ladder_to_units(LADDER), iterations, warmup)
+    results["position_models_1000"] = measure(lambda: Position.from_list(POSITIONS), iterations, warmup)
+    results["order_params"] = measure(lambda: client._order_params(**ORDER), iterations, warmup)
+    product = client.products.get(ORDER["product_id"])
+    params = client._order_params(**ORDER, ts=TIMESTAMP)
+    results["validate_order"] = measure(
+        lambda: client.validator.validate(dict(params), product, now=TIMESTAMP), iterations, warmup
+    )
+    results["validate_function"] = measure(lambda: client._validate_function("/v1/order"), iterations, warmup)
+    results["sync_create_order"] = measure(lambda: client.create_order(**ORDER), iterations, warmup)
+    results["sync_cancel_and_replace_order"] = measure(
+        lambda: client.cancel_and_replace_order(**REPLACE_ORDER), iterations, warmup
+    )
+    histogram = Histogram()
+    results["histogram_record"] = measure(lambda: histogram.record(123_456), iterations, warmup)
+    instrumented = HundredXClient(Environment.PROD, PRIVATE_KEY, transport=StaticTransport(), metrics=Metrics())
+    instrumented.products.load(PRODUCTS)
+    results["sync_create_order_instrumented"] = measure(lambda: instrumented.create_order(**ORDER), iterations, warmup)
+    return results
+
+
+def async_benchmarks(iterations: int, warmup: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    with respx.mock(assert_all_called=False) as router:
+        client = AsyncHundredXClient(Environment.PROD, PRIVATE_KEY)
+        try:
+            client.session_cookie = "session"
+            router.get(f"{client.rest_url}/v1/products").mock(return_value=Response(200, json=PRODUCTS))
+            router.post(f"{client.rest_url}/v1/order").mock(return_value=Response(200, json={}))
+            router.post(f"{client.rest_url}/v1/order/cancel-and-replace").mock(return_value=Response(200, json={}))
+            results["async_create_order"] = measure_async(lambda: client.create_order(**ORDER), iterations, warmup)
+            results["async_cancel_and_replace_order"] = measure_async(
+                lambda: client.cancel_and_replace_order(**REPLACE_ORDER), iterations, warmup
+            )
+        finally:
+            asyncio.run(client.aclose())
+    return results
+
+
+def startup_benchmarks(iterations: int, warmup: int, import_iterations: int) -> Dict[str, Dict[str, float]]:
+    """
+    Time the import of the clients in fresh interpreters and the construction of a client.
+    """
+    results = {}
+    for module in ("hundred_x.client", "hundred_x.async_client"):
+        command = [sys.executable, "-c", IMPORT_TIMER.format(module=module)]
+        samples = [int(subprocess.check_output(command)) for _ in range(import_iterations)]
+        results[f"import_{module.split('.')[-1]}"] = summarise(samples)
+    results["construct_client_lazy"] = measure(
+        lambda: HundredXClient(Environment.PROD, PRIVATE_KEY, transport=StaticTransport(), login_mode=LoginMode.LAZY),
+        iterations,
+        warmup,
+    )
+    return results
+
+
+def run(iterations: int, warmup: int, import_iterations: int = 5) -> Dict[str, Any]:
+    """
+    Run every benchmark, returning the results along with the environment they were taken in.
+    """
+    try:
+        version = metadata.version("hundred-x")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+    return {
+        "meta": {
+            "hundred_x": version,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": int(time.time()),
+            "iterations": iterations,
+        },
+        "results": {
+            **startup_benchmarks(iterations, warmup, import_iterations),
+            **sync_benchmarks(iterations, warmup),
+            **async_benchmarks(iterations, warmup),
+        },
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compare median latencies against a baseline, returning the benchmarks that regressed.
+    """
+    regressions = []
+    for name, stats in sorted(results["results"].items()):
+        reference = baseline["results"].get(name)
+        if reference is None:
+            print(f"{name:<36} {stats['median_us']:>12.1f}us  (no baseline)")
+            continue
+        ratio = stats["median_us"] / reference["median_us"]
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{name:<36} {stats['median_us']:>12.1f}us  {reference['median_us']:>12.1f}us  {ratio:>6.2f}x {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--import-iterations", type=int, default=5, help="Fresh interpreters timed per import.")
+    parser.add_argument("--output", help="Write the results to this json file.")
+    parser.add_argument("--baseline", help="Compare the results against this json file.")
+    parser.add_argument("--save-baseline", help="Write the results as a new baseline to this json file.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown of the median, 0.25 = 25%%.")
+    args = parser.parse_args(argv)
+
+    results = run(args.iterations, args.warmup, args.import_iterations)
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+        return 0
+
+    for name, stats in sorted(results["results"].items()):
+        print(f"{name:<36} median {stats['median_us']:>10.1f}us  p95 {stats['p95_us']:>10.1f}us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,7 @@ from pprint import pprint
 
 from hundred_x.async_client import AsyncHundredXClient
 from hundred_x.enums import Environment, OrderSide, OrderType, TimeInForce
+from hundred_x.fixed_point import to_float
 
 
 async def main():
@@ -16,7 +17,7 @@ async def main():
     if not key:
         raise ValueError("HUNDRED_X_PRIVATE_KEY environment variable is not set.")
 
-    client = AsyncHundredXClient(Environment.PROD, key, subaccount_id=subaccount_id)
+    client = await AsyncHundredXClient.create(Environment.PROD, key, subaccount_id=subaccount_id)
 
     print(f"Using Wallet: {client.public_key}")
     print(f"Using Subaccount ID: {client.subaccount_id}")
@@ -36,12 +37,12 @@ async def main():
         if int(position['quantity']) > 0:
             # We close the position.
 
-            pos_size = int(position['quantity']) / 1e18
-            pos_price = int(int(position['avgEntryPrice']) / 1e18)
+            pos_size = to_float(position['quantity'])
+            pos_price = int(to_float(position['avgEntryPrice']))
             prices = await client.get_symbol(
                 symbol=position['productSymbol']
             )  # This is the product_id for the symbol 'btcperp
-            exit_price = int(int(prices['markPrice']) / 1e18)
+            exit_price = int(to_float(prices['markPrice']))
 
             print(
                 f"Closing pos {position['productSymbol']} with size {pos_size} at {pos_price} with price {exit_price}"
@@ -49,7 +50,7 @@ async def main():
 
             response = await client.create_order(
                 subaccount_id=subaccount_id,
-                product_id=position['productId'],
+                product_id=position['productSymbol'],
                 quantity=pos_size,
                 side=OrderSide.SELL,
                 price=exit_price,
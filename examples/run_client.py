@@ -8,6 +8,7 @@ from pprint import pprint
 
 from hundred_x.async_client import AsyncHundredXClient
 from hundred_x.enums import Environment, OrderSide, OrderType, TimeInForce
+from hundred_x.fixed_point import to_float
 
 
 async def main():
@@ -17,7 +18,7 @@ async def main():
     if not key:
         raise ValueError("HUNDRED_X_PRIVATE_KEY environment variable is not set.")
 
-    client = AsyncHundredXClient(Environment.PROD, key, subaccount_id=subaccount_id)
+    client = await AsyncHundredXClient.create(Environment.PROD, key, subaccount_id=subaccount_id)
 
     print(f"Using Wallet: {client.public_key}")
     print(f"Using Subaccount ID: {client.subaccount_id}")
@@ -39,7 +40,7 @@ async def main():
         subaccount_id=subaccount_id,
         product_id=response['productId'],  # This is the product_id for the symbol 'btcperp
         quantity=0.0001,
-        price=round(int(response['markPrice']) * 0.99 / 1e18),  # This is the current price of the symbol 'btcperp'
+        price=round(to_float(response['markPrice']) * 0.99),  # This is the current price of the symbol 'btcperp'
         side=OrderSide.BUY,
         order_type=OrderType.LIMIT,
         time_in_force=TimeInForce.GTC,
@@ -73,7 +74,7 @@ async def main():
         subaccount_id=subaccount_id,
         product_id=response[0]["productId"],
         quantity=0.001,
-        price=round(int(response[0]["price"]) * 0.99 / 1e18),
+        price=round(to_float(response[0]["price"]) * 0.99),
         side=OrderSide.BUY,
         order_type=OrderType.LIMIT,
         time_in_force=TimeInForce.GTC,
@@ -90,7 +91,7 @@ async def main():
         order_id_to_cancel=response[0]["id"],
         product_id=response[0]["productId"],
         quantity=0.002,
-        price=round(int(response[0]["price"]) * 0.99 / 1e18),
+        price=round(to_float(response[0]["price"]) * 0.99),
         side=OrderSide.BUY,
     )
     pprint(response)
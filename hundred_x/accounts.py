@@ -0,0 +1,186 @@
+"""
+Several subaccounts of one wallet over one client.
+
+A wallet logs in once for all its subaccounts, so one client, with one session and one pooled transport, serves
+every subaccount: the account reads take a `subaccount_id` and the signed messages carry theirs. An
+`AccountManager` hands out per subaccount views of that client and runs the reads of all its subaccounts
+concurrently, merging the rows they return into one `AccountTable` tagged by subaccount.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from hundred_x.batch import DEFAULT_MAX_IN_FLIGHT
+from hundred_x.exceptions import UserInputValidationError
+from hundred_x.models import Model
+
+
+class AccountTable(list):
+    """
+    Rows returned for several subaccounts as dicts with their `subAccountId`, and the errors by subaccount.
+    """
+
+    def __init__(self, rows: Iterable[Dict[str, Any]] = (), errors: Dict[int, Exception] = None):
+        super().__init__(rows)
+        self.errors = errors or {}
+
+    @classmethod
+    def from_outcomes(cls, outcomes: Dict[int, Tuple[Any, Optional[Exception]]]) -> "AccountTable":
+        """
+        Merge the (response, error) of the read of each subaccount.
+        """
+        table = cls()
+        for subaccount_id, (response, error) in outcomes.items():
+            if error is not None:
+                table.errors[subaccount_id] = error
+                continue
+            for item in response if isinstance(response, list) else [response]:
+                row = item.to_dict() if isinstance(item, Model) else dict(item)
+                if row.get("subAccountId") is None:
+                    row["subAccountId"] = subaccount_id
+                table.append(row)
+        return table
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def by_subaccount(self) -> Dict[int, List[Dict[str, Any]]]:
+        grouped: Dict[int, List[Dict[str, Any]]] = {}
+        for row in self:
+            grouped.setdefault(row["subAccountId"], []).append(row)
+        return grouped
+
+
+def _outcome(read: Callable[["SubaccountView"], Any], view: "SubaccountView") -> Tuple[Any, Optional[Exception]]:
+    try:
+        return read(view), None
+    except Exception as error:  # pylint: disable=broad-except
+        return None, error
+
+
+class SubaccountView:
+    """
+    The account methods of a client bound to one of its subaccounts.
+    """
+
+    def __init__(self, client, subaccount_id: int):
+        self.client = client
+        self.subaccount_id = subaccount_id
+
+    def __repr__(self) -> str:
+        return f"SubaccountView({self.client.public_key}, {self.subaccount_id})"
+
+    def get_position(self, symbol: str = None):
+        return self.client.get_position(symbol, subaccount_id=self.subaccount_id)
+
+    def get_spot_balances(self):
+        return self.client.get_spot_balances(subaccount_id=self.subaccount_id)
+
+    def get_open_orders(self, symbol: str = None):
+        return self.client.get_open_orders(symbol, subaccount_id=self.subaccount_id)
+
+    def get_orders(self, symbol: str = None, ids: List[str] = None):
+        return self.client.get_orders(symbol, ids, subaccount_id=self.subaccount_id)
+
+    def get_approved_signers(self):
+        return self.client.get_approved_signers(subaccount_id=self.subaccount_id)
+
+    def create_order(self, *args, **kwargs):
+        return self.client.create_order(self.subaccount_id, *args, **kwargs)
+
+    def cancel_order(self, product_id, order_id):
+        return self.client.cancel_order(product_id, order_id, subaccount_id=self.subaccount_id)
+
+    def cancel_and_replace_order(self, *args, **kwargs):
+        return self.client.cancel_and_replace_order(*args, subaccount_id=self.subaccount_id, **kwargs)
+
+    def cancel_all_orders(self, product_id):
+        return self.client.cancel_all_orders(self.subaccount_id, product_id)
+
+    def withdraw(self, quantity: int, asset: str = "USDB"):
+        return self.client.withdraw(self.subaccount_id, quantity, asset)
+
+    def deposit(self, quantity: int, asset: str = "USDB"):
+        return self.client.deposit(self.subaccount_id, quantity, asset)
+
+
+class AccountManager:
+    """
+    Views of the subaccounts of a client and reads across all of them, at most `max_in_flight` at a time.
+    """
+
+    def __init__(self, client, subaccount_ids: Iterable[int], max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.views: Dict[int, SubaccountView] = {}
+        for subaccount_id in subaccount_ids:
+            if not 0 <= subaccount_id <= 255:
+                raise UserInputValidationError(
+                    f"Subaccount ID must be between 0 and 255. It is instead: {subaccount_id}"
+                )
+            self.views[subaccount_id] = SubaccountView(client, subaccount_id)
+
+    @property
+    def subaccount_ids(self) -> List[int]:
+        return list(self.views)
+
+    def __getitem__(self, subaccount_id: int) -> SubaccountView:
+        return self.views[subaccount_id]
+
+    def __iter__(self):
+        return iter(self.views.values())
+
+    def __len__(self) -> int:
+        return len(self.views)
+
+    def fan_out(self, read: Callable[[SubaccountView], Any]) -> AccountTable:
+        """
+        Run a read on every subaccount concurrently and merge the rows.
+        """
+        views = list(self.views.values())
+        if len(views) < 2 or self.max_in_flight < 2:
+            outcomes = [_outcome(read, view) for view in views]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(views))) as executor:
+                outcomes = list(executor.map(partial(_outcome, read), views))
+        return AccountTable.from_outcomes(dict(zip(self.views, outcomes)))
+
+    def positions(self, symbol: str = None) -> AccountTable:
+        return self.fan_out(lambda view: view.get_position(symbol))
+
+    def balances(self) -> AccountTable:
+        return self.fan_out(lambda view: view.get_spot_balances())
+
+    def open_orders(self, symbol: str = None) -> AccountTable:
+        return self.fan_out(lambda view: view.get_open_orders(symbol))
+
+
+class AsyncAccountManager(AccountManager):
+    """
+    Account manager of an async client, the reads run as tasks on the event loop.
+    """
+
+    async def fan_out(self, read: Callable[[SubaccountView], Any]) -> AccountTable:
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        async def _read(view: SubaccountView) -> Tuple[Any, Optional[Exception]]:
+            async with semaphore:
+                try:
+                    return await read(view), None
+                except Exception as error:  # pylint: disable=broad-except
+                    return None, error
+
+        outcomes = await asyncio.gather(*(_read(view) for view in self.views.values()))
+        return AccountTable.from_outcomes(dict(zip(self.views, outcomes)))
+
+    async def positions(self, symbol: str = None) -> AccountTable:
+        return await self.fan_out(lambda view: view.get_position(symbol))
+
+    async def balances(self) -> AccountTable:
+        return await self.fan_out(lambda view: view.get_spot_balances())
+
+    async def open_orders(self, symbol: str = None) -> AccountTable:
+        return await self.fan_out(lambda view: view.get_open_orders(symbol))
@@ -2,36 +2,267 @@
 Async client for the HundredX API
 """
 
-from typing import Any
-
-import httpx
+import asyncio
+import logging
+import time
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List
 
+from hundred_x import models
+from hundred_x.accounts import AsyncAccountManager
+from hundred_x.batch import DEFAULT_MAX_IN_FLIGHT, BatchResult, dispatch_async, merge_failures
 from hundred_x.client import HundredXClient
+from hundred_x.clock import AsyncClockSync
+from hundred_x.enums import OrderSide, OrderType, TimeInForce
 from hundred_x.exceptions import ClientError
+from hundred_x.fixed_point import to_wei
+from hundred_x.history import AsyncKlineHistory
+from hundred_x.metrics import ERROR, PHASE, REQUEST
+from hundred_x.order_book import OrderBook
+from hundred_x.policy import RequestPolicy
+from hundred_x.products import ProductKey, ProductRegistry
+from hundred_x.tape import AsyncTradeTape
+from hundred_x.transport import AsyncTransport, HttpxTransport
 from hundred_x.utils import from_message_to_payload
 
+if TYPE_CHECKING:
+    from hundred_x.streams import AsyncStreamClient
+
+logger = logging.getLogger(__name__)
+
 
 class AsyncHundredXClient(HundredXClient):
     """
     Asynchronous client for the HundredX API.
+
+    All requests share one long-lived async transport, close it with `aclose()` or use the client
+    as an async context manager. No blocking i/o happens on the event loop: the session is opened by
+    `create()`, or on the first private request, and on-chain calls run in worker threads.
     """
 
+    async_transport_class = HttpxTransport
+    # every request goes through the async transport, a sync one is only kept when given
+    transport_class = None
+
+    def __init__(self, *args, async_transport: AsyncTransport = None, **kwargs):
+        self.async_transport = async_transport if async_transport is not None else self.async_transport_class()
+        self._login_lock = None
+        super().__init__(*args, **kwargs)
+        # the catalogue is refreshed with `await refresh_products()`, see `_ensure_products`
+        self.products.loader = None
+
+    @classmethod
+    async def create(cls, *args, **kwargs) -> "AsyncHundredXClient":
+        """
+        Create a client and open its session with the exchange.
+        """
+        client = cls(*args, **kwargs)
+        if client.signer is not None:
+            await client._ensure_session()
+        return client
+
+    def _start_session(self):
+        """
+        The session is opened by `create()` or lazily by the first private request.
+        """
+
+    async def _ensure_session(self):
+        if self.session_cookie:
+            return
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        async with self._login_lock:
+            if not self.session_cookie:
+                await self._open_session()
+
+    async def _open_session(self):
+        """
+        Login and register the referral code, unless a stored session is still valid.
+        """
+        if await self._resume_session():
+            return
+        await self.login()
+        try:
+            await self.set_referral_code()
+        except Exception:  # pylint: disable=broad-except
+            pass
+        await asyncio.to_thread(self.save_state)
+
+    async def _resume_session(self) -> bool:
+        """
+        Reuse the stored session cookie if the exchange still accepts it.
+        """
+        if not self.state.session_valid():
+            return False
+        self.session_cookie = self.state.session_cookie
+        try:
+            response = await self.async_transport.request(
+                "GET", self.rest_url + "/v1/session/status", headers=self.authenticated_headers
+            )
+            if response.status_code == 200:
+                return True
+        except Exception:  # pylint: disable=broad-except
+            pass
+        self.session_cookie = {}
+        self.state.session_cookie = None
+        return False
+
+    async def _ensure_products(self, *keys: ProductKey, rules: bool = False):
+        """
+        Refresh a stale product catalogue before symbols are resolved, or before orders are checked with rules.
+        """
+        symbols = any(isinstance(key, str) for key in keys)
+        if not (rules or symbols) or not self.products.stale:
+            return
+        try:
+            await self.refresh_products()
+        except Exception:  # pylint: disable=broad-except
+            # keep checking against a stale catalogue, or skip the rules without one, rather than failing the order
+            if not self.products.loaded:
+                if symbols:
+                    raise
+                logger.warning("Product catalogue unavailable, skipping the product rules", exc_info=True)
+
+    async def refresh_products(self) -> ProductRegistry:
+        """
+        Reload the product catalogue.
+        """
+        await self.list_products()
+        return self.products
+
+    async def aclose(self):
+        """
+        Save the state, close the connections held by the transports and the shared nonce counter.
+        """
+        if self.clock is not None:
+            await self.clock.stop()
+        await asyncio.to_thread(self.save_state)
+        self.nonces.close()
+        self.policies.close()
+        await self.async_transport.aclose()
+        if self.transport is not None:
+            self.transport.close()
+
+    async def __aenter__(self):
+        await self.async_transport.warm_up(self.rest_url + "/v1/time")
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def create_authenticated_session_with_service(self):
+        response = await self.async_transport.request(
+            "POST",
+            self.rest_url + "/v1/session/login",
+            json=self._login_message(),
+        )
+        response = response.json()
+        self._session_opened(response.get("value"))
+        return response
+
+    async def login(self):
+        """
+        Login to the exchange.
+        """
+        response = await self.create_authenticated_session_with_service()
+        if response is None:
+            raise Exception("Failed to login")
+
+    async def set_referral_code(self):
+        """
+        Ensure sign a referral code.
+        """
+        if self.state.referred:
+            return
+        try:
+            response = await self.async_transport.request(
+                "POST",
+                self.rest_url + "/v1/referral/add-referee",
+                headers=self.authenticated_headers,
+                json=self._referral_message(),
+            )
+        except Exception as e:
+            if "user already referred" in str(e):
+                self.state.referred = True
+                return
+            raise e
+        self._record_referral(response)
+
+    async def get_session_status(self):
+        """
+        Get the current session status.
+        """
+        return await super().get_session_status()
+
+    async def logout(self):
+        """
+        Logout from the exchange.
+        """
+        return await super().logout()
+
+    async def list_products(self) -> List[Any]:
+        """
+        Get a list of all available products.
+        """
+        return self._products_loaded(await self.send_message_to_endpoint("/v1/products", "GET"))
+
+    async def get_product(self, product_symbol: str) -> Any:
+        """
+        Get the details of a specific product.
+        """
+        return await super().get_product(product_symbol)
+
+    async def get_server_time(self) -> Any:
+        """
+        Get the server time.
+        """
+        return await super().get_server_time()
+
+    async def sync_clock(self) -> float:
+        """
+        Measure the offset of the server clock, applied to every timestamp and nonce the client generates.
+        """
+        sent = time.time()
+        response = await self._sample_server_time()
+        return self._clock_offset_from(response, sent, time.time())
+
+    async def _sample_server_time(self) -> Any:
+        return await super()._sample_server_time()
+
+    def start_clock_sync(self, **kwargs) -> AsyncClockSync:
+        """
+        Keep the clock offset in sync with the server from a task on the running loop, stopped by `aclose()`.
+        """
+        if self.clock is None:
+            self.clock = AsyncClockSync(self, **kwargs)
+        return self.clock.start()
+
+    async def get_candlestick(self, symbol: str, **kwargs) -> Any:
+        """
+        Get the candlestick data for a specific product.
+        """
+        return await super().get_candlestick(symbol, **kwargs)
+
     async def get_symbol(self, symbol: str = None):
         """
         Get the symbol infos.
         If symbol is None, return all symbols.
         """
-        response = await super().get_symbol(symbol)
-        if symbol:
-            return response[0]
-        else:
-            return response
+        response = await self.send_message_to_endpoint(
+            endpoint="/v1/ticker/24hr",
+            method="GET",
+            message={},
+            params={"symbol": symbol} if symbol else {},
+        )
+        if symbol and isinstance(response, list):
+            return self._typed(models.Ticker, response[0])
+        return self._typed(models.Ticker, response)
 
     async def get_depth(self, symbol: str, **kwargs) -> Any:
         """
         Get the depth for a specific symbol.
         """
-        return await super().get_depth(symbol, **kwargs)
+        return self._typed(models.Depth, await self._fetch_depth(symbol, **kwargs))
 
     async def get_trade_history(self, symbol: str, lookback: int = 10, **kwargs) -> Any:
         """
@@ -40,71 +271,257 @@ class AsyncHundredXClient(HundredXClient):
         """
         return await super().get_trade_history(symbol, lookback, **kwargs)
 
-    async def get_position(self, symbol: str = None):
+    async def get_position(self, symbol: str = None, subaccount_id: int = None):
         """
         Get the position for a specific symbol.
         """
-        return await super().get_position(symbol)
+        return self._typed(models.Position, await self._fetch_position(symbol, subaccount_id))
 
-    async def get_spot_balances(self):
+    async def get_spot_balances(self, subaccount_id: int = None):
         """
         Get the spot balances.
         """
-        return await super().get_spot_balances()
+        return self._typed(models.Balance, await self._fetch_spot_balances(subaccount_id))
 
-    async def get_open_orders(self, symbol: str = None):
+    async def get_open_orders(self, symbol: str = None, subaccount_id: int = None):
         """
         Get the open orders for a specific symbol.
         """
-        return await super().get_open_orders(symbol)
+        return self._typed(models.Order, await self._fetch_open_orders(symbol, subaccount_id))
+
+    async def get_orders(self, symbol: str = None, ids: List[str] = None, subaccount_id: int = None):
+        """
+        Get the orders.
+        """
+        return self._typed(models.Order, await self._fetch_orders(symbol, ids, subaccount_id))
+
+    async def get_approved_signers(self, subaccount_id: int = None):
+        """
+        Get the approved signers.
+        """
+        return await super().get_approved_signers(subaccount_id)
+
+    async def withdraw(self, subaccount_id: int, quantity: int, asset: str = "USDB"):
+        """
+        Withdraw an asset.
+        """
+        return await super().withdraw(subaccount_id, quantity, asset)
+
+    async def deposit(self, subaccount_id: int, quantity: int, asset: str = "USDB"):
+        """
+        Deposit an asset, running the blocking on-chain calls in worker threads.
+        """
+        required_wei = to_wei(quantity)
+        txn = await asyncio.to_thread(
+            self._timed_phase, "build_transaction", self._build_approval_transaction, asset, required_wei
+        )
+        if txn is not None:
+            await self.wait_for_transaction(
+                await asyncio.to_thread(self._timed_phase, "send_transaction", self._send_transaction, txn)
+            )
+        txn = await asyncio.to_thread(
+            self._timed_phase, "build_transaction", self._build_deposit_transaction, subaccount_id, asset, required_wei
+        )
+        return await self.wait_for_transaction(
+            await asyncio.to_thread(self._timed_phase, "send_transaction", self._send_transaction, txn)
+        )
+
+    async def wait_for_transaction(self, txn_hash, timeout=60):
+        started = time.perf_counter_ns()
+        while True:
+            if timeout == 0:
+                raise Exception("Timeout")
+            receipt = await asyncio.to_thread(self._timed_phase, "receipt", self._get_transaction_receipt, txn_hash)
+            if receipt is not None:
+                break
+            await asyncio.sleep(1)
+            timeout -= 1
+        if self.metrics is not None:
+            self.metrics.observe(PHASE, "confirm", time.perf_counter_ns() - started)
+        return receipt["status"] == 1
+
+    async def create_order(
+        self,
+        subaccount_id: int,
+        product_id: ProductKey,
+        quantity: int,
+        side: OrderSide,
+        order_type: OrderType,
+        time_in_force: TimeInForce,
+        price: int = None,
+        nonce: int = 0,
+    ):
+        """
+        Create and send order, the product is given by id or by symbol.
+        """
+        await self._ensure_products(product_id, rules=True)
+        return await super().create_order(
+            subaccount_id, product_id, quantity, side, order_type, time_in_force, price=price, nonce=nonce
+        )
 
-    async def create_order(self, *args, **kwargs):
+    async def sign_orders(self, orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        Create and send order.
+        Sign a batch of orders without blocking the event loop.
         """
-        return await super().create_order(*args, **kwargs)
+        await self._ensure_products(*(order.get("product_id") for order in orders), rules=True)
+        return await asyncio.to_thread(super().sign_orders, orders)
 
-    async def cancel_order(self, *args, **kwargs):
+    async def create_orders(
+        self, orders: List[Dict[str, Any]], max_in_flight: int = DEFAULT_MAX_IN_FLIGHT
+    ) -> BatchResult:
+        """
+        Create a batch of orders concurrently, reporting failures per order.
+        """
+        await self._ensure_products(*(order.get("product_id") for order in orders), rules=True)
+        payloads, indexes, failed = await asyncio.to_thread(self._sign_order_batch, orders)
+        results = await dispatch_async(
+            partial(self.send_message_to_endpoint, "/v1/order", "POST"), payloads, max_in_flight
+        )
+        return merge_failures(results, indexes, failed)
+
+    async def cancel_orders(
+        self, cancels: List[Dict[str, Any]], max_in_flight: int = DEFAULT_MAX_IN_FLIGHT
+    ) -> BatchResult:
+        """
+        Cancel a batch of orders concurrently, reporting failures per order.
+        """
+        await self._ensure_products(*(cancel.get("product_id") for cancel in cancels))
+        messages, indexes, failed = await asyncio.to_thread(self._sign_cancel_batch, cancels)
+        results = await dispatch_async(
+            partial(self.send_message_to_endpoint, "/v1/order", "DELETE"), messages, max_in_flight
+        )
+        return merge_failures(results, indexes, failed)
+
+    async def cancel_and_replace_orders(
+        self, replacements: List[Dict[str, Any]], max_in_flight: int = DEFAULT_MAX_IN_FLIGHT
+    ) -> BatchResult:
+        """
+        Cancel and replace a batch of orders concurrently, reporting failures per order.
+        """
+        await self._ensure_products(*(replacement.get("product_id") for replacement in replacements), rules=True)
+        messages, indexes, failed = await asyncio.to_thread(self._sign_replacement_batch, replacements)
+        results = await dispatch_async(
+            partial(self.send_message_to_endpoint, "/v1/order/cancel-and-replace", "POST"), messages, max_in_flight
+        )
+        return merge_failures(results, indexes, failed)
+
+    async def cancel_order(self, product_id: ProductKey, order_id: str, subaccount_id: int = None):
         """
         Cancel an order.
         """
-        return await super().cancel_order(*args, **kwargs)
+        await self._ensure_products(product_id)
+        return await super().cancel_order(product_id, order_id, subaccount_id)
 
-    async def cancel_and_replace_order(self, *args, **kwargs):
+    async def cancel_and_replace_order(self, product_id: ProductKey, *args, **kwargs):
         """
         Cancel and replace an order.
         """
-        return await super().cancel_and_replace_order(*args, **kwargs)
+        await self._ensure_products(product_id, rules=True)
+        return await super().cancel_and_replace_order(product_id, *args, **kwargs)
 
-    async def cancel_all_orders(self, subaccount_id: int, product_id: int):
+    async def cancel_all_orders(self, subaccount_id: int, product_id: ProductKey):
         """
         Cancel all orders.
         """
+        await self._ensure_products(product_id)
         return await super().cancel_all_orders(subaccount_id, product_id)
 
+    async def create_order_book(self, symbol: str, limit: int = None, **kwargs) -> OrderBook:
+        """
+        Create a local order book seeded from the depth snapshot, which reloads itself on sequence gaps.
+        """
+        order_book = OrderBook(symbol, snapshot_loader=partial(self.get_depth, symbol, limit=limit), **kwargs)
+        order_book.apply_snapshot(await self.get_depth(symbol, limit=limit))
+        return order_book
+
+    def create_kline_history(self, cache_dir: str = None, **kwargs) -> AsyncKlineHistory:
+        """
+        Create a paginated candlestick downloader fetching on the event loop, cached under `cache_dir` if given.
+        """
+        return AsyncKlineHistory(self, cache_dir, **kwargs)
+
+    def create_trade_tape(self, symbol: str, **kwargs) -> AsyncTradeTape:
+        """
+        Follow the trades of a symbol, `async for` over the tape yields new trades oldest first as they happen.
+        """
+        return AsyncTradeTape(self, symbol, **kwargs)
+
+    def create_account_manager(self, subaccount_ids: Iterable[int], **kwargs) -> AsyncAccountManager:
+        """
+        Views of several subaccounts of the wallet sharing the session and transport of this client.
+        """
+        return AsyncAccountManager(self, subaccount_ids, **kwargs)
+
+    def create_stream(self, **kwargs) -> "AsyncStreamClient":
+        """
+        Create an asynchronous market data stream over the websocket endpoint of the environment.
+        """
+        from hundred_x.streams import AsyncStreamClient  # pylint: disable=import-outside-toplevel
+
+        return AsyncStreamClient(self.websocket_url, **kwargs)
+
     async def send_message_to_endpoint(
-        self, endpoint: str, method: str, message: dict = {}, authenticated: bool = True, params: dict = {}
+        self,
+        endpoint: str,
+        method: str,
+        message: dict = {},
+        authenticated: bool = True,
+        params: dict = {},
+        path_params: dict = None,
+        policy: RequestPolicy = None,
     ):
         """
-        Send a message to an endpoint.
+        Send a message to an endpoint, under `policy` instead of the policy of the endpoint when given.
         """
         if not self._validate_function(
             endpoint,
         ):
             raise ClientError(f"Invalid endpoint: {endpoint}")
+        if self.signer is not None and endpoint in self.private_functions:
+            await self._ensure_session()
+        metrics = self.metrics
+        started = time.perf_counter_ns() if metrics is not None else 0
         payload = from_message_to_payload(message)
+        if metrics is not None:
+            metrics.observe(PHASE, "payload", time.perf_counter_ns() - started)
+        url = self.rest_url + (endpoint.format(**path_params) if path_params else endpoint)
+        headers = {} if not authenticated else self.authenticated_headers
 
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
-                method,
-                self.rest_url + endpoint,
-                params=params,
-                headers={} if not authenticated else self.authenticated_headers,
-                json=payload,
+        async def request(kwargs, event):
+            if event is not None:
+                self._before_send(event)
+            sent = time.perf_counter_ns() if metrics is not None else 0
+            response = await self.async_transport.request(
+                method, url, params=params, headers=headers, json=payload, **kwargs
             )
+            if metrics is not None:
+                metrics.observe(PHASE, "network", time.perf_counter_ns() - sent)
+            if event is not None:
+                self._after_receive(event, response)
+            return response
+
+        async def send(timeout):
+            kwargs = {} if timeout is None else {"timeout": timeout}
+            event = self._send_event(method, endpoint, payload) if self.hooks else None
+            try:
+                if self.scheduler is None:
+                    response = await request(kwargs, event)
+                else:
+                    async with self.scheduler.slot(method, endpoint):
+                        response = await request(kwargs, event)
+                return self._parse_response(response, method, endpoint, url)
+            except Exception as error:
+                if event is not None:
+                    self._send_failed(event, error)
+                raise
 
-            if response.status_code != 200:
-                raise Exception(
-                    f"Failed to send message: {response.text} {response.status_code} {self.rest_url} {payload}"
-                )
-            return response.json()
+        if metrics is None:
+            return await self.policies.call_async(method, endpoint, send, policy)
+        label = f"{method} {endpoint}"
+        try:
+            result = await self.policies.call_async(method, endpoint, send, policy)
+        except Exception as error:
+            metrics.increment(ERROR, label, type(error).__name__)
+            raise
+        metrics.observe(REQUEST, label, time.perf_counter_ns() - started)
+        return result
@@ -0,0 +1,108 @@
+"""
+Concurrent dispatch of batches of signed messages.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+DEFAULT_MAX_IN_FLIGHT = 8
+
+
+@dataclass
+class BatchItemResult:
+    """
+    Outcome of a single message of a batch.
+    """
+
+    index: int
+    message: Dict[str, Any]
+    response: Any = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BatchResult(list):
+    """
+    Results of a batch in the order of the submitted messages.
+    """
+
+    @property
+    def ok(self) -> bool:
+        return all(result.ok for result in self)
+
+    @property
+    def succeeded(self) -> List[BatchItemResult]:
+        return [result for result in self if result.ok]
+
+    @property
+    def failed(self) -> List[BatchItemResult]:
+        return [result for result in self if not result.ok]
+
+    @property
+    def responses(self) -> List[Any]:
+        return [result.response for result in self]
+
+
+def dispatch(
+    send: Callable[[Dict[str, Any]], Any],
+    messages: List[Dict[str, Any]],
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+) -> BatchResult:
+    """
+    Send messages concurrently from a thread pool, with at most `max_in_flight` requests outstanding.
+    """
+
+    def _send(index: int) -> BatchItemResult:
+        message = messages[index]
+        try:
+            return BatchItemResult(index, message, response=send(message))
+        except Exception as error:  # pylint: disable=broad-except
+            return BatchItemResult(index, message, error=error)
+
+    if len(messages) < 2 or max_in_flight < 2:
+        return BatchResult(_send(index) for index in range(len(messages)))
+    with ThreadPoolExecutor(max_workers=min(max_in_flight, len(messages))) as executor:
+        return BatchResult(executor.map(_send, range(len(messages))))
+
+
+async def dispatch_async(
+    send: Callable[[Dict[str, Any]], Awaitable[Any]],
+    messages: List[Dict[str, Any]],
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+) -> BatchResult:
+    """
+    Send messages concurrently on the event loop, with at most `max_in_flight` requests outstanding.
+    """
+    semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def _send(index: int) -> BatchItemResult:
+        message = messages[index]
+        async with semaphore:
+            try:
+                return BatchItemResult(index, message, response=await send(message))
+            except Exception as error:  # pylint: disable=broad-except
+                return BatchItemResult(index, message, error=error)
+
+    return BatchResult(await asyncio.gather(*(_send(index) for index in range(len(messages)))))
+
+
+def merge_failures(results: BatchResult, indexes: List[int], failed: List[BatchItemResult]) -> BatchResult:
+    """
+    Results of a batch some items of which failed before being sent, in the order of the submitted items.
+
+    `results` are those of the items sent, at the positions `indexes` of the batch.
+    """
+    if not failed:
+        return results
+    merged: List[Optional[BatchItemResult]] = [None] * (len(results) + len(failed))
+    for result, index in zip(results, indexes):
+        result.index = index
+        merged[index] = result
+    for result in failed:
+        merged[result.index] = result
+    return BatchResult(merged)
@@ -3,31 +3,55 @@
 Client class is a wrapper around the REST API of the exchange. It provides methods to interact with the exchange API.
 """
 
+import logging
+import threading
 import time
-from decimal import Decimal
-from typing import Any, List
+from concurrent.futures import Executor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List
 
-import eth_account
-import requests
 from eip712_structs import make_domain
-from eth_account.messages import encode_structured_data
-from web3 import Web3
-from web3.exceptions import TransactionNotFound
+from eth_utils import decode_hex, to_checksum_address
+from eth_utils.crypto import keccak
 
+from hundred_x import models
+from hundred_x.accounts import AccountManager
+from hundred_x.batch import DEFAULT_MAX_IN_FLIGHT, BatchItemResult, BatchResult, dispatch, merge_failures
+from hundred_x.clock import ClockSync
 from hundred_x.constants import APIS, CONTRACTS, LOGIN_MESSAGE, REFERRAL_CODE, RPC_URLS
 from hundred_x.eip_712 import CancelOrder, CancelOrders, LoginMessage, Order, Referral, Withdraw
-from hundred_x.enums import ApiType, Environment, OrderSide, OrderType, TimeInForce
+from hundred_x.enums import ApiType, Environment, LoginMode, OrderSide, OrderType, TimeInForce
 from hundred_x.exceptions import ClientError, UserInputValidationError
+from hundred_x.fixed_point import to_wei
+from hundred_x.history import KlineHistory
+from hundred_x.hooks import (
+    AFTER_RECEIVE,
+    AFTER_SIGN,
+    BEFORE_SEND,
+    BEFORE_SIGN,
+    ON_ERROR,
+    HookEvent,
+    RequestHook,
+    emit,
+    payload_size,
+)
+from hundred_x.metrics import ERROR, PHASE, REQUEST, STATUS, Metrics
+from hundred_x.nonce import NonceManager
+from hundred_x.order_book import OrderBook
+from hundred_x.policy import RequestPolicies, RequestPolicy, error_for_response
+from hundred_x.products import DEFAULT_PRODUCTS_TTL, ProductKey, ProductRegistry
+from hundred_x.scheduler import Scheduler
+from hundred_x.signing import EIP712Signer, get_struct_encoder
+from hundred_x.state import DEFAULT_SESSION_TTL, ClientState, StateStore
+from hundred_x.tape import TradeTape
+from hundred_x.transport import RequestsTransport, Transport
 from hundred_x.utils import from_message_to_payload, get_abi
+from hundred_x.validation import OrderValidator
 
-headers = {
-    "Accept": "application/json",
-    "Content-Type": "application/json",
-}
+if TYPE_CHECKING:
+    from hundred_x.streams import StreamClient
 
-
-PROTOCOL_ABI = get_abi("protocol")
-ERC_20_ABI = get_abi("erc20")
+logger = logging.getLogger(__name__)
 
 
 class HundredXClient:
@@ -44,6 +68,7 @@ class HundredXClient:
         "/v1/session/login",
         "/v1/referral/add-referee",
         "/v1/session/logout",
+        "/v1/session/status",
     ]
     public_functions: List[str] = [
         "/v1/products",
@@ -56,29 +81,93 @@ class HundredXClient:
         "/v1/depth",
     ]
 
+    transport_class = RequestsTransport
+
     @property
     def http_client(self):
-        return requests
+        return self.transport
 
     def __init__(
         self,
         env: Environment = Environment.TESTNET,
         private_key: str = None,
         subaccount_id: int = 0,
+        transport: Transport = None,
+        signing_executor: Executor = None,
+        signing_workers: int = None,
+        rest_url: str = None,
+        websocket_url: str = None,
+        login_mode: LoginMode = LoginMode.EAGER,
+        state_file: str = None,
+        session_ttl: float = DEFAULT_SESSION_TTL,
+        products_ttl: float = DEFAULT_PRODUCTS_TTL,
+        validator: OrderValidator = None,
+        typed_responses: bool = False,
+        scheduler: Scheduler = None,
+        policies: RequestPolicies = None,
+        metrics: Metrics = None,
+        hooks: List[RequestHook] = None,
+        nonces: NonceManager = None,
     ):
         """
         Initialize the client with the given environment.
+        All requests are sent through the transport, a pooled keep-alive session by default.
+        Batches of orders are signed over the signing executor when one is given, in one chunk per signing worker,
+        `signing_workers` defaults to the number of cores.
+        The REST and websocket urls of the environment can be overridden, e.g. to use `hundred_x.mock_server`.
+        The session is opened during construction, on the first private request or on a background thread
+        depending on the login mode. Web3 and the contracts are only created on the first on-chain call.
+        With a state file the session, referral, products, clock offset and nonces survive restarts, a stored
+        session is reused after a single `/v1/session/status` check.
+        The product catalogue is loaded with the session and cached for `products_ttl` seconds, a stale catalogue
+        is reloaded in the background so orders never wait for it.
+        Orders are checked against the product rules by the validator before they are signed.
+        With `typed_responses` positions, orders, balances, tickers and depth are returned as `hundred_x.models`
+        objects, which still read like the raw dicts by api key.
+        With a scheduler requests are held to its rate limits, cancels overtaking the other requests it holds back.
+        The policies set the timeouts of the requests, retry failed reads and hedge slow ones.
+        With metrics the latencies of the endpoints and of the phases of signing and sending are recorded.
+        Hooks are called around every signature and request, see `hundred_x.hooks`.
+        Nonces are given out by the nonce manager, pass one with a shared counter to share an account between
+        processes. The client closes its nonce manager when it is closed.
         """
         self.env = env
-        self.rest_url = APIS[env][ApiType.REST]
-        self.websocket_url = APIS[env][ApiType.WEBSOCKET]
+        self.rest_url = rest_url or APIS[env][ApiType.REST]
+        self.websocket_url = websocket_url or APIS[env][ApiType.WEBSOCKET]
         if any([not self.rest_url, not self.websocket_url]):
             raise UserInputValidationError(
                 f"Invalid environment: {env} Missing REST or WEBSOCKET URL for the environment."
             )
 
+        if transport is None and self.transport_class is not None:
+            transport = self.transport_class()
+        self.transport = transport
+        if transport is not None:
+            transport.warm_up(self.rest_url + "/v1/time")
         self.session_cookie = {}
-        self.web3 = Web3(Web3.HTTPProvider(RPC_URLS[env]))
+        self.login_mode = login_mode
+        self.signer = None
+        self.signing_executor = signing_executor
+        self.signing_workers = signing_workers
+        self._private_key = None
+        self._wallet = None
+        self._web3 = None
+        self._session_lock = threading.Lock()
+        self._session_thread = None
+        self.public_key = None
+        self.session_ttl = session_ttl
+        self.state_store = StateStore(state_file) if state_file else None
+        self.state = ClientState()
+        self.clock_offset = 0.0
+        self.clock = None
+        self.nonces = nonces if nonces is not None else NonceManager()
+        self.products = ProductRegistry(self.list_products, products_ttl)
+        self.validator = validator if validator is not None else OrderValidator()
+        self.typed_responses = typed_responses
+        self.scheduler = scheduler
+        self.policies = policies if policies is not None else RequestPolicies()
+        self.metrics = metrics
+        self.hooks = tuple(hooks or ())
         self.domain = make_domain(
             name="100x",
             version="0.0.0",
@@ -86,18 +175,150 @@ class HundredXClient:
             verifyingContract=CONTRACTS[env]["VERIFYING_CONTRACT"],
         )
         if private_key:
-            self.wallet = eth_account.Account.from_key(private_key)
-            self.public_key = self.wallet.address
+            self._private_key = private_key
+            self.signer = EIP712Signer(self.domain, decode_hex(private_key))
+            self.public_key = self.signer.private_key.public_key.to_checksum_address()
             if not (0 <= subaccount_id <= 255):
                 raise UserInputValidationError(
                     f"Subaccount ID must be between 0 and 255. It is instead: {subaccount_id}"
                 )
             self.subaccount_id = subaccount_id
+        self._restore_state()
+        if self.signer is not None:
+            self._start_session()
+
+    @property
+    def wallet(self):
+        """
+        The `eth_account` account of the private key, created on first use as importing `eth_account` is slow.
+        """
+        if self._wallet is None and self._private_key is not None:
+            import eth_account  # pylint: disable=import-outside-toplevel
+
+            self._wallet = eth_account.Account.from_key(self._private_key)
+        return self._wallet
+
+    @property
+    def web3(self):
+        """
+        The web3 connection to the chain of the environment, created on the first on-chain call.
+        """
+        if self._web3 is None:
+            from web3 import Web3  # pylint: disable=import-outside-toplevel
+
+            self._web3 = Web3(Web3.HTTPProvider(RPC_URLS[self.env]))
+        return self._web3
+
+    def _start_session(self):
+        """
+        Open the session according to the login mode once the key is known.
+        """
+        if self.login_mode is LoginMode.EAGER:
+            self._open_session()
+            self._preload_products()
+        elif self.login_mode is LoginMode.BACKGROUND:
+            self._session_thread = threading.Thread(
+                target=self._open_session_in_background, name="hundred-x-login", daemon=True
+            )
+            self._session_thread.start()
+
+    @property
+    def _state_key(self) -> str:
+        return StateStore.key(self.rest_url, self.public_key or "")
+
+    def _restore_state(self):
+        """
+        Load the persisted state, the stored session is only reused once `_resume_session` validated it.
+        """
+        if self.state_store is None:
+            return
+        self.state = self.state_store.load(self._state_key)
+        self.clock_offset = self.state.clock_offset
+        for subaccount_id, nonce in self.state.nonces.items():
+            self.nonces.observe(int(subaccount_id), nonce)
+        if self.state.products_fresh(self.products.ttl):
+            self.products.load(self.state.products, fetched=self.state.products_fetched)
+
+    def save_state(self):
+        """
+        Write the session, referral, products, clock offset and last nonces to the state file.
+        """
+        if self.state_store is None:
+            return
+        self.state.session_cookie = self.session_cookie or None
+        self.state.clock_offset = self.clock_offset
+        self.state.nonces = {str(subaccount_id): nonce for subaccount_id, nonce in self._last_nonces.items()}
+        self.state_store.save(self._state_key, self.state)
+
+    def _resume_session(self) -> bool:
+        """
+        Reuse the stored session cookie if the exchange still accepts it.
+        """
+        if not self.state.session_valid():
+            return False
+        self.session_cookie = self.state.session_cookie
+        try:
+            response = self.http_client.request(
+                "GET", self.rest_url + "/v1/session/status", headers=self.authenticated_headers
+            )
+            if response.status_code == 200:
+                return True
+        except Exception:  # pylint: disable=broad-except
+            pass
+        self.session_cookie = {}
+        self.state.session_cookie = None
+        return False
+
+    def _session_opened(self, cookie: str):
+        self.session_cookie = cookie
+        self.state.session_cookie = cookie
+        self.state.session_expiry = time.time() + self.session_ttl
+
+    def _open_session(self):
+        """
+        Login and register the referral code, unless another thread already did or a stored session is valid.
+        """
+        with self._session_lock:
+            if self.session_cookie or self._resume_session():
+                return
             self.login()
             try:
                 self.set_referral_code()
             except Exception:  # pylint: disable=broad-except
                 pass
+            self.save_state()
+
+    def _open_session_in_background(self):
+        try:
+            self._open_session()
+        except Exception:  # pylint: disable=broad-except
+            # the first private request retries the login and raises the error
+            pass
+        self._preload_products()
+
+    def _preload_products(self):
+        """
+        Load the product catalogue before the first order, unless a fresh one was restored from the state.
+        """
+        if not self.products.stale:
+            return
+        try:
+            self.products.refresh()
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Product catalogue unavailable, orders skip the product rules until it loads", exc_info=True)
+
+    def _ensure_session(self):
+        """
+        Wait for a background login, or login now, before a private request.
+        """
+        if self.session_cookie:
+            return
+        thread = self._session_thread
+        if thread is not None:
+            thread.join()
+            self._session_thread = None
+        if not self.session_cookie:
+            self._open_session()
 
     def _validate_function(
         self,
@@ -111,27 +332,144 @@ class HundredXClient:
         if endpoint in self.public_functions:
             return True
         if endpoint in self.private_functions:
-            if not self.wallet:
+            if self.signer is None:
                 raise UserInputValidationError(
                     f"Private function {endpoint} requires a private key please provide one at initialization."
                 )
             return True
 
     def _current_timestamp(self):
-        timestamp_ms = int(time.time() * 1000)
+        now = time.time()
+        offset = self.clock_offset if self.clock is None else self.clock.offset_at(now)
+        timestamp_ms = int(now * 1000 + offset)
         return timestamp_ms
 
+    @property
+    def _last_nonces(self) -> Dict[int, int]:
+        return self.nonces.snapshot()
+
+    def _nonce(self, subaccount_id: int, nonce: int = 0, ts: int = None) -> int:
+        """
+        The nonce given by the caller, recorded, or the next free one of the subaccount.
+        """
+        if nonce:
+            self.nonces.observe(subaccount_id, nonce)
+            return nonce
+        return self.nonces.next(subaccount_id, self._current_timestamp() if ts is None else ts)
+
+    def _clock_offset_from(self, response: Any, sent: float, received: float) -> float:
+        """
+        Offset of the server clock in ms, taking the server time at the midpoint of the round trip.
+        """
+        server_time = response["serverTime"] if isinstance(response, dict) else response
+        if self.clock is None:
+            self.clock_offset = int(server_time) - (sent + received) * 500
+        else:
+            self.clock_offset = self.clock.estimate.update(int(server_time), sent, received)
+        self.state.clock_offset = self.clock_offset
+        return self.clock_offset
+
+    def sync_clock(self) -> float:
+        """
+        Measure the offset of the server clock, applied to every timestamp and nonce the client generates.
+        """
+        sent = time.time()
+        response = self._sample_server_time()
+        return self._clock_offset_from(response, sent, time.time())
+
+    def _sample_server_time(self) -> Any:
+        """
+        Get the server time in a single attempt, the round trip of a retried or hedged request is not one sample.
+        """
+        return self.send_message_to_endpoint("/v1/time", "GET", policy=self.policies.single_attempt("GET", "/v1/time"))
+
+    def start_clock_sync(self, **kwargs) -> ClockSync:
+        """
+        Keep the clock offset in sync with the server from a background thread, stopped by `close()`.
+        The keyword arguments are those of `hundred_x.clock.ClockSync`.
+        """
+        if self.clock is None:
+            self.clock = ClockSync(self, **kwargs)
+        return self.clock.start()
+
     def generate_and_sign_message(self, message_class, **kwargs):
         """
         Generate and sign a message.
         """
+        if not self.hooks:
+            if self.metrics is None:
+                return self.signer.sign(message_class, **kwargs)
+            return self._sign_timed(message_class, kwargs)
+        event = HookEvent(BEFORE_SIGN, message_type=message_class.__name__, nonce=kwargs.get("nonce"))
+        return self._hooked_sign(event, lambda: self._sign(message_class, kwargs))
 
-        message = message_class(**kwargs)
-        message = message.to_message(self.domain)
-        signable_message = encode_structured_data(message)
-        signed = self.wallet.sign_message(signable_message)
-        message["message"]["signature"] = signed.signature.hex()
-        return message["message"]
+    def _sign(self, message_class, values: Dict[str, Any]) -> Dict[str, Any]:
+        if self.metrics is None:
+            return self.signer.sign(message_class, **values)
+        return self._sign_timed(message_class, values)
+
+    def _hooked_sign(self, event: HookEvent, sign: Callable[[], Any]) -> Any:
+        """
+        Sign between the before and after sign hooks.
+        """
+        event.started = time.monotonic_ns()
+        emit(self.hooks, BEFORE_SIGN, event, self._current_timestamp())
+        try:
+            signed = sign()
+        except Exception as error:
+            event.error = error
+            emit(self.hooks, ON_ERROR, event, self._current_timestamp())
+            raise
+        emit(self.hooks, AFTER_SIGN, event, self._current_timestamp())
+        return signed
+
+    def _sign_batch(self, message_class, params: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Sign a batch of messages, the hooks see the batch as one step with the nonce of its first message.
+        """
+        if not self.hooks:
+            return self.signer.sign_batch(message_class, params, self.signing_executor, self.signing_workers)
+        nonce = params[0].get("nonce") if params else None
+        event = HookEvent(BEFORE_SIGN, message_type=message_class.__name__, nonce=nonce, count=len(params))
+        return self._hooked_sign(
+            event, lambda: self.signer.sign_batch(message_class, params, self.signing_executor, self.signing_workers)
+        )
+
+    def _send_event(self, method: str, endpoint: str, payload: Any) -> HookEvent:
+        nonce = payload.get("nonce") if isinstance(payload, dict) else None
+        return HookEvent(BEFORE_SEND, method=method, endpoint=endpoint, nonce=nonce, payload_size=payload_size(payload))
+
+    def _before_send(self, event: HookEvent):
+        event.started = time.monotonic_ns()
+        event.status_code = None
+        event.error = None
+        emit(self.hooks, BEFORE_SEND, event, self._current_timestamp())
+
+    def _after_receive(self, event: HookEvent, response):
+        event.status_code = response.status_code
+        emit(self.hooks, AFTER_RECEIVE, event, self._current_timestamp())
+
+    def _send_failed(self, event: HookEvent, error: Exception):
+        event.error = error
+        emit(self.hooks, ON_ERROR, event, self._current_timestamp())
+
+    def _sign_timed(self, message_class, values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Sign a message as `EIP712Signer.sign` does, recording the time spent in each step.
+        """
+        observe = self.metrics.observe
+        started = time.perf_counter_ns()
+        encoder = get_struct_encoder(message_class)
+        message = {name: values.get(name) for name in encoder.names}
+        built = time.perf_counter_ns()
+        digest = keccak(self.signer.prefix + encoder.hash_struct(message))
+        encoded = time.perf_counter_ns()
+        message["signature"] = self.signer.sign_digest(digest)
+        signed = time.perf_counter_ns()
+        observe(PHASE, "build", built - started)
+        observe(PHASE, "encode", encoded - built)
+        observe(PHASE, "sign", signed - encoded)
+        return message
 
     def get_shared_params(self, asset: str = None, subaccount_id: int = None):
         params = {
@@ -144,64 +482,128 @@ class HundredXClient:
         return params
 
     def send_message_to_endpoint(
-        self, endpoint: str, method: str, message: dict = {}, authenticated: bool = True, params=None
+        self,
+        endpoint: str,
+        method: str,
+        message: dict = {},
+        authenticated: bool = True,
+        params=None,
+        path_params: dict = None,
+        policy: RequestPolicy = None,
     ):
         """
-        Send a message to an endpoint.
+        Send a message to an endpoint, under `policy` instead of the policy of the endpoint when given.
         """
         if not self._validate_function(
             endpoint,
         ):
             raise ClientError(f"Invalid endpoint: {endpoint}")
+        if self.signer is not None and endpoint in self.private_functions:
+            self._ensure_session()
+        metrics = self.metrics
+        started = time.perf_counter_ns() if metrics is not None else 0
         payload = from_message_to_payload(message)
-        response = self.http_client.request(
-            method,
-            self.rest_url + endpoint,
-            params=params,
-            headers={} if not authenticated else self.authenticated_headers,
-            json=payload,
-        )
+        if metrics is not None:
+            metrics.observe(PHASE, "payload", time.perf_counter_ns() - started)
+        url = self.rest_url + (endpoint.format(**path_params) if path_params else endpoint)
+        headers = {} if not authenticated else self.authenticated_headers
+
+        def request(kwargs, event):
+            if event is not None:
+                self._before_send(event)
+            sent = time.perf_counter_ns() if metrics is not None else 0
+            response = self.http_client.request(method, url, params=params, headers=headers, json=payload, **kwargs)
+            if metrics is not None:
+                metrics.observe(PHASE, "network", time.perf_counter_ns() - sent)
+            if event is not None:
+                self._after_receive(event, response)
+            return response
+
+        def send(timeout):
+            kwargs = {} if timeout is None else {"timeout": timeout}
+            event = self._send_event(method, endpoint, payload) if self.hooks else None
+            try:
+                if self.scheduler is None:
+                    response = request(kwargs, event)
+                else:
+                    with self.scheduler.slot(method, endpoint):
+                        response = request(kwargs, event)
+                return self._parse_response(response, method, endpoint, url)
+            except Exception as error:
+                if event is not None:
+                    self._send_failed(event, error)
+                raise
+
+        if metrics is None:
+            return self.policies.call(method, endpoint, send, policy)
+        return self._measured(method, endpoint, started, lambda: self.policies.call(method, endpoint, send, policy))
+
+    def _parse_response(self, response, method: str, endpoint: str, url: str) -> Any:
+        metrics = self.metrics
+        if metrics is None:
+            if response.status_code != 200:
+                raise error_for_response(response, method, url)
+            return response.json()
+        metrics.increment(STATUS, f"{method} {endpoint}", response.status_code)
         if response.status_code != 200:
-            raise Exception(f"Failed to send message: {response.text} {response.status_code} {self.rest_url} {payload}")
-        return response.json()
+            raise error_for_response(response, method, url)
+        started = time.perf_counter_ns()
+        result = response.json()
+        metrics.observe(PHASE, "parse", time.perf_counter_ns() - started)
+        return result
+
+    def _measured(self, method: str, endpoint: str, started: int, call: Callable[[], Any]) -> Any:
+        """
+        Record the latency of a request from `started` including its retries, or the error it failed with.
+        """
+        label = f"{method} {endpoint}"
+        try:
+            result = call()
+        except Exception as error:
+            self.metrics.increment(ERROR, label, type(error).__name__)
+            raise
+        self.metrics.observe(REQUEST, label, time.perf_counter_ns() - started)
+        return result
 
     def withdraw(self, subaccount_id: int, quantity: int, asset: str = "USDB"):
         """
         Generate a withdrawal message and sign it.
         """
 
+        nonce = self._nonce(subaccount_id)
         message = self.generate_and_sign_message(
             Withdraw,
-            quantity=int(quantity * 1e18),
-            nonce=self._current_timestamp(),
+            quantity=to_wei(quantity),
+            nonce=nonce,
             **self.get_shared_params(subaccount_id=subaccount_id, asset=asset),
         )
         return self.send_message_to_endpoint("/v1/withdraw", "POST", message)
 
-    def create_order(
+    def _order_params(
         self,
         subaccount_id: int,
-        product_id: int,
+        product_id: ProductKey,
         quantity: int,
         side: OrderSide,
         order_type: OrderType,
         time_in_force: TimeInForce,
         price: int = None,
         nonce: int = 0,
+        ts: int = None,
     ):
         """
-        Create an order.
+        Build the fields of an Order message, checked against the rules of the product.
         """
         if all([price is None, order_type is OrderType.LIMIT]):
             raise UserInputValidationError("Price is required for a limit order.")
-        ts = self._current_timestamp()
-        if nonce == 0:
-            nonce = ts
+        if ts is None:
+            ts = self._current_timestamp()
+        nonce = self._nonce(subaccount_id, nonce, ts)
 
         params = {
             "subAccountId": subaccount_id,
-            "productId": product_id,
-            "quantity": int(Decimal(str(quantity)) * Decimal(1e18)),
+            "productId": self.products.product_id(product_id),
+            "quantity": to_wei(quantity),
             "isBuy": side.value,
             "orderType": order_type.value,
             "timeInForce": time_in_force.value,
@@ -210,16 +612,69 @@ class HundredXClient:
             **self.get_shared_params(),
         }
         if price is not None:
-            params["price"] = int(Decimal(str(price)) * Decimal(1e18))
+            params["price"] = to_wei(price)
+        return self.validator.validate(params, self.products.find(params["productId"]), now=ts)
+
+    def create_order(
+        self,
+        subaccount_id: int,
+        product_id: ProductKey,
+        quantity: int,
+        side: OrderSide,
+        order_type: OrderType,
+        time_in_force: TimeInForce,
+        price: int = None,
+        nonce: int = 0,
+    ):
+        """
+        Create an order, the product is given by id or by symbol.
+        """
+        params = self._order_params(
+            subaccount_id, product_id, quantity, side, order_type, time_in_force, price=price, nonce=nonce
+        )
         message = self.generate_and_sign_message(
             Order,
             **params,
         )
         return self.send_message_to_endpoint("/v1/order", "POST", message)
 
-    def cancel_and_replace_order(
+    def sign_orders(self, orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Sign a batch of orders, each given as the keyword arguments of `create_order`.
+
+        Signing is spread over `signing_executor` when one is set. Orders without an explicit nonce
+        get consecutive nonces so that none of the batch collide. Returns the payloads for `/v1/order`
+        in the same order as the input.
+        """
+        payloads, _, failed = self._sign_order_batch(orders)
+        if failed:
+            raise failed[0].error
+        return payloads
+
+    def _prepare_batch(self, build: Callable[[Dict[str, Any]], Any], items: List[Dict[str, Any]]):
+        """
+        Build every item of a batch on its own, the items failing to build, e.g. invalid orders, are returned as
+        failed results next to the built ones and their positions in the batch.
+        """
+        built, indexes, failed = [], [], []
+        for index, item in enumerate(items):
+            try:
+                built.append(build(item))
+            except Exception as error:  # pylint: disable=broad-except
+                failed.append(BatchItemResult(index, item, error=error))
+                continue
+            indexes.append(index)
+        return built, indexes, failed
+
+    def _sign_order_batch(self, orders: List[Dict[str, Any]]):
+        ts = self._current_timestamp()
+        params, indexes, failed = self._prepare_batch(lambda order: self._order_params(**order, ts=ts), orders)
+        messages = self._sign_batch(Order, params)
+        return [from_message_to_payload(message) for message in messages], indexes, failed
+
+    def _replace_message(
         self,
-        product_id: int,
+        product_id: ProductKey,
         quantity: int,
         price: int,
         side: OrderSide,
@@ -228,83 +683,214 @@ class HundredXClient:
         subaccount_id: int = None,
         order_type: OrderType = OrderType.LIMIT_MAKER,
         time_in_force: TimeInForce = TimeInForce.GTC,
+        ts: int = None,
     ):
         """
-        Cancel and replace an order.
+        Build the fields of the replacement Order along with the id of the order to cancel.
         """
-        ts = self._current_timestamp()
-        if nonce == 0:
-            nonce = ts
         if subaccount_id is None:
             subaccount_id = self.subaccount_id
+        params = self._order_params(
+            subaccount_id, product_id, quantity, side, order_type, time_in_force, price=price, nonce=nonce, ts=ts
+        )
+        return params, order_id_to_cancel
+
+    def cancel_and_replace_order(
+        self,
+        product_id: ProductKey,
+        quantity: int,
+        price: int,
+        side: OrderSide,
+        order_id_to_cancel: str,
+        nonce: int = 0,
+        subaccount_id: int = None,
+        order_type: OrderType = OrderType.LIMIT_MAKER,
+        time_in_force: TimeInForce = TimeInForce.GTC,
+    ):
+        """
+        Cancel and replace an order.
+        """
+        params, order_id_to_cancel = self._replace_message(
+            product_id,
+            quantity,
+            price,
+            side,
+            order_id_to_cancel,
+            nonce=nonce,
+            subaccount_id=subaccount_id,
+            order_type=order_type,
+            time_in_force=time_in_force,
+        )
         _message = self.generate_and_sign_message(
             Order,
-            subAccountId=subaccount_id,
-            productId=product_id,
-            quantity=int(Decimal(str(quantity)) * Decimal(1e18)),
-            price=int(Decimal(str(price)) * Decimal(1e18)),
-            isBuy=side.value,
-            orderType=order_type.value,
-            timeInForce=time_in_force.value,
-            nonce=nonce,
-            expiration=(ts + 1000 * 60 * 60 * 24) * 1000,
-            **self.get_shared_params(),
+            **params,
         )
         message = {}
         message["newOrder"] = from_message_to_payload(_message)
         message["idToCancel"] = order_id_to_cancel
         return self.send_message_to_endpoint("/v1/order/cancel-and-replace", "POST", message)
 
-    def cancel_order(self, product_id: int, order_id: int, subaccount_id: int = None):
+    def _cancel_params(self, product_id: ProductKey, order_id: str, subaccount_id: int = None):
+        return {
+            "subAccountId": self.subaccount_id if subaccount_id is None else subaccount_id,
+            "productId": self.products.product_id(product_id),
+            "orderId": order_id,
+            **self.get_shared_params(),
+        }
+
+    def cancel_order(self, product_id: ProductKey, order_id: int, subaccount_id: int = None):
         """
         Cancel an order.
         """
         message = self.generate_and_sign_message(
             CancelOrder,
-            subAccountId=self.subaccount_id if subaccount_id is None else subaccount_id,
-            productId=product_id,
-            orderId=order_id,
-            **self.get_shared_params(),
+            **self._cancel_params(product_id, order_id, subaccount_id),
         )
         return self.send_message_to_endpoint("/v1/order", "DELETE", message)
 
-    def cancel_all_orders(self, subaccount_id: int, product_id: int):
+    def sign_cancels(self, cancels: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Sign a batch of cancels, each given as the keyword arguments of `cancel_order`.
+        """
+        messages, _, failed = self._sign_cancel_batch(cancels)
+        if failed:
+            raise failed[0].error
+        return messages
+
+    def _sign_cancel_batch(self, cancels: List[Dict[str, Any]]):
+        params, indexes, failed = self._prepare_batch(lambda cancel: self._cancel_params(**cancel), cancels)
+        return self._sign_batch(CancelOrder, params), indexes, failed
+
+    def sign_replacements(self, replacements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Sign a batch of cancel and replace requests, each given as the keyword arguments of
+        `cancel_and_replace_order`. Replacements without an explicit nonce get consecutive nonces.
+        """
+        messages, _, failed = self._sign_replacement_batch(replacements)
+        if failed:
+            raise failed[0].error
+        return messages
+
+    def _sign_replacement_batch(self, replacements: List[Dict[str, Any]]):
+        ts = self._current_timestamp()
+        built, indexes, failed = self._prepare_batch(
+            lambda replacement: self._replace_message(**replacement, ts=ts), replacements
+        )
+        messages = self._sign_batch(Order, [order_params for order_params, _ in built])
+        return (
+            [
+                {"newOrder": from_message_to_payload(message), "idToCancel": order_id_to_cancel}
+                for message, (_, order_id_to_cancel) in zip(messages, built)
+            ],
+            indexes,
+            failed,
+        )
+
+    def create_orders(self, orders: List[Dict[str, Any]], max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> BatchResult:
+        """
+        Create a batch of orders, each given as the keyword arguments of `create_order`.
+
+        The orders are signed in batch and sent concurrently over the shared transport. Failures, including
+        orders failing validation, are reported per order in the returned results rather than raised.
+        """
+        payloads, indexes, failed = self._sign_order_batch(orders)
+        results = dispatch(partial(self.send_message_to_endpoint, "/v1/order", "POST"), payloads, max_in_flight)
+        return merge_failures(results, indexes, failed)
+
+    def cancel_orders(self, cancels: List[Dict[str, Any]], max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> BatchResult:
+        """
+        Cancel a batch of orders, each given as the keyword arguments of `cancel_order`.
+        """
+        messages, indexes, failed = self._sign_cancel_batch(cancels)
+        results = dispatch(partial(self.send_message_to_endpoint, "/v1/order", "DELETE"), messages, max_in_flight)
+        return merge_failures(results, indexes, failed)
+
+    def cancel_and_replace_orders(
+        self, replacements: List[Dict[str, Any]], max_in_flight: int = DEFAULT_MAX_IN_FLIGHT
+    ) -> BatchResult:
+        """
+        Cancel and replace a batch of orders, each given as the keyword arguments of `cancel_and_replace_order`.
+        """
+        messages, indexes, failed = self._sign_replacement_batch(replacements)
+        results = dispatch(
+            partial(self.send_message_to_endpoint, "/v1/order/cancel-and-replace", "POST"), messages, max_in_flight
+        )
+        return merge_failures(results, indexes, failed)
+
+    def cancel_all_orders(self, subaccount_id: int, product_id: ProductKey):
         """
         Cancel all orders.
         """
         message = self.generate_and_sign_message(
             CancelOrders,
             subAccountId=subaccount_id,
-            productId=product_id,
+            productId=self.products.product_id(product_id),
             **self.get_shared_params(),
         )
         return self.send_message_to_endpoint("/v1/openOrders", "DELETE", message)
 
-    def create_authenticated_session_with_service(self):
-        login_payload = self.generate_and_sign_message(
+    def _login_message(self):
+        return self.generate_and_sign_message(
             LoginMessage,
             message=LOGIN_MESSAGE,
             timestamp=self._current_timestamp(),
             **self.get_shared_params(),
         )
-        response = requests.post(
+
+    def _referral_message(self):
+        return self.generate_and_sign_message(
+            Referral,
+            code=REFERRAL_CODE,
+            **self.get_shared_params(),
+        )
+
+    def create_authenticated_session_with_service(self):
+        login_payload = self._login_message()
+        response = self.http_client.request(
+            "POST",
             self.rest_url + "/v1/session/login",
             json=login_payload,
         ).json()
-        self.session_cookie = response.get("value")
+        self._session_opened(response.get("value"))
         return response
 
+    def _typed(self, model: type, response: Any) -> Any:
+        """
+        Wrap a response in its model when typed responses are enabled.
+        """
+        if not self.typed_responses:
+            return response
+        return models.decode(model, response)
+
+    def _products_loaded(self, products: List[Any]) -> List[Any]:
+        if not isinstance(products, list):
+            self.products.load(products)
+            return products
+        self.state.products = products
+        self.state.products_fetched = time.time()
+        self.products.load(products, fetched=self.state.products_fetched)
+        return products
+
+    def refresh_products(self) -> ProductRegistry:
+        """
+        Reload the product catalogue.
+        """
+        self.list_products()
+        return self.products
+
     def list_products(self) -> List[Any]:
         """
         Get a list of all available products.
         """
-        return requests.get(self.rest_url + "/v1/products").json()
+        return self._products_loaded(self.send_message_to_endpoint("/v1/products", "GET"))
 
     def get_product(self, product_symbol: str) -> Any:
         """
         Get the details of a specific product.
         """
-        return requests.get(self.rest_url + f"/v1/products/{product_symbol}").json()
+        return self.send_message_to_endpoint(
+            "/v1/products/{product_symbol}", "GET", path_params={"product_symbol": product_symbol}
+        )
 
     def get_trade_history(self, symbol: str, lookback: int) -> Any:
         """
@@ -320,7 +906,7 @@ class HundredXClient:
         """
         Get the server time.
         """
-        return requests.get(self.rest_url + "/v1/time").json()
+        return self.send_message_to_endpoint("/v1/time", "GET")
 
     def get_candlestick(self, symbol: str, **kwargs) -> Any:
         """
@@ -331,10 +917,7 @@ class HundredXClient:
             var = kwargs.get(arg)
             if var is not None:
                 params[arg] = var
-        return requests.get(
-            self.rest_url + "/v1/uiKlines",
-            params=params,
-        ).json()
+        return self.send_message_to_endpoint("/v1/uiKlines", "GET", params=params)
 
     def get_symbol(self, symbol: str = None) -> Any:
         """
@@ -350,14 +933,17 @@ class HundredXClient:
         if not isinstance(response, list):
             return response
         if symbol:
-            return response[0]
+            return self._typed(models.Ticker, response[0])
         else:
-            return response
+            return self._typed(models.Ticker, response)
 
     def get_depth(self, symbol: str, **kwargs) -> Any:
         """
         Get the depth data for a specific product.
         """
+        return self._typed(models.Depth, self._fetch_depth(symbol, **kwargs))
+
+    def _fetch_depth(self, symbol: str, **kwargs) -> Any:
         params = {"symbol": symbol}
         for arg in ["limit"]:
             var = kwargs.get(arg)
@@ -369,6 +955,41 @@ class HundredXClient:
             params=params,
         )
 
+    def create_order_book(self, symbol: str, limit: int = None, **kwargs) -> OrderBook:
+        """
+        Create a local order book seeded from the depth snapshot, which reloads itself on sequence gaps.
+        """
+        order_book = OrderBook(symbol, snapshot_loader=partial(self.get_depth, symbol, limit=limit), **kwargs)
+        order_book.resync()
+        return order_book
+
+    def create_kline_history(self, cache_dir: str = None, **kwargs) -> KlineHistory:
+        """
+        Create a paginated candlestick downloader, cached under `cache_dir` when one is given.
+        """
+        return KlineHistory(self, cache_dir, **kwargs)
+
+    def create_trade_tape(self, symbol: str, **kwargs) -> TradeTape:
+        """
+        Follow the trades of a symbol, iterating the tape yields new trades oldest first as they happen.
+        """
+        return TradeTape(self, symbol, **kwargs)
+
+    def create_account_manager(self, subaccount_ids: Iterable[int], **kwargs) -> AccountManager:
+        """
+        Views of several subaccounts of the wallet sharing the session and transport of this client.
+        """
+        return AccountManager(self, subaccount_ids, **kwargs)
+
+    def create_stream(self, **kwargs) -> "StreamClient":
+        """
+        Create a market data stream over the websocket endpoint of the environment.
+        """
+        # websockets is only imported by the clients that stream
+        from hundred_x.streams import StreamClient  # pylint: disable=import-outside-toplevel
+
+        return StreamClient(self.websocket_url, **kwargs)
+
     def login(self):
         """
         Login to the exchange.
@@ -381,7 +1002,7 @@ class HundredXClient:
         """
         Get the current session status.
         """
-        return requests.get(self.rest_url + "/v1/session/status", headers=self.authenticated_headers).json()
+        return self.send_message_to_endpoint("/v1/session/status", "GET")
 
     @property
     def authenticated_headers(self):
@@ -393,162 +1014,224 @@ class HundredXClient:
         """
         Logout from the exchange.
         """
-        return requests.get(self.rest_url + "/v1/session/logout", headers=self.authenticated_headers).json()
+        return self.send_message_to_endpoint("/v1/session/logout", "GET")
 
-    def get_spot_balances(self):
+    def _account_params(self, subaccount_id: int = None) -> Dict[str, Any]:
+        return {
+            "account": self.public_key,
+            "subAccountId": self.subaccount_id if subaccount_id is None else subaccount_id,
+        }
+
+    def get_spot_balances(self, subaccount_id: int = None):
         """
-        Get the spot balances.
+        Get the spot balances, of the client subaccount unless another one is given.
         """
+        return self._typed(models.Balance, self._fetch_spot_balances(subaccount_id))
+
+    def _fetch_spot_balances(self, subaccount_id: int = None) -> Any:
         return self.send_message_to_endpoint(
             "/v1/balances",
             "GET",
-            params={"account": self.public_key, "subAccountId": self.subaccount_id},
+            params=self._account_params(subaccount_id),
             authenticated=True,
         )
 
-    def get_position(self, symbol: str = None):
+    def get_position(self, symbol: str = None, subaccount_id: int = None):
         """
         Get all positions for the subaccount.
         """
-        params = {"account": self.public_key, "subAccountId": self.subaccount_id}
+        return self._typed(models.Position, self._fetch_position(symbol, subaccount_id))
+
+    def _fetch_position(self, symbol: str = None, subaccount_id: int = None) -> Any:
+        params = self._account_params(subaccount_id)
         if symbol is not None:
             params["symbol"] = symbol
         return self.send_message_to_endpoint("/v1/positionRisk", "GET", params=params, authenticated=True)
 
-    def get_approved_signers(self):
+    def get_approved_signers(self, subaccount_id: int = None):
         """
         Get the approved signers.
         """
-        return requests.get(
-            self.rest_url + "/v1/approved-signers",
-            headers=self.authenticated_headers,
-            params={"account": self.public_key, "subAccountId": self.subaccount_id},
-        ).json()
+        return self.send_message_to_endpoint(
+            "/v1/approved-signers",
+            "GET",
+            params=self._account_params(subaccount_id),
+        )
 
     def get_open_orders(
         self,
         symbol: str = None,
+        subaccount_id: int = None,
     ):
         """
         Get the open orders.
         """
-        params = {"account": self.public_key, "subAccountId": self.subaccount_id}
+        return self._typed(models.Order, self._fetch_open_orders(symbol, subaccount_id))
+
+    def _fetch_open_orders(self, symbol: str = None, subaccount_id: int = None) -> Any:
+        params = self._account_params(subaccount_id)
         if symbol is not None:
             params["symbol"] = symbol
         return self.send_message_to_endpoint("/v1/openOrders", "GET", params=params, authenticated=True)
 
-    def get_orders(self, symbol: str = None, ids: List[str] = None):
+    def get_orders(self, symbol: str = None, ids: List[str] = None, subaccount_id: int = None):
         """
         Get the open orders.
         """
-        params = {"account": self.public_key, "subAccountId": self.subaccount_id}
+        return self._typed(models.Order, self._fetch_orders(symbol, ids, subaccount_id))
+
+    def _fetch_orders(self, symbol: str = None, ids: List[str] = None, subaccount_id: int = None) -> Any:
+        params = self._account_params(subaccount_id)
 
         if ids is not None:
             params["ids"] = ids
         if symbol is not None:
             params["symbol"] = symbol
+        return self.send_message_to_endpoint("/v1/orders", "GET", params=params)
 
-        response = requests.get(
-            self.rest_url + "/v1/orders",
-            headers=self.authenticated_headers,
-            params=params,
-        )
-        if response.status_code != 200:
-            raise Exception(
-                f"Failed to get orders: {response.text} {response.status_code} " + f"{self.rest_url} {params}"
-            )
-        return response.json()
+    def _record_referral(self, response):
+        """
+        Remember a registered referral in the state so later logins, and clients sharing the state file, skip it.
+        """
+        if response.status_code == 200 or "user already referred" in response.text:
+            self.state.referred = True
 
     def set_referral_code(self):
         """
         Ensure sign a referral code.
         """
-        referral_payload = self.generate_and_sign_message(
-            Referral,
-            code=REFERRAL_CODE,
-            **self.get_shared_params(),
-        )
+        if self.state.referred:
+            return
+        referral_payload = self._referral_message()
         try:
-            requests.post(
+            response = self.http_client.request(
+                "POST",
                 self.rest_url + "/v1/referral/add-referee",
                 headers=self.authenticated_headers,
                 json=referral_payload,
             )
         except Exception as e:
             if "user already referred" in str(e):
+                self.state.referred = True
                 return
             raise e
+        self._record_referral(response)
 
     def deposit(self, subaccount_id: int, quantity: int, asset: str = "USDB"):
         """
         Deposit an asset.
         """
         # we need to check if we have sufficient balance to deposit
-        required_wei = int(Decimal(str(quantity)) * Decimal(1e18))
+        required_wei = to_wei(quantity)
         # we check the approvals
-        asset_contract = self.get_contract(asset)
+        txn = self._timed_phase("build_transaction", self._build_approval_transaction, asset, required_wei)
+        if txn is not None:
+            # we wait for the transaction to be mined
+            self.wait_for_transaction(self._timed_phase("send_transaction", self._send_transaction, txn))
+        txn = self._timed_phase(
+            "build_transaction", self._build_deposit_transaction, subaccount_id, asset, required_wei
+        )
+        return self.wait_for_transaction(self._timed_phase("send_transaction", self._send_transaction, txn))
+
+    def _timed_phase(self, phase: str, function: Callable[..., Any], *args) -> Any:
+        if self.metrics is None:
+            return function(*args)
+        started = time.perf_counter_ns()
+        try:
+            return function(*args)
+        finally:
+            self.metrics.observe(PHASE, phase, time.perf_counter_ns() - started)
 
+    def _build_approval_transaction(self, asset: str, required_wei: int):
+        """
+        Build the approval of the protocol contract for the asset, if the current allowance is too low.
+        """
+        asset_contract = self.get_contract(asset)
         approved_amount = asset_contract.functions.allowance(
             self.public_key, self.get_contract_address("PROTOCOL")
         ).call()
-        if approved_amount < required_wei:
-            txn = asset_contract.functions.approve(
-                self.get_contract_address("PROTOCOL"), required_wei
-            ).build_transaction(
-                {
-                    "from": self.public_key,
-                    "nonce": self.web3.eth.get_transaction_count(self.public_key),
-                }
-            )
-            signed_txn = self.wallet.sign_transaction(txn)
-            result = self.web3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            # we wait for the transaction to be mined
-            self.wait_for_transaction(result)
+        if approved_amount >= required_wei:
+            return None
+        return asset_contract.functions.approve(self.get_contract_address("PROTOCOL"), required_wei).build_transaction(
+            {
+                "from": self.public_key,
+                "nonce": self.web3.eth.get_transaction_count(self.public_key),
+            }
+        )
 
+    def _build_deposit_transaction(self, subaccount_id: int, asset: str, required_wei: int):
         protocol_contract = self.get_contract("PROTOCOL")
-        txn = protocol_contract.functions.deposit(
+        return protocol_contract.functions.deposit(
             self.public_key,
             subaccount_id,
             required_wei,
-            asset_contract.address,
+            self.get_contract_address(asset),
         ).build_transaction(
             {
                 "from": self.public_key,
                 "nonce": self.web3.eth.get_transaction_count(self.public_key),
             }
         )
+
+    def _send_transaction(self, txn):
         signed_txn = self.wallet.sign_transaction(txn)
-        result = self.web3.eth.send_raw_transaction(signed_txn.rawTransaction)
-        return self.wait_for_transaction(result)
+        return self.web3.eth.send_raw_transaction(signed_txn.rawTransaction)
+
+    def _get_transaction_receipt(self, txn_hash):
+        from web3.exceptions import TransactionNotFound  # pylint: disable=import-outside-toplevel
+
+        try:
+            return self.web3.eth.get_transaction_receipt(txn_hash)
+        except TransactionNotFound:
+            return None
 
     def wait_for_transaction(self, txn_hash, timeout=60):
+        started = time.perf_counter_ns()
         while True:
             if timeout == 0:
                 raise Exception("Timeout")
-            try:
-                receipt = self.web3.eth.get_transaction_receipt(txn_hash)
-                if receipt is not None:
-                    break
-            except TransactionNotFound:
-                time.sleep(1)
+            receipt = self._timed_phase("receipt", self._get_transaction_receipt, txn_hash)
+            if receipt is not None:
+                break
+            time.sleep(1)
             timeout -= 1
+        if self.metrics is not None:
+            self.metrics.observe(PHASE, "confirm", time.perf_counter_ns() - started)
         return receipt["status"] == 1
 
+    def close(self):
+        """
+        Save the state, close the connections held by the transport and the shared nonce counter.
+        """
+        if self.clock is not None:
+            self.clock.stop()
+        self.save_state()
+        self.nonces.close()
+        self.policies.close()
+        if self.transport is not None:
+            self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
     def get_contract_address(self, name: str):
         """
         Get the contract address for a specific asset.
         """
-        return self.web3.to_checksum_address(CONTRACTS[self.env][name])
+        return to_checksum_address(CONTRACTS[self.env][name])
 
     def get_contract(self, name: str):
         """
         Get the contract for a specific asset.
         """
         abis = {
-            "USDB": ERC_20_ABI,
-            "PROTOCOL": PROTOCOL_ABI,
+            "USDB": "erc20",
+            "PROTOCOL": "protocol",
         }
         return self.web3.eth.contract(
             address=self.get_contract_address(name),
-            abi=abis[name],
+            abi=get_abi(abis[name]),
         )
@@ -0,0 +1,213 @@
+"""
+Background synchronisation with the server clock.
+
+Every timestamp a client generates, the nonces, the expiration of the orders and the login timestamp, is the local
+wall clock corrected by the offset of the server clock, so no order waits for a round trip to the exchange. A
+`ClockSync` keeps that offset fresh: every `interval` seconds it sends a few `/v1/time` requests, each in a single
+attempt since a retried or hedged request does not time one round trip, takes the server time at the midpoint of
+the fastest round trip, which bounds the error by half of it, and feeds the sample into an
+alpha-beta filter smoothing the offset and estimating the drift of the local clock. Between samples the offset is
+extrapolated with the drift. Reading the offset takes no lock, the filter publishes its state as one tuple.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 30.0
+DEFAULT_SAMPLES = 3
+DEFAULT_ALPHA = 0.3
+DEFAULT_BETA = 0.05
+# samples closer together give a drift dominated by the noise of the round trips
+MIN_DRIFT_INTERVAL = 1.0
+# 500 ppm, far beyond the drift of a working clock
+MAX_DRIFT = 0.5
+
+
+def server_time_ms(response: Any) -> int:
+    return int(response["serverTime"] if isinstance(response, dict) else response)
+
+
+class ClockEstimate:
+    """
+    Smoothed offset of the server clock in ms and drift in ms per second of local time.
+    """
+
+    def __init__(self, offset: float = 0.0, alpha: float = DEFAULT_ALPHA, beta: float = DEFAULT_BETA):
+        self.alpha = alpha
+        self.beta = beta
+        self.samples = 0
+        self.rtt = None
+        # (offset, drift, local time of the offset in seconds)
+        self._state: Tuple[float, float, float] = (offset, 0.0, 0.0)
+
+    @property
+    def offset(self) -> float:
+        return self._state[0]
+
+    @property
+    def drift(self) -> float:
+        return self._state[1]
+
+    def offset_at(self, now: float) -> float:
+        offset, drift, updated = self._state
+        return offset + drift * (now - updated) if drift else offset
+
+    def update(self, server_time: int, sent: float, received: float) -> float:
+        """
+        Add a sample, the server time in ms answered to a request sent and received at local times in seconds.
+        """
+        midpoint = (sent + received) / 2
+        measured = server_time - midpoint * 1000
+        offset, drift, updated = self._state
+        if not self.samples:
+            offset, drift = measured, 0.0
+        else:
+            elapsed = midpoint - updated
+            predicted = offset + drift * elapsed
+            residual = measured - predicted
+            offset = predicted + self.alpha * residual
+            if elapsed >= MIN_DRIFT_INTERVAL:
+                drift = min(MAX_DRIFT, max(-MAX_DRIFT, drift + self.beta * residual / elapsed))
+        self._state = (offset, drift, midpoint)
+        self.samples += 1
+        self.rtt = received - sent
+        return offset
+
+
+def _fastest(samples):
+    return min(samples, key=lambda sample: sample[2] - sample[1])
+
+
+class ClockSync:
+    """
+    Keeps the clock offset of a client fresh from a daemon thread.
+    """
+
+    def __init__(
+        self,
+        client,
+        interval: float = DEFAULT_INTERVAL,
+        samples: int = DEFAULT_SAMPLES,
+        alpha: float = DEFAULT_ALPHA,
+        beta: float = DEFAULT_BETA,
+    ):
+        self.client = client
+        self.interval = interval
+        self.samples = max(1, samples)
+        self.estimate = ClockEstimate(client.clock_offset, alpha, beta)
+        self.failures = 0
+        self._synced = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def offset_at(self, now: float) -> float:
+        return self.estimate.offset_at(now)
+
+    def sync(self) -> float:
+        """
+        Sample the server clock now, returns the new offset.
+        """
+        samples = []
+        for _ in range(self.samples):
+            sent = time.time()
+            response = self.client._sample_server_time()
+            samples.append((server_time_ms(response), sent, time.time()))
+        offset = self.client._clock_offset_from(*_fastest(samples))
+        self._synced.set()
+        return offset
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception:  # pylint: disable=broad-except
+                self.failures += 1
+                logger.warning("Clock sync failed, keeping an offset of %.1f ms", self.estimate.offset, exc_info=True)
+            self._stop.wait(self.interval)
+
+    def wait_synced(self, timeout: float = None) -> bool:
+        return self._synced.wait(timeout)
+
+    def start(self) -> "ClockSync":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="hundred-x-clock", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "ClockSync":
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+class AsyncClockSync(ClockSync):
+    """
+    Keeps the clock offset of an async client fresh from a task on the event loop.
+    """
+
+    def __init__(self, client, **kwargs):
+        super().__init__(client, **kwargs)
+        self._synced = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def sync(self) -> float:
+        samples = []
+        for _ in range(self.samples):
+            sent = time.time()
+            response = await self.client._sample_server_time()
+            samples.append((server_time_ms(response), sent, time.time()))
+        offset = self.client._clock_offset_from(*_fastest(samples))
+        self._synced.set()
+        return offset
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception:  # pylint: disable=broad-except
+                self.failures += 1
+                logger.warning("Clock sync failed, keeping an offset of %.1f ms", self.estimate.offset, exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def wait_synced(self, timeout: float = None) -> bool:
+        try:
+            await asyncio.wait_for(self._synced.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def __enter__(self):
+        raise TypeError("Use async with on an AsyncClockSync")
+
+    def start(self) -> "AsyncClockSync":
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def __aenter__(self) -> "AsyncClockSync":
+        return self.start()
+
+    async def __aexit__(self, *args):
+        await self.stop()
@@ -55,3 +55,48 @@ class OrderSide(Enum):
 
     BUY = True
     SELL = False
+
+
+class Channel(Enum):
+    """
+    Enum for the websocket market data channels.
+    """
+
+    TICKER = "ticker"
+    DEPTH = "depth"
+    TRADE = "trade"
+    KLINE = "kline"
+
+
+class LoginMode(Enum):
+    """
+    Enum for when the client opens its session with the exchange.
+    """
+
+    EAGER = "eager"
+    LAZY = "lazy"
+    BACKGROUND = "background"
+
+
+class Rounding(Enum):
+    """
+    Enum for how prices and quantities off the product increments are handled.
+    """
+
+    REJECT = "reject"
+    NEAREST = "nearest"
+    DOWN = "down"
+    UP = "up"
+    # buy prices are rounded down and sell prices up, so the order never becomes more aggressive
+    PASSIVE = "passive"
+
+
+class RequestClass(Enum):
+    """
+    Enum for the rate limit classes of the REST requests, lower values are served first.
+    """
+
+    CANCEL = 0
+    ORDER_ENTRY = 1
+    ACCOUNT = 2
+    MARKET_DATA = 3
@@ -13,3 +13,113 @@ class ClientError(Exception):
     """
     Exception raised when there is an error with the client.
     """
+
+
+class OrderValidationError(UserInputValidationError):
+    """
+    Exception raised when an order fails the local checks made before signing.
+    """
+
+    def __init__(self, message: str, field: str = None, value=None):
+        super().__init__(message)
+        self.field = field
+        self.value = value
+
+
+class InvalidPriceError(OrderValidationError):
+    """
+    Exception raised when a price is not positive or not a multiple of the tick size.
+    """
+
+
+class InvalidQuantityError(OrderValidationError):
+    """
+    Exception raised when a quantity is off the lot size or outside the allowed range.
+    """
+
+
+class MinNotionalError(OrderValidationError):
+    """
+    Exception raised when the notional value of an order is below the product minimum.
+    """
+
+
+class ExpirationError(OrderValidationError):
+    """
+    Exception raised when an expiration is in the past or too far in the future.
+    """
+
+
+class FieldRangeError(OrderValidationError, OverflowError):
+    """
+    Exception raised when a value does not fit the width of its EIP-712 field.
+    """
+
+
+class ApiError(ClientError):
+    """
+    Exception raised when a request to the REST API fails, `retryable` tells whether sending it again may succeed.
+    """
+
+    retryable = False
+
+    def __init__(self, message: str, status_code: int = None, method: str = None, url: str = None, text: str = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.method = method
+        self.url = url
+        self.text = text
+
+
+class BadRequestError(ApiError):
+    """
+    Exception raised when the exchange rejects a request, e.g. an order that would cross or a used nonce.
+    """
+
+
+class AuthenticationError(ApiError):
+    """
+    Exception raised when the session or the signature of a request is not accepted.
+    """
+
+
+class NotFoundError(ApiError):
+    """
+    Exception raised when the requested resource does not exist.
+    """
+
+
+class RateLimitError(ApiError):
+    """
+    Exception raised when the exchange throttles the client, `retry_after` is the delay it asked for in seconds.
+    """
+
+    retryable = True
+
+    def __init__(self, *args, retry_after: float = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retry_after = retry_after
+
+
+class ServerError(ApiError):
+    """
+    Exception raised when the exchange fails to handle a request.
+    """
+
+    retryable = True
+
+
+class RequestTimeoutError(ApiError, TimeoutError):
+    """
+    Exception raised when the exchange does not answer within the timeout.
+    """
+
+    retryable = True
+
+
+class ConnectionFailedError(ApiError, ConnectionError):
+    """
+    Exception raised when the exchange cannot be reached.
+    """
+
+    retryable = True
@@ -0,0 +1,122 @@
+"""
+Conversions between decimal amounts and the 1e18 scaled integers used by the exchange.
+
+Scalars are converted exactly from their decimal text, floats through their shortest repr and strings digit by digit
+so that amounts with more than 28 significant digits are not rounded by the decimal context. Whole columns, such as
+the levels of a depth ladder, the quantities of a position list or a kline column, are converted in one pass into
+`array` columns of int64 units of 1 / scale or of floats.
+"""
+
+from array import array
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Sequence, Tuple, Union
+
+DECIMALS = 18
+WEI = 10**DECIMALS
+DEFAULT_SCALE = 10**9
+
+Number = Union[int, float, str, Decimal]
+
+
+def to_wei(value: Number) -> int:
+    """
+    Scale an amount by 1e18, digits past the 18th decimal are truncated towards zero.
+    """
+    if isinstance(value, int):
+        return value * WEI
+    if isinstance(value, float):
+        # the shortest repr of a float has at most 17 digits, so scaling it stays exact in the default context
+        return int(Decimal(repr(value)).scaleb(DECIMALS))
+    text = str(value)
+    whole, _, fraction = text.partition(".")
+    try:
+        if fraction and not fraction.isdigit():
+            raise ValueError(text)
+        wei = abs(int(whole)) * WEI + int(fraction[:DECIMALS].ljust(DECIMALS, "0"))
+    except ValueError:
+        # scientific notation, a missing integer part, nan and inf are left to `Decimal`
+        try:
+            return int(Decimal(text) * WEI)
+        except InvalidOperation as error:
+            raise ValueError(f"Invalid amount: {value!r}") from error
+    return -wei if text.lstrip()[:1] == "-" else wei
+
+
+def to_decimal(wei: Union[int, str]) -> Decimal:
+    """
+    Exact decimal value of a 1e18 scaled amount.
+    """
+    return Decimal(int(wei)).scaleb(-DECIMALS)
+
+
+def to_float(wei: Union[int, str]) -> float:
+    """
+    Nearest float to a 1e18 scaled amount.
+    """
+    return int(wei) / WEI
+
+
+def format_wei(wei: Union[int, str]) -> str:
+    """
+    Decimal text of a 1e18 scaled amount, without trailing zeros.
+    """
+    wei = int(wei)
+    whole, fraction = divmod(abs(wei), WEI)
+    text = f"{whole}.{fraction:018d}".rstrip("0").rstrip(".") if fraction else str(whole)
+    return f"-{text}" if wei < 0 else text
+
+
+def to_wei_many(values: Iterable[Number]) -> List[int]:
+    """
+    Scale many amounts by 1e18.
+    """
+    return [to_wei(value) for value in values]
+
+
+def _divisor(scale: int) -> int:
+    if scale <= 0 or WEI % scale:
+        raise ValueError(f"Scale must divide 1e18 exactly. It is instead: {scale}")
+    return WEI // scale
+
+
+def _units(values: Iterable[Union[int, str]], divisor: int) -> array:
+    # `//` floors, negative amounts are truncated towards zero like `to_wei` does
+    return array("q", [wei // divisor if wei >= 0 else -(-wei // divisor) for wei in map(int, values)])
+
+
+def to_units(values: Iterable[Union[int, str]], scale: int = DEFAULT_SCALE) -> array:
+    """
+    Convert 1e18 scaled integers or integer strings into an int64 column in units of 1 / scale, truncated towards
+    zero.
+    """
+    return _units(values, _divisor(scale))
+
+
+def to_floats(values: Iterable[Union[int, str]]) -> array:
+    """
+    Convert 1e18 scaled integers or integer strings into a float column.
+    """
+    return array("d", [int(value) / WEI for value in values])
+
+
+def ladder_to_units(levels: Iterable[Sequence[Any]], scale: int = DEFAULT_SCALE) -> Tuple[array, array]:
+    """
+    Split a depth ladder of [price, quantity, ...] levels into price and quantity columns in units of 1 / scale.
+    """
+    divisor = _divisor(scale)
+    levels = levels if isinstance(levels, list) else list(levels)
+    return (
+        _units([level[0] for level in levels], divisor),
+        _units([level[1] for level in levels], divisor),
+    )
+
+
+def columns(rows: Iterable[Dict[str, Any]], keys: Sequence[str], scale: int = None) -> Dict[str, array]:
+    """
+    Gather 1e18 scaled fields of many rows, e.g. positions or klines, into one column per key.
+
+    Columns are floats by default and int64 units of 1 / scale when a scale is given.
+    """
+    rows = rows if isinstance(rows, list) else list(rows)
+    convert = to_floats if scale is None else lambda values: to_units(values, scale)
+    return {key: convert([row[key] for row in rows]) for key in keys}
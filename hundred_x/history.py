@@ -0,0 +1,394 @@
+"""
+Candlestick history downloaded page by page and kept in a local columnar cache.
+
+A time range is split into pages of `page_limit` candles which are fetched concurrently under a rate limit, then
+stitched and deduplicated into columns of open times and floats. With a cache directory every (symbol, interval)
+is stored as one file per column and memory-mapped on read, later requests only fetch what is missing before the
+cached range and the tail after it. The last cached candle may still have been open when it was fetched, so the
+tail is refetched from its open time.
+
+Column files are extended in place or replaced, never truncated. The number of valid rows is kept in a small json
+file written after the columns, so readers holding a mapping of a previous version never see a file shrink under
+them.
+"""
+
+import asyncio
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from hundred_x.exceptions import ClientError, UserInputValidationError
+from hundred_x.fixed_point import WEI
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+INTERVALS = {
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "30m": 1_800_000,
+    "1h": 3_600_000,
+    "4h": 14_400_000,
+    "1d": 86_400_000,
+}
+DEFAULT_PAGE_LIMIT = 500
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_RATE_LIMIT = 10.0
+
+# column name, array typecode and key in the `/v1/uiKlines` payload
+COLUMNS = (
+    ("open_time", "q", "openTime"),
+    ("open", "d", "open"),
+    ("high", "d", "high"),
+    ("low", "d", "low"),
+    ("close", "d", "close"),
+    ("volume", "d", "volume"),
+)
+
+Range = Tuple[int, int]
+
+
+class Candles:
+    """
+    Candles as columns sorted by open time, prices and volume are floats.
+
+    The columns are arrays or memoryviews over the cache files, both expose the buffer protocol so
+    e.g. `numpy.frombuffer(candles.close)` wraps them without a copy.
+    """
+
+    __slots__ = tuple(name for name, _, _ in COLUMNS)
+
+    def __init__(self, open_time, open, high, low, close, volume):  # pylint: disable=redefined-builtin
+        self.open_time = open_time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def empty(cls) -> "Candles":
+        return cls(*(array(typecode) for _, typecode, _ in COLUMNS))
+
+    @classmethod
+    def from_klines(cls, klines: List[Dict[str, Any]]) -> "Candles":
+        """
+        Build the columns from `/v1/uiKlines` entries, later entries replace earlier ones with the same open time.
+        """
+        rows = sorted({int(kline["openTime"]): kline for kline in klines}.items())
+        columns = [array("q", [open_time for open_time, _ in rows])]
+        for _, typecode, key in COLUMNS[1:]:
+            columns.append(array(typecode, [int(kline[key]) / WEI for _, kline in rows]))
+        return cls(*columns)
+
+    def columns(self) -> List[Sequence]:
+        return [getattr(self, name) for name in self.__slots__]
+
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+    def between(self, start_time: int, end_time: int) -> "Candles":
+        """
+        Candles opened in [start_time, end_time).
+        """
+        first = bisect_left(self.open_time, start_time)
+        last = bisect_left(self.open_time, end_time, first)
+        return Candles(*(column[first:last] for column in self.columns()))
+
+    def merge(self, newer: "Candles") -> "Candles":
+        """
+        Union of two sets of candles, the newer ones win on equal open times.
+        """
+        rows = {row[0]: row for row in zip(*self.columns())}
+        rows.update((row[0], row) for row in zip(*newer.columns()))
+        ordered = [rows[open_time] for open_time in sorted(rows)]
+        return Candles(
+            *(array(typecode, [row[index] for row in ordered]) for index, (_, typecode, _) in enumerate(COLUMNS))
+        )
+
+
+class KlineCache:
+    """
+    Memory-mapped column files per (symbol, interval) under a directory, updated under an exclusive lock.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+
+    def path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.directory, f"{symbol.lower()}-{interval}")
+
+    @contextmanager
+    def locked(self, symbol: str, interval: str):
+        path = self.path(symbol, interval)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, ".lock"), "a", encoding="utf-8") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield path
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read_meta(path: str) -> Optional[Dict[str, int]]:
+        try:
+            with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_meta(path: str, meta: Dict[str, int]):
+        descriptor, temporary = tempfile.mkstemp(dir=path, prefix=".meta-", suffix=".tmp")
+        with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, os.path.join(path, "meta.json"))
+
+    def meta(self, symbol: str, interval: str) -> Optional[Dict[str, int]]:
+        """
+        Covered range and row count of the cache, None when nothing is cached.
+        """
+        return self._read_meta(self.path(symbol, interval))
+
+    @staticmethod
+    def _map(path: str, name: str, typecode: str, count: int) -> Sequence:
+        if not count:
+            return array(typecode)
+        with open(os.path.join(path, f"{name}.{typecode}"), "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(mapped).cast(typecode)[:count]
+
+    def _load(self, path: str, meta: Optional[Dict[str, int]]) -> Candles:
+        count = meta["count"] if meta else 0
+        return Candles(*(self._map(path, name, typecode, count) for name, typecode, _ in COLUMNS))
+
+    def load(self, symbol: str, interval: str) -> Candles:
+        """
+        Memory-map the cached candles.
+        """
+        with self.locked(symbol, interval) as path:
+            return self._load(path, self._read_meta(path))
+
+    @staticmethod
+    def _rewrite(path: str, candles: Candles):
+        for (name, typecode, _), column in zip(COLUMNS, candles.columns()):
+            descriptor, temporary = tempfile.mkstemp(dir=path, prefix=f".{name}-", suffix=".tmp")
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(bytes(column))
+                f.flush()
+                os.fsync(f.fileno())
+            # replaced rather than truncated, mappings of the old file stay valid
+            os.replace(temporary, os.path.join(path, f"{name}.{typecode}"))
+
+    @staticmethod
+    def _write_at(path: str, candles: Candles, row: int):
+        for (name, typecode, _), column in zip(COLUMNS, candles.columns()):
+            with open(os.path.join(path, f"{name}.{typecode}"), "r+b") as f:
+                f.seek(row * column.itemsize)
+                f.write(bytes(column))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def store(self, symbol: str, interval: str, candles: Candles, covered: Range) -> Candles:
+        """
+        Merge candles downloaded for the covered [start, end) range into the cache and map the result.
+
+        A range extending the cached one at the tail is written in place, anything else rewrites the files.
+        """
+        start, end = covered
+        with self.locked(symbol, interval) as path:
+            meta = self._read_meta(path)
+            if meta is None or end < meta["start"] or start > meta["end"]:
+                self._rewrite(path, candles)
+                meta = {"start": start, "end": end, "count": len(candles)}
+            elif meta["start"] <= start and end >= meta["end"]:
+                cached = self._load(path, meta)
+                row = bisect_left(cached.open_time, start)
+                self._write_at(path, candles, row)
+                meta = {"start": meta["start"], "end": end, "count": row + len(candles)}
+            else:
+                merged = self._load(path, meta).merge(candles)
+                self._rewrite(path, merged)
+                meta = {"start": min(start, meta["start"]), "end": max(end, meta["end"]), "count": len(merged)}
+            self._write_meta(path, meta)
+            return self._load(path, meta)
+
+
+class RateLimiter:
+    """
+    Spaces requests evenly at `rate` per second, shared by threads and coroutines.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE_LIMIT):
+        self.interval = 1 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        """
+        Reserve the next slot, returning how long to wait for it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+            return start - now
+
+    def wait(self):
+        time.sleep(self.delay())
+
+    async def wait_async(self):
+        await asyncio.sleep(self.delay())
+
+
+def interval_ms(interval: str) -> int:
+    try:
+        return INTERVALS[interval]
+    except KeyError as error:
+        raise UserInputValidationError(f"Unknown interval: {interval} Not in {list(INTERVALS)}") from error
+
+
+def pages(start_time: int, end_time: int, width: int, page_limit: int = DEFAULT_PAGE_LIMIT) -> List[Range]:
+    """
+    Split [start_time, end_time) into ranges of at most `page_limit` candles.
+    """
+    span = width * page_limit
+    return [(start, min(start + span, end_time)) for start in range(start_time, end_time, span)]
+
+
+def missing(meta: Optional[Dict[str, int]], start_time: int, end_time: int, width: int) -> List[Range]:
+    """
+    Ranges to download so that the cache covers [start_time, end_time), each one touching the cached range.
+    """
+    if meta is None:
+        return [(start_time, end_time)]
+    ranges = []
+    if start_time < meta["start"]:
+        ranges.append((start_time, meta["start"]))
+    if end_time > meta["end"]:
+        # the candle open at the end of the previous download is fetched again
+        ranges.append((meta["end"] - meta["end"] % width, end_time))
+    return ranges
+
+
+class KlineHistory:
+    """
+    Candlestick history of a client, optionally cached under `cache_dir`.
+    """
+
+    def __init__(
+        self,
+        client,
+        cache_dir: str = None,
+        page_limit: int = DEFAULT_PAGE_LIMIT,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        rate_limit: float = DEFAULT_RATE_LIMIT,
+    ):
+        self.client = client
+        self.cache = KlineCache(cache_dir) if cache_dir else None
+        self.page_limit = page_limit
+        self.max_in_flight = max_in_flight
+        self.limiter = RateLimiter(rate_limit)
+
+    def _bounds(self, interval: str, start_time: int, end_time: Optional[int]) -> Tuple[int, int, int]:
+        width = interval_ms(interval)
+        now = self.client._current_timestamp()  # pylint: disable=protected-access
+        end_time = now if end_time is None else min(end_time, now)
+        return width, start_time - start_time % width, end_time
+
+    def _params(self, interval: str, page: Range) -> Dict[str, Any]:
+        return {
+            "interval": interval,
+            "start_time": page[0],
+            "end_time": page[1] - 1,
+            "limit": self.page_limit,
+        }
+
+    @staticmethod
+    def _klines(response: Any) -> List[Dict[str, Any]]:
+        if not isinstance(response, list):
+            raise ClientError(f"Unexpected candlestick response: {response}")
+        return response
+
+    def _fetch_page(self, symbol: str, interval: str, page: Range) -> List[Dict[str, Any]]:
+        self.limiter.wait()
+        return self._klines(self.client.get_candlestick(symbol, **self._params(interval, page)))
+
+    def fetch(self, symbol: str, interval: str, start_time: int, end_time: int) -> Candles:
+        """
+        Download the candles opened in [start_time, end_time) page by page, bypassing the cache.
+        """
+        ranges = pages(start_time, end_time, interval_ms(interval), self.page_limit)
+        if len(ranges) < 2 or self.max_in_flight < 2:
+            results = [self._fetch_page(symbol, interval, page) for page in ranges]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(ranges))) as executor:
+                results = list(executor.map(lambda page: self._fetch_page(symbol, interval, page), ranges))
+        klines = [kline for klines in results for kline in klines]
+        return Candles.from_klines(klines).between(start_time, end_time)
+
+    def get(self, symbol: str, interval: str, start_time: int, end_time: int = None) -> Candles:
+        """
+        Candles opened in [start_time, end_time) in ms, end_time defaults to now.
+        """
+        width, start_time, end_time = self._bounds(interval, start_time, end_time)
+        if self.cache is None:
+            return self.fetch(symbol, interval, start_time, end_time)
+        candles = None
+        for covered in missing(self.cache.meta(symbol, interval), start_time, end_time, width):
+            candles = self.cache.store(symbol, interval, self.fetch(symbol, interval, *covered), covered)
+        if candles is None:
+            candles = self.cache.load(symbol, interval)
+        return candles.between(start_time, end_time)
+
+
+class AsyncKlineHistory(KlineHistory):
+    """
+    Candlestick history of an asynchronous client, pages are fetched concurrently on the event loop.
+    """
+
+    async def _fetch_page_async(self, symbol: str, interval: str, page: Range, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            await self.limiter.wait_async()
+            return self._klines(await self.client.get_candlestick(symbol, **self._params(interval, page)))
+
+    async def fetch(self, symbol: str, interval: str, start_time: int, end_time: int) -> Candles:
+        """
+        Download the candles opened in [start_time, end_time) page by page, bypassing the cache.
+        """
+        semaphore = asyncio.Semaphore(max(self.max_in_flight, 1))
+        ranges = pages(start_time, end_time, interval_ms(interval), self.page_limit)
+        results = await asyncio.gather(*(self._fetch_page_async(symbol, interval, page, semaphore) for page in ranges))
+        klines = [kline for klines in results for kline in klines]
+        return Candles.from_klines(klines).between(start_time, end_time)
+
+    async def get(self, symbol: str, interval: str, start_time: int, end_time: int = None) -> Candles:
+        """
+        Candles opened in [start_time, end_time) in ms, end_time defaults to now.
+        """
+        width, start_time, end_time = self._bounds(interval, start_time, end_time)
+        if self.cache is None:
+            return await self.fetch(symbol, interval, start_time, end_time)
+        candles = None
+        meta = await asyncio.to_thread(self.cache.meta, symbol, interval)
+        for covered in missing(meta, start_time, end_time, width):
+            fetched = await self.fetch(symbol, interval, *covered)
+            candles = await asyncio.to_thread(self.cache.store, symbol, interval, fetched, covered)
+        if candles is None:
+            candles = await asyncio.to_thread(self.cache.load, symbol, interval)
+        return candles.between(start_time, end_time)
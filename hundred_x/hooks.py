@@ -0,0 +1,174 @@
+"""
+Hooks around the lifecycle of the signed messages and the REST requests.
+
+A client calls its hooks before and after a message is signed, before a request is handed to the transport, once
+its response is received and when a signature or a request fails. Every call gets a `HookEvent` with the endpoint,
+the nonce, the payload size and monotonic timestamps in nanoseconds, plus the wall clock time corrected by the
+server clock offset to line events up with the timestamps of the exchange. The before and after calls of one step
+share the same event, so a hook can keep e.g. a span in `event.context`, and a hook that keeps events should copy
+them. Hooks run inline on the hot path, so they should hand anything slow off to another thread. A failing hook is
+logged and does not fail the request. Without hooks the client skips all of it.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import pstats
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+BEFORE_SIGN = "before_sign"
+AFTER_SIGN = "after_sign"
+BEFORE_SEND = "before_send"
+AFTER_RECEIVE = "after_receive"
+ON_ERROR = "on_error"
+STAGES = (BEFORE_SIGN, AFTER_SIGN, BEFORE_SEND, AFTER_RECEIVE, ON_ERROR)
+
+
+@dataclass
+class HookEvent:
+    """
+    One step of a message or a request, `started` and `timestamp` are `time.monotonic_ns()` values.
+
+    `started` is when the step began and `timestamp` when the hook was called, their difference is the time taken
+    by the step in the after and error hooks. `wall_time` is the corrected wall clock time in ms.
+    """
+
+    stage: str
+    method: Optional[str] = None
+    endpoint: Optional[str] = None
+    message_type: Optional[str] = None
+    nonce: Optional[int] = None
+    payload_size: int = 0
+    count: int = 1
+    started: int = 0
+    timestamp: int = 0
+    wall_time: int = 0
+    status_code: Optional[int] = None
+    error: Optional[BaseException] = None
+    context: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def elapsed(self) -> int:
+        return self.timestamp - self.started
+
+    def copy(self) -> "HookEvent":
+        return replace(self, context=dict(self.context))
+
+
+class RequestHook:
+    """
+    Base of the hooks, every method does nothing so a hook only overrides the stages it needs.
+    """
+
+    def before_sign(self, event: HookEvent):
+        pass
+
+    def after_sign(self, event: HookEvent):
+        pass
+
+    def before_send(self, event: HookEvent):
+        pass
+
+    def after_receive(self, event: HookEvent):
+        pass
+
+    def on_error(self, event: HookEvent):
+        pass
+
+
+def payload_size(payload: Any) -> int:
+    """
+    Size in bytes of a payload encoded as json.
+    """
+    if not payload:
+        return 0
+    return len(json.dumps(payload, separators=(",", ":"), default=str))
+
+
+def emit(hooks: Iterable[RequestHook], stage: str, event: HookEvent, wall_time: int = 0):
+    """
+    Call the `stage` method of every hook, logging the hooks that fail.
+    """
+    event.stage = stage
+    event.timestamp = time.monotonic_ns()
+    event.wall_time = wall_time
+    for hook in hooks:
+        try:
+            getattr(hook, stage)(event)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Request hook %s failed on %s", hook, stage)
+
+
+class SamplingProfiler(RequestHook):
+    """
+    Profiles one signature out of `every` with cProfile, accumulating the samples into one set of statistics.
+
+    Only the signing path is profiled, toggle it with `enabled` while the client runs.
+    """
+
+    def __init__(self, every: int = 100, enabled: bool = True):
+        self.every = max(1, every)
+        self.enabled = enabled
+        self.samples = 0
+        self._seen = 0
+        self._lock = threading.Lock()
+        self._stats: Optional[pstats.Stats] = None
+        self._local = threading.local()
+
+    def before_sign(self, event: HookEvent):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._seen += 1
+            if self._seen % self.every:
+                return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # another profiler is active on this thread
+            return
+        self._local.profile = profile
+
+    def after_sign(self, event: HookEvent):
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            return
+        profile.disable()
+        self._local.profile = None
+        with self._lock:
+            self.samples += 1
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+
+    on_error = after_sign
+
+    def stats(self) -> Optional[pstats.Stats]:
+        with self._lock:
+            return self._stats
+
+    def report(self, limit: int = 20, sort: str = "cumulative") -> str:
+        """
+        The heaviest functions of the profiled signatures.
+        """
+        with self._lock:
+            if self._stats is None:
+                return ""
+            stream = io.StringIO()
+            self._stats.stream = stream
+            self._stats.sort_stats(sort).print_stats(limit)
+            return stream.getvalue()
+
+    def reset(self):
+        with self._lock:
+            self._stats = None
+            self.samples = 0
+            self._seen = 0
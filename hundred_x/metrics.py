@@ -0,0 +1,236 @@
+"""
+Latency histograms and counters of the client hot paths.
+
+Latencies are recorded in nanoseconds into log-linear histograms in the style of HdrHistogram: values are grouped
+by power of two and every power of two is split into `2 ** (PRECISION_BITS - 1)` buckets, so recording is a
+couple of integer operations and any percentile is reported within about 3% of the true value. A client records
+the total latency and the status codes of every endpoint, and the time spent in each phase of an order: building
+the message, EIP-712 encoding, ECDSA signing, payload encoding, the network round trip and parsing the response.
+Without a `Metrics` the client skips all of it.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Tuple
+
+PRECISION_BITS = 6
+# values up to 2 ** MAX_BITS ns, about 18 minutes, larger ones are counted in the last bucket
+MAX_BITS = 40
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+_HALF = 1 << (PRECISION_BITS - 1)
+_SIZE = (MAX_BITS - PRECISION_BITS + 2) * _HALF
+
+# histogram names
+REQUEST = "request"
+PHASE = "phase"
+# counter names
+STATUS = "status"
+ERROR = "error"
+
+
+def bucket_index(value: int) -> int:
+    if value < 1 << PRECISION_BITS:
+        return max(value, 0)
+    shift = value.bit_length() - PRECISION_BITS
+    return min(shift * _HALF + (value >> shift), _SIZE - 1)
+
+
+def bucket_value(index: int) -> int:
+    """
+    Lowest value counted in a bucket.
+    """
+    if index < 1 << PRECISION_BITS:
+        return index
+    shift = index // _HALF - 1
+    return (index - shift * _HALF) << shift
+
+
+class Histogram:
+    """
+    Log-linear histogram of non negative integers, usually latencies in nanoseconds.
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * _SIZE
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self._lock = threading.Lock()
+
+    def record(self, value: int):
+        index = bucket_index(value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    def merge(self, other: "Histogram"):
+        with self._lock:
+            for index, count in enumerate(other.counts):
+                if count:
+                    self.counts[index] += count
+            self.count += other.count
+            self.total += other.total
+            if other.min is not None and (self.min is None or other.min < self.min):
+                self.min = other.min
+            self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> int:
+        """
+        Value below which a fraction `q` of the recorded values fall, within the precision of the buckets.
+        """
+        if not self.count:
+            return 0
+        rank = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(max(bucket_value(index), self.min), self.max)
+        return self.max
+
+    def snapshot(self, quantiles: Iterable[float] = QUANTILES) -> Dict[str, float]:
+        with self._lock:
+            values = {
+                "count": self.count,
+                "sum": self.total,
+                "min": self.min or 0,
+                "max": self.max,
+                "mean": self.total / self.count if self.count else 0.0,
+            }
+            values.update({f"p{q * 100:g}": self.percentile(q) for q in quantiles})
+        return values
+
+
+class Metrics:
+    """
+    Histograms and counters by (name, label), e.g. ("request", "POST /v1/order") or ("phase", "sign").
+    """
+
+    def __init__(self, namespace: str = "hundred_x"):
+        self.namespace = namespace
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.counters: Dict[Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, label: str) -> Histogram:
+        key = (name, label)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+        return histogram
+
+    def observe(self, name: str, label: str, nanoseconds: int):
+        self.histogram(name, label).record(nanoseconds)
+
+    def increment(self, name: str, label: str, value: str, amount: int = 1):
+        key = (name, label, str(value))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Histograms as {name: {label: statistics}} in nanoseconds and counters as {name: {label: {value: count}}}.
+        """
+        histograms: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for (name, label), histogram in list(self.histograms.items()):
+            histograms.setdefault(name, {})[label] = histogram.snapshot()
+        counters: Dict[str, Dict[str, Dict[str, int]]] = {}
+        with self._lock:
+            items = list(self.counters.items())
+        for (name, label, value), count in items:
+            counters.setdefault(name, {}).setdefault(label, {})[value] = count
+        return {"histograms": histograms, "counters": counters}
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def prometheus(self) -> str:
+        """
+        The metrics in the Prometheus text exposition format, histograms as summaries in seconds.
+        """
+        lines: List[str] = []
+        snapshot = self.snapshot()
+        for name, labels in sorted(snapshot["histograms"].items()):
+            metric = f"{self.namespace}_{name}_latency_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for label, values in sorted(labels.items()):
+                tag = f'{_label_name(name)}="{_escape(label)}"'
+                for q in QUANTILES:
+                    lines.append(f'{metric}{{{tag},quantile="{q:g}"}} {values[f"p{q * 100:g}"] / 1e9:.9f}')
+                lines.append(f"{metric}_sum{{{tag}}} {values['sum'] / 1e9:.9f}")
+                lines.append(f"{metric}_count{{{tag}}} {values['count']}")
+        for name, labels in sorted(snapshot["counters"].items()):
+            metric = f"{self.namespace}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for label, values in sorted(labels.items()):
+                for value, count in sorted(values.items()):
+                    lines.append(f'{metric}{{endpoint="{_escape(label)}",{name}="{_escape(value)}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _label_name(name: str) -> str:
+    return "endpoint" if name == REQUEST else name
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PrometheusExporter:
+    """
+    Serves `Metrics.prometheus()` on `/metrics` from a background thread.
+    """
+
+    def __init__(self, metrics: Metrics, host: str = "127.0.0.1", port: int = 0):
+        exporter_metrics = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # pylint: disable=invalid-name
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter_metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.metrics = metrics
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> "PrometheusExporter":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="hundred_x-metrics")
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "PrometheusExporter":
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
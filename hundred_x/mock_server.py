@@ -0,0 +1,797 @@
+"""
+Local stand-in for the exchange REST API, for offline tests and load testing.
+
+The server implements the endpoints of `HundredXClient`: session login through the cookie, EIP-712 signature
+verification of every signed message, an in-memory order book per product with price-time matching, and
+configurable latency and error injection. Websocket streams are not served.
+
+    python -m hundred_x.mock_server --port 8080 --latency 0.001 --error-rate 0.01
+
+    with MockServer() as server:
+        client = HundredXClient(private_key=key, **server.client_kwargs())
+"""
+
+import argparse
+import json
+import random
+import secrets
+import threading
+import time
+from bisect import insort
+from collections import defaultdict, deque
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from eip712_structs import make_domain
+
+from hundred_x.constants import CONTRACTS, LOGIN_MESSAGE
+from hundred_x.eip_712 import CancelOrder, CancelOrders, LoginMessage, Order, Referral, Withdraw
+from hundred_x.enums import Environment, OrderType, TimeInForce
+from hundred_x.signing import EIP712Verifier
+from hundred_x.validation import EXPIRATION_SCALE
+
+WEI = 10**18
+DEFAULT_BALANCE = 1_000_000 * WEI
+TRADE_HISTORY_SIZE = 10000
+INTERVALS = {"1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "4h": 14400, "1d": 86400}
+
+DEFAULT_PRODUCTS = [
+    {
+        "id": 1001,
+        "symbol": "btcperp",
+        "baseAsset": "BTC",
+        "increment": WEI // 10,
+        "quantityIncrement": WEI // 1000,
+        "minQuantity": WEI // 1000,
+    },
+    {
+        "id": 1002,
+        "symbol": "ethperp",
+        "baseAsset": "ETH",
+        "increment": WEI // 100,
+        "quantityIncrement": WEI // 1000,
+        "minQuantity": WEI // 1000,
+    },
+    {
+        "id": 1006,
+        "symbol": "blastperp",
+        "baseAsset": "BLAST",
+        "increment": WEI // 10**6,
+        "quantityIncrement": WEI,
+        "minQuantity": WEI,
+    },
+]
+
+Response = Tuple[int, Any]
+Entry = Tuple[int, int, Dict[str, Any]]
+
+
+class MockError(Exception):
+    """
+    Error returned to the client with an http status.
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ProductBook:
+    """
+    Price-time priority book of resting orders for a single product.
+
+    Each side is a sorted list of (key, sequence, order) with bid keys negated, so the head of the list is
+    always the best resting order.
+    """
+
+    def __init__(self, product: Dict[str, Any]):
+        self.product = product
+        self.bids: List[Entry] = []
+        self.asks: List[Entry] = []
+        self.trades: deque = deque(maxlen=TRADE_HISTORY_SIZE)
+        self.update_id = 0
+
+    def side(self, is_buy: bool) -> List[Entry]:
+        return self.bids if is_buy else self.asks
+
+    def levels(self, is_buy: bool, limit: int = None) -> List[List[str]]:
+        """
+        Aggregated (price, quantity) levels from the best price outwards.
+        """
+        levels: List[List[int]] = []
+        for key, _, order in self.side(is_buy):
+            price = -key if is_buy else key
+            if levels and levels[-1][0] == price:
+                levels[-1][1] += order["residual"]
+                continue
+            if limit is not None and len(levels) == limit:
+                break
+            levels.append([price, order["residual"]])
+        return [[str(price), str(quantity)] for price, quantity in levels]
+
+
+class MockExchange:
+    """
+    In-memory exchange state and the handlers of the REST endpoints.
+
+    Signatures are checked before the state lock is taken, so concurrent requests only serialise on the
+    book updates.
+    """
+
+    def __init__(
+        self,
+        env: Environment = Environment.DEVNET,
+        products: List[Dict[str, Any]] = None,
+        initial_balance: int = DEFAULT_BALANCE,
+        reject_duplicate_nonces: bool = True,
+    ):
+        self.env = env
+        self.verifier = EIP712Verifier(
+            make_domain(
+                name="100x",
+                version="0.0.0",
+                chainId=CONTRACTS[env]["CHAIN_ID"],
+                verifyingContract=CONTRACTS[env]["VERIFYING_CONTRACT"],
+            )
+        )
+        self.initial_balance = initial_balance
+        self.reject_duplicate_nonces = reject_duplicate_nonces
+        self.lock = threading.Lock()
+        self.products: Dict[int, Dict[str, Any]] = {}
+        self.books: Dict[int, ProductBook] = {}
+        for product in products or DEFAULT_PRODUCTS:
+            product = {"productType": "PERP", "quoteAsset": "USDB", "isActive": True, **product}
+            self.products[product["id"]] = product
+            self.books[product["id"]] = ProductBook(product)
+        self.symbols = {product["symbol"]: product["id"] for product in self.products.values()}
+        self.sessions: Dict[str, str] = {}
+        self.referred: set = set()
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.nonces: Dict[Tuple[str, int], set] = defaultdict(set)
+        self.balances: Dict[Tuple[str, int], int] = {}
+        self.positions: Dict[Tuple[str, int, int], Dict[str, int]] = {}
+        self.sequence = 0
+        self.trade_id = 0
+        self.routes: Dict[Tuple[str, str], Callable[..., Response]] = {
+            ("POST", "/v1/session/login"): self.login,
+            ("GET", "/v1/session/logout"): self.logout,
+            ("GET", "/v1/session/status"): self.session_status,
+            ("POST", "/v1/referral/add-referee"): self.add_referee,
+            ("POST", "/v1/withdraw"): self.withdraw,
+            ("POST", "/v1/order"): self.create_order,
+            ("DELETE", "/v1/order"): self.cancel_order,
+            ("POST", "/v1/order/cancel-and-replace"): self.cancel_and_replace_order,
+            ("GET", "/v1/openOrders"): self.open_orders,
+            ("DELETE", "/v1/openOrders"): self.cancel_all_orders,
+            ("GET", "/v1/orders"): self.all_orders,
+            ("GET", "/v1/balances"): self.spot_balances,
+            ("GET", "/v1/positionRisk"): self.position_risk,
+            ("GET", "/v1/approved-signers"): self.approved_signers,
+            ("GET", "/v1/products"): self.list_products,
+            ("GET", "/v1/ticker/24hr"): self.ticker,
+            ("GET", "/v1/trade-history"): self.trade_history,
+            ("GET", "/v1/time"): self.server_time,
+            ("GET", "/v1/uiKlines"): self.klines,
+            ("GET", "/v1/depth"): self.depth,
+        }
+
+    def handle(self, method: str, path: str, query: Dict[str, List[str]], body: Any, cookie: str) -> Response:
+        """
+        Dispatch a request, returning the http status and the json body.
+        """
+        handler = self.routes.get((method, path))
+        args: Tuple[Any, ...] = ()
+        if handler is None and method == "GET" and path.startswith("/v1/products/"):
+            handler, args = self.get_product, (path[len("/v1/products/") :],)
+        if handler is None:
+            return 404, {"error": f"Unknown endpoint: {method} {path}"}
+        try:
+            return 200, handler(*args, query=query, body=body or {}, cookie=cookie)
+        except MockError as error:
+            return error.status, {"error": error.message}
+        except (KeyError, TypeError, ValueError) as error:
+            return 400, {"error": f"Bad request: {error!r}"}
+
+    # helpers
+
+    def _verify(self, message_class, body: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        """
+        Decode a signed message and check that it was signed by its account, returning the values and digest.
+        """
+        values = {}
+        for name, member_type in message_class.get_members():
+            value = body.get(name)
+            if value is not None and member_type.type_name.startswith("uint"):
+                value = int(value)
+            values[name] = value
+        signature, account = body.get("signature"), values.get("account")
+        if not signature or not account:
+            raise MockError(400, "Missing account or signature.")
+        digest = self.verifier.digest(message_class, values)
+        try:
+            signer = self.verifier.recover_digest(digest, signature).to_canonical_address()
+        except Exception as error:  # pylint: disable=broad-except
+            raise MockError(400, f"Invalid signature: {error}") from error
+        if signer != bytes.fromhex(account[2:]):
+            raise MockError(401, f"Invalid signature: signed by 0x{signer.hex()} not {account}")
+        return values, digest
+
+    def _session(self, cookie: str) -> str:
+        account = self.sessions.get(cookie or "")
+        if account is None:
+            raise MockError(401, "Unauthorized: no valid session.")
+        return account
+
+    def _authorise(self, cookie: str, account: str) -> str:
+        session_account = self._session(cookie)
+        if account is None or account.lower() != session_account.lower():
+            raise MockError(403, f"Session of {session_account} cannot act for {account}.")
+        return session_account
+
+    def _query_account(self, query: Dict[str, List[str]], cookie: str) -> Tuple[str, int]:
+        account = self._authorise(cookie, query.get("account", [None])[0])
+        return account, int(query.get("subAccountId", ["0"])[0])
+
+    def _use_nonce(self, account: str, subaccount_id: int, nonce: int):
+        if not self.reject_duplicate_nonces:
+            return
+        used = self.nonces[(account, subaccount_id)]
+        if nonce in used:
+            raise MockError(400, f"Nonce {nonce} already used.")
+        used.add(nonce)
+
+    def _product(self, product_id: int = None, symbol: str = None) -> Dict[str, Any]:
+        if symbol is not None:
+            product_id = self.symbols.get(symbol)
+        product = self.products.get(product_id)
+        if product is None:
+            raise MockError(400, f"Unknown product: {symbol if symbol is not None else product_id}")
+        return product
+
+    def _balance(self, account: str, subaccount_id: int) -> int:
+        return self.balances.setdefault((account, subaccount_id), self.initial_balance)
+
+    @staticmethod
+    def _order_view(order: Dict[str, Any]) -> Dict[str, Any]:
+        view = {key: value for key, value in order.items() if key != "residual"}
+        for key in ("price", "quantity"):
+            view[key] = str(order[key])
+        view["residualQuantity"] = str(order["residual"])
+        return view
+
+    # session
+
+    def login(self, query, body, cookie) -> Dict[str, Any]:
+        values, _ = self._verify(LoginMessage, body)
+        if values["message"] != LOGIN_MESSAGE:
+            raise MockError(400, "Invalid login message.")
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.sessions[token] = values["account"]
+        return {"value": token, "account": values["account"]}
+
+    def logout(self, query, body, cookie) -> Dict[str, Any]:
+        with self.lock:
+            self._session(cookie)
+            self.sessions.pop(cookie)
+        return {"success": True}
+
+    def session_status(self, query, body, cookie) -> Dict[str, Any]:
+        return {"status": "active", "account": self._session(cookie)}
+
+    def add_referee(self, query, body, cookie) -> Dict[str, Any]:
+        values, _ = self._verify(Referral, body)
+        account = self._authorise(cookie, values["account"])
+        with self.lock:
+            if account in self.referred:
+                raise MockError(400, "user already referred")
+            self.referred.add(account)
+        return {"success": True, "code": values["code"]}
+
+    def withdraw(self, query, body, cookie) -> Dict[str, Any]:
+        values, _ = self._verify(Withdraw, body)
+        account = self._authorise(cookie, values["account"])
+        key = (account, values["subAccountId"])
+        with self.lock:
+            self._use_nonce(account, values["subAccountId"], values["nonce"])
+            if values["quantity"] > self._balance(*key):
+                raise MockError(400, "Insufficient balance.")
+            self.balances[key] -= values["quantity"]
+        return {"success": True}
+
+    # orders
+
+    def create_order(self, query, body, cookie) -> Dict[str, Any]:
+        values, digest = self._verify(Order, body)
+        account = self._authorise(cookie, values["account"])
+        order_id = "0x" + digest.hex()
+        with self.lock:
+            return self._order_view(self._place(account, order_id, values))
+
+    def _place(self, account: str, order_id: str, values: Dict[str, Any]) -> Dict[str, Any]:
+        product = self._product(values["productId"])
+        order_type = OrderType(values["orderType"])
+        time_in_force = TimeInForce(values["timeInForce"])
+        price, quantity = values["price"] or 0, values["quantity"]
+        if order_type not in (OrderType.LIMIT, OrderType.LIMIT_MAKER, OrderType.MARKET):
+            raise MockError(400, f"Unsupported order type: {order_type.name}")
+        if quantity % product["quantityIncrement"]:
+            raise MockError(400, f"Quantity {quantity} is not a multiple of {product['quantityIncrement']}.")
+        if quantity < product["minQuantity"]:
+            raise MockError(400, f"Quantity {quantity} is below the minimum of {product['minQuantity']}.")
+        if order_type is not OrderType.MARKET and (price <= 0 or price % product["increment"]):
+            raise MockError(400, f"Price {price} is not a multiple of {product['increment']}.")
+        if values["expiration"] // EXPIRATION_SCALE <= int(time.time() * 1000):
+            raise MockError(400, "Order expired.")
+        if order_id in self.orders:
+            raise MockError(400, f"Duplicate order: {order_id}")
+        self._use_nonce(account, values["subAccountId"], values["nonce"])
+
+        book = self.books[product["id"]]
+        is_buy = values["isBuy"]
+        resting = book.side(not is_buy)
+        crosses = bool(resting) and (
+            order_type is OrderType.MARKET or (resting[0][0] <= price if is_buy else -resting[0][0] >= price)
+        )
+        if order_type is OrderType.LIMIT_MAKER and crosses:
+            raise MockError(400, "Limit maker order would cross the book.")
+        if time_in_force is TimeInForce.FOK and self._fillable(book, is_buy, price, order_type) < quantity:
+            raise MockError(400, "Fill or kill order cannot be filled.")
+
+        self.sequence += 1
+        order = {
+            "id": order_id,
+            "account": account,
+            "subAccountId": values["subAccountId"],
+            "productId": product["id"],
+            "productSymbol": product["symbol"],
+            "isBuy": is_buy,
+            "orderType": order_type.value,
+            "timeInForce": time_in_force.value,
+            "expiration": values["expiration"],
+            "price": price,
+            "quantity": quantity,
+            "residual": quantity,
+            "nonce": values["nonce"],
+            "status": "OPEN",
+            "createdAt": int(time.time() * 1000),
+        }
+        self.orders[order_id] = order
+        if crosses:
+            self._match(book, order)
+        if order["residual"]:
+            if order_type is OrderType.MARKET or time_in_force is not TimeInForce.GTC:
+                order["status"] = "CANCELLED"
+            else:
+                insort(book.side(is_buy), (-price if is_buy else price, self.sequence, order))
+                book.update_id += 1
+        return order
+
+    @staticmethod
+    def _fillable(book: ProductBook, is_buy: bool, price: int, order_type: OrderType) -> int:
+        total = 0
+        for key, _, resting in book.side(not is_buy):
+            if order_type is not OrderType.MARKET and (key > price if is_buy else -key < price):
+                break
+            total += resting["residual"]
+        return total
+
+    def _match(self, book: ProductBook, order: Dict[str, Any]):
+        is_buy = order["isBuy"]
+        resting = book.side(not is_buy)
+        while order["residual"] and resting:
+            key, _, maker = resting[0]
+            maker_price = key if is_buy else -key
+            if order["orderType"] != OrderType.MARKET.value and (
+                maker_price > order["price"] if is_buy else maker_price < order["price"]
+            ):
+                break
+            quantity = min(order["residual"], maker["residual"])
+            for filled in (order, maker):
+                filled["residual"] -= quantity
+                filled["status"] = "FILLED" if not filled["residual"] else "PARTIALLY_FILLED"
+                self._fill_position(filled, maker_price, quantity)
+            if not maker["residual"]:
+                resting.pop(0)
+            self.trade_id += 1
+            book.trades.append(
+                {
+                    "id": self.trade_id,
+                    "symbol": book.product["symbol"],
+                    "price": str(maker_price),
+                    "quantity": str(quantity),
+                    "isBuyerMaker": not is_buy,
+                    "time": int(time.time() * 1000),
+                }
+            )
+        book.update_id += 1
+
+    def _fill_position(self, order: Dict[str, Any], price: int, quantity: int):
+        key = (order["account"], order["subAccountId"], order["productId"])
+        position = self.positions.setdefault(key, {"quantity": 0, "avgEntryPrice": 0})
+        signed = quantity if order["isBuy"] else -quantity
+        current = position["quantity"]
+        if current == 0 or (current > 0) == (signed > 0):
+            position["avgEntryPrice"] = (abs(current) * position["avgEntryPrice"] + quantity * price) // (
+                abs(current) + quantity
+            )
+        elif abs(signed) > abs(current):
+            position["avgEntryPrice"] = price
+        position["quantity"] = current + signed
+        if not position["quantity"]:
+            position["avgEntryPrice"] = 0
+
+    def _cancel(self, account: str, subaccount_id: int, product_id: int, order_id: str) -> Dict[str, Any]:
+        order = self.orders.get(order_id)
+        if order is None or (order["account"], order["subAccountId"], order["productId"]) != (
+            account,
+            subaccount_id,
+            product_id,
+        ):
+            raise MockError(400, f"Order not found: {order_id}")
+        if order["status"] not in ("OPEN", "PARTIALLY_FILLED"):
+            raise MockError(400, f"Order {order_id} is already {order['status']}.")
+        book = self.books[product_id]
+        side = book.side(order["isBuy"])
+        side.remove(next(entry for entry in side if entry[2] is order))
+        book.update_id += 1
+        order["status"] = "CANCELLED"
+        return order
+
+    def cancel_order(self, query, body, cookie) -> Dict[str, Any]:
+        values, _ = self._verify(CancelOrder, body)
+        account = self._authorise(cookie, values["account"])
+        with self.lock:
+            order = self._cancel(account, values["subAccountId"], values["productId"], values["orderId"])
+            return self._order_view(order)
+
+    def cancel_and_replace_order(self, query, body, cookie) -> Dict[str, Any]:
+        values, digest = self._verify(Order, body["newOrder"])
+        account = self._authorise(cookie, values["account"])
+        order_id = "0x" + digest.hex()
+        with self.lock:
+            self._cancel(account, values["subAccountId"], values["productId"], body["idToCancel"])
+            return self._order_view(self._place(account, order_id, values))
+
+    def cancel_all_orders(self, query, body, cookie) -> Dict[str, Any]:
+        values, _ = self._verify(CancelOrders, body)
+        account = self._authorise(cookie, values["account"])
+        with self.lock:
+            cancelled = [
+                self._cancel(account, values["subAccountId"], values["productId"], entry[2]["id"])["id"]
+                for side in (True, False)
+                for entry in list(self.books[self._product(values["productId"])["id"]].side(side))
+                if entry[2]["account"] == account and entry[2]["subAccountId"] == values["subAccountId"]
+            ]
+        return {"success": True, "cancelled": cancelled}
+
+    # account queries
+
+    def _account_orders(self, query, cookie, open_only: bool) -> List[Dict[str, Any]]:
+        account, subaccount_id = self._query_account(query, cookie)
+        symbol = query.get("symbol", [None])[0]
+        ids = set(query.get("ids", []))
+        with self.lock:
+            return [
+                self._order_view(order)
+                for order in self.orders.values()
+                if order["account"] == account
+                and order["subAccountId"] == subaccount_id
+                and (symbol is None or order["productSymbol"] == symbol)
+                and (not ids or order["id"] in ids)
+                and (not open_only or order["status"] in ("OPEN", "PARTIALLY_FILLED"))
+            ]
+
+    def open_orders(self, query, body, cookie) -> List[Dict[str, Any]]:
+        return self._account_orders(query, cookie, open_only=True)
+
+    def all_orders(self, query, body, cookie) -> List[Dict[str, Any]]:
+        return self._account_orders(query, cookie, open_only=False)
+
+    def spot_balances(self, query, body, cookie) -> List[Dict[str, Any]]:
+        account, subaccount_id = self._query_account(query, cookie)
+        with self.lock:
+            quantity = self._balance(account, subaccount_id)
+        return [
+            {
+                "account": account,
+                "subAccountId": subaccount_id,
+                "asset": "USDB",
+                "address": CONTRACTS[self.env]["USDB"],
+                "quantity": str(quantity),
+            }
+        ]
+
+    def position_risk(self, query, body, cookie) -> List[Dict[str, Any]]:
+        account, subaccount_id = self._query_account(query, cookie)
+        symbol = query.get("symbol", [None])[0]
+        with self.lock:
+            return [
+                {
+                    "account": account,
+                    "subAccountId": subaccount_id,
+                    "productId": product_id,
+                    "productSymbol": self.products[product_id]["symbol"],
+                    "quantity": str(position["quantity"]),
+                    "avgEntryPrice": str(position["avgEntryPrice"]),
+                }
+                for (owner, owner_subaccount, product_id), position in self.positions.items()
+                if (owner, owner_subaccount) == (account, subaccount_id)
+                and position["quantity"]
+                and (symbol is None or self.products[product_id]["symbol"] == symbol)
+            ]
+
+    def approved_signers(self, query, body, cookie) -> List[Dict[str, Any]]:
+        self._query_account(query, cookie)
+        return []
+
+    # market data
+
+    @staticmethod
+    def _product_view(product: Dict[str, Any]) -> Dict[str, Any]:
+        amounts = ("increment", "quantityIncrement", "minQuantity")
+        return {**product, **{key: str(product[key]) for key in amounts}}
+
+    def list_products(self, query, body, cookie) -> List[Dict[str, Any]]:
+        return [self._product_view(product) for product in self.products.values()]
+
+    def get_product(self, symbol: str, query, body, cookie) -> Dict[str, Any]:
+        return self._product_view(self._product(symbol=symbol))
+
+    def ticker(self, query, body, cookie) -> List[Dict[str, Any]]:
+        symbol = query.get("symbol", [None])[0]
+        products = [self._product(symbol=symbol)] if symbol else list(self.products.values())
+        tickers = []
+        with self.lock:
+            for product in products:
+                book = self.books[product["id"]]
+                trades = book.trades
+                tickers.append(
+                    {
+                        "productId": product["id"],
+                        "productSymbol": product["symbol"],
+                        "lastPrice": trades[-1]["price"] if trades else "0",
+                        "bestBidPrice": str(-book.bids[0][0]) if book.bids else "0",
+                        "bestAskPrice": str(book.asks[0][0]) if book.asks else "0",
+                        "markPrice": trades[-1]["price"] if trades else "0",
+                        "volume": str(sum(int(trade["quantity"]) for trade in trades)),
+                        "count": len(trades),
+                    }
+                )
+        return tickers
+
+    def trade_history(self, query, body, cookie) -> List[Dict[str, Any]]:
+        book = self.books[self._product(symbol=query["symbol"][0])["id"]]
+        lookback = int(query.get("lookback", ["10"])[0])
+        with self.lock:
+            return list(book.trades)[-lookback:][::-1] if lookback > 0 else []
+
+    def server_time(self, query, body, cookie) -> Dict[str, Any]:
+        return {"serverTime": int(time.time() * 1000)}
+
+    def klines(self, query, body, cookie) -> List[Dict[str, Any]]:
+        symbol = query["symbol"][0]
+        book = self.books[self._product(symbol=symbol)["id"]]
+        interval = query.get("interval", ["1m"])[0]
+        if interval not in INTERVALS:
+            raise MockError(400, f"Unknown interval: {interval}")
+        width = INTERVALS[interval] * 1000
+        start_time = int(query.get("start_time", ["0"])[0])
+        end_time = int(query.get("end_time", [str(2**63)])[0])
+        limit = int(query.get("limit", ["500"])[0])
+        candles: Dict[int, Dict[str, Any]] = {}
+        with self.lock:
+            trades = [trade for trade in book.trades if start_time <= trade["time"] <= end_time]
+        for trade in trades:
+            open_time = trade["time"] - trade["time"] % width
+            price, quantity = int(trade["price"]), int(trade["quantity"])
+            candle = candles.get(open_time)
+            if candle is None:
+                candles[open_time] = {"open": price, "high": price, "low": price, "close": price, "volume": quantity}
+                continue
+            candle.update(high=max(candle["high"], price), low=min(candle["low"], price), close=price)
+            candle["volume"] += quantity
+        return [
+            {
+                "symbol": symbol,
+                "interval": interval,
+                "openTime": open_time,
+                "closeTime": open_time + width - 1,
+                **{key: str(value) for key, value in candle.items()},
+            }
+            for open_time, candle in sorted(candles.items())[-limit:]
+        ]
+
+    def depth(self, query, body, cookie) -> Dict[str, Any]:
+        book = self.books[self._product(symbol=query["symbol"][0])["id"]]
+        limit = int(query["limit"][0]) if "limit" in query else None
+        with self.lock:
+            return {
+                "bids": book.levels(True, limit),
+                "asks": book.levels(False, limit),
+                "lastUpdateId": book.update_id,
+            }
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """
+    Keep-alive http/1.1 handler forwarding requests to the exchange of the server.
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "MockHTTPServer"
+
+    def _dispatch(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        status, body = self.server.faults.apply()
+        if status is None:
+            try:
+                payload = json.loads(raw) if raw else {}
+            except ValueError:
+                status, body = 400, {"error": "Invalid json body."}
+            else:
+                session = cookie["connectedAddress"].value if "connectedAddress" in cookie else None
+                status, body = self.server.exchange.handle(
+                    self.command, url.path, parse_qs(url.query), payload, session
+                )
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = _dispatch
+    do_POST = _dispatch
+    do_DELETE = _dispatch
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FaultInjector:
+    """
+    Adds latency to every request and fails a fraction of them.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: int = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.injected_errors = 0
+
+    def apply(self) -> Tuple[Optional[int], Any]:
+        """
+        Sleep for the configured latency, returning an error response when one is injected.
+        """
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.injected_errors += 1
+            return self.error_status, {"error": "Injected error."}
+        return None, None
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 1024
+
+    def __init__(self, address, exchange: MockExchange, faults: FaultInjector, verbose: bool = False):
+        super().__init__(address, MockRequestHandler)
+        self.exchange = exchange
+        self.faults = faults
+        self.verbose = verbose
+
+
+class MockServer:
+    """
+    Mock exchange served over http on a background thread.
+
+    A port of 0 binds a free port, read it back from `url`.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        exchange: MockExchange = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: int = None,
+        verbose: bool = False,
+    ):
+        self.exchange = exchange or MockExchange()
+        self.faults = FaultInjector(latency, jitter, error_rate, error_status, seed)
+        self.httpd = MockHTTPServer((host, port), self.exchange, self.faults, verbose)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def client_kwargs(self) -> Dict[str, Any]:
+        """
+        Keyword arguments pointing a client at the server.
+        """
+        return {
+            "env": self.exchange.env,
+            "rest_url": self.url,
+            "websocket_url": self.url.replace("http", "ws", 1),
+        }
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="hundred-x-mock-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the 100x REST API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--env", default=Environment.DEVNET.value, choices=[env.value for env in Environment])
+    parser.add_argument("--latency", type=float, default=0.0, help="Added latency per request in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform random extra latency in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failed on purpose.")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="Log every request.")
+    args = parser.parse_args(argv)
+
+    server = MockServer(
+        args.host,
+        args.port,
+        exchange=MockExchange(Environment(args.env)),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+        verbose=args.verbose,
+    )
+    print(f"Serving the mock exchange on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Compact typed views of the REST responses.
+
+A model keeps the raw values of the fields it knows in one tuple, so a record costs a fraction of the json dict it
+replaces. Numeric fields are decoded on first access and cached, the raw values stay readable by their api key
+(`position["quantity"]`) so code written against the raw dicts keeps working.
+"""
+
+from array import array
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from hundred_x.enums import OrderType, TimeInForce
+from hundred_x.fixed_point import DEFAULT_SCALE, ladder_to_units
+
+
+class Field:
+    """
+    Model attribute read from an api key, decoded on first access when a decoder is given.
+    """
+
+    def __init__(self, key: str, decode: Callable[[Any], Any] = None):
+        self.key = key
+        self.decode = decode
+        self.name = None
+        # position of the raw value in the `_raw` tuple of the model
+        self.index = None
+        self._cache = None
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+        if self.decode is not None:
+            self._cache = owner.__dict__[f"_cache_{name}"]
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        if self._cache is None:
+            return instance._raw[self.index]
+        try:
+            return self._cache.__get__(instance)
+        except AttributeError:
+            raw = instance._raw[self.index]
+            value = None if raw is None else self.decode(raw)
+            self._cache.__set__(instance, value)
+            return value
+
+    def __set__(self, instance, value):
+        raise AttributeError(f"{self.name} is read only")
+
+
+class ModelMeta(type):
+    """
+    Give every model a slot for the decoded value of each decoded field and a loader of its raw values.
+    """
+
+    def __new__(mcs, name, bases, namespace):
+        slots = [
+            f"_cache_{attribute}" for attribute, value in namespace.items() if isinstance(value, Field) and value.decode
+        ]
+        namespace["__slots__"] = tuple(slots) + namespace.get("__slots__", ())
+        cls = super().__new__(mcs, name, bases, namespace)
+        cls._fields = {value.key: value for value in namespace.values() if isinstance(value, Field)}
+        for index, field in enumerate(cls._fields.values()):
+            field.index = index
+        keys = tuple(cls._fields)
+        # all the values in one call in C when every key is present, rather than a store per field
+        values = itemgetter(*keys) if len(keys) > 1 else None
+
+        def load(model, data):
+            try:
+                model._raw = values(data)
+            except (KeyError, TypeError):
+                model._raw = tuple(map(data.get, keys))
+
+        cls._load = staticmethod(load)
+        return cls
+
+
+class Model(metaclass=ModelMeta):
+    """
+    Base of the response models, built with `from_dict()` from one json object.
+    """
+
+    __slots__ = ("_raw", "_extra")
+    _fields: Dict[str, Field]
+
+    @classmethod
+    def fields(cls) -> Dict[str, Field]:
+        """
+        Fields of the model by api key.
+        """
+        return cls._fields
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Model":
+        model = cls.__new__(cls)
+        cls._load(model, data)
+        fields = cls._fields
+        extra = {key: value for key, value in data.items() if key not in fields}
+        model._extra = extra or None
+        return model
+
+    @classmethod
+    def from_list(cls, data: List[Dict[str, Any]]) -> List["Model"]:
+        return [cls.from_dict(item) for item in data]
+
+    def __getitem__(self, key: str) -> Any:
+        field = self._fields.get(key)
+        if field is not None:
+            return self._raw[field.index]
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._fields or (self._extra is not None and key in self._extra)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        The raw json object, as returned by the api.
+        """
+        data = dict(zip(self._fields, self._raw))
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{field.name}={field.__get__(self)!r}" for field in self._fields.values())
+        return f"{type(self).__name__}({values})"
+
+
+class Levels:
+    """
+    One side of a depth snapshot as price and quantity columns in units of 1 / scale.
+    """
+
+    __slots__ = ("prices", "quantities", "scale")
+
+    def __init__(self, prices: array, quantities: array, scale: int = DEFAULT_SCALE):
+        self.prices = prices
+        self.quantities = quantities
+        self.scale = scale
+
+    @classmethod
+    def from_ladder(cls, levels: List[List[Any]], scale: int = DEFAULT_SCALE) -> "Levels":
+        return cls(*ladder_to_units(levels, scale), scale)
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def __getitem__(self, index: int) -> Tuple[int, int]:
+        return self.prices[index], self.quantities[index]
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.prices, self.quantities)
+
+    @property
+    def best(self) -> Optional[int]:
+        return self.prices[0] if self.prices else None
+
+
+def _bool(value: Any) -> bool:
+    return value if isinstance(value, bool) else str(value).lower() == "true"
+
+
+class Position(Model):
+    """
+    Entry of `/v1/positionRisk`, amounts are 1e18 scaled integers.
+    """
+
+    account = Field("account")
+    subaccount_id = Field("subAccountId", int)
+    product_id = Field("productId", int)
+    product_symbol = Field("productSymbol")
+    quantity = Field("quantity", int)
+    avg_entry_price = Field("avgEntryPrice", int)
+
+
+class Order(Model):
+    """
+    Entry of `/v1/orders` and `/v1/openOrders`, amounts are 1e18 scaled integers.
+    """
+
+    id = Field("id")
+    account = Field("account")
+    subaccount_id = Field("subAccountId", int)
+    product_id = Field("productId", int)
+    product_symbol = Field("productSymbol")
+    is_buy = Field("isBuy", _bool)
+    order_type = Field("orderType", lambda value: OrderType(int(value)))
+    time_in_force = Field("timeInForce", lambda value: TimeInForce(int(value)))
+    expiration = Field("expiration", int)
+    price = Field("price", int)
+    quantity = Field("quantity", int)
+    residual_quantity = Field("residualQuantity", int)
+    nonce = Field("nonce", int)
+    status = Field("status")
+    created_at = Field("createdAt", int)
+
+
+class Balance(Model):
+    """
+    Entry of `/v1/balances`, the quantity is a 1e18 scaled integer.
+    """
+
+    account = Field("account")
+    subaccount_id = Field("subAccountId", int)
+    asset = Field("asset")
+    address = Field("address")
+    quantity = Field("quantity", int)
+
+
+class Ticker(Model):
+    """
+    Entry of `/v1/ticker/24hr`, prices and volume are 1e18 scaled integers.
+    """
+
+    product_id = Field("productId", int)
+    product_symbol = Field("productSymbol")
+    last_price = Field("lastPrice", int)
+    best_bid_price = Field("bestBidPrice", int)
+    best_ask_price = Field("bestAskPrice", int)
+    mark_price = Field("markPrice", int)
+    volume = Field("volume", int)
+    count = Field("count", int)
+
+
+class Depth(Model):
+    """
+    Snapshot of `/v1/depth`, decoded into price and quantity columns on first access of a side.
+    """
+
+    bids = Field("bids", Levels.from_ladder)
+    asks = Field("asks", Levels.from_ladder)
+    last_update_id = Field("lastUpdateId", int)
+
+
+def decode(model: type, response: Any) -> Any:
+    """
+    Wrap a json object or a list of them in a model, anything else such as an error payload is returned as is.
+    """
+    if isinstance(response, dict) and "error" not in response:
+        return model.from_dict(response)
+    if isinstance(response, list):
+        return [model.from_dict(item) if isinstance(item, dict) else item for item in response]
+    return response
@@ -0,0 +1,136 @@
+"""
+Strictly increasing nonces per subaccount.
+
+Nonces are the corrected wall clock time in ms, bumped past the last nonce given out whenever two messages are
+signed within the same ms, so a burst of orders never reuses a nonce and the nonces catch up with the clock again
+once the burst is over. Explicit nonces passed by the caller are recorded so the next generated one follows them.
+A `NonceManager` serves the threads and tasks of one process. Processes sharing an account on one host also share
+a `SharedNonceCounter`, a small memory mapped file updated under an exclusive lock.
+"""
+
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Optional
+
+from hundred_x.exceptions import ClientError
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+# one slot per subaccount id
+SLOTS = 256
+_SLOT = struct.Struct("<q")
+
+
+class SharedNonceCounter:
+    """
+    Last nonce of every subaccount of an account, in a file shared by the processes of a host.
+
+    The file holds one little endian int64 per subaccount id, use one file per account.
+    """
+
+    def __init__(self, path: str):
+        if fcntl is None:  # pragma: no cover
+            raise ClientError("Sharing nonces between processes needs fcntl file locks")
+        self.path = os.path.abspath(os.path.expanduser(path))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = SLOTS * _SLOT.size
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def allocate(self, subaccount_id: int, floor: int, count: int = 1) -> int:
+        """
+        Take `count` consecutive nonces of at least `floor` and return the first one.
+        """
+        offset = subaccount_id * _SLOT.size
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            (last,) = _SLOT.unpack_from(self._map, offset)
+            first = max(floor, last + 1)
+            _SLOT.pack_into(self._map, offset, first + count - 1)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return first
+
+    def observe(self, subaccount_id: int, nonce: int):
+        """
+        Raise the last nonce of a subaccount to `nonce`.
+        """
+        offset = subaccount_id * _SLOT.size
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if nonce > _SLOT.unpack_from(self._map, offset)[0]:
+                _SLOT.pack_into(self._map, offset, nonce)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def last(self, subaccount_id: int) -> int:
+        return _SLOT.unpack_from(self._map, subaccount_id * _SLOT.size)[0]
+
+    def close(self):
+        if not self._map.closed:
+            self._map.close()
+            os.close(self._fd)
+
+
+class NonceManager:
+    """
+    Gives out strictly increasing nonces per subaccount, from any thread or task.
+
+    The nonces are shared with other processes through `shared` when it is given, a `SharedNonceCounter` or the
+    path of its file.
+    """
+
+    def __init__(self, last: Dict[int, int] = None, shared: Optional[SharedNonceCounter] = None):
+        if isinstance(shared, str):
+            shared = SharedNonceCounter(shared)
+        self.shared = shared
+        self._last: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        for subaccount_id, nonce in (last or {}).items():
+            self.observe(subaccount_id, nonce)
+
+    def reserve(self, subaccount_id: int, now: int, count: int = 1) -> int:
+        """
+        Take `count` consecutive nonces, the first one at least `now`, and return the first one.
+        """
+        with self._lock:
+            floor = max(now, self._last.get(subaccount_id, 0) + 1)
+            if self.shared is not None:
+                floor = self.shared.allocate(subaccount_id, floor, count)
+            self._last[subaccount_id] = floor + count - 1
+        return floor
+
+    def next(self, subaccount_id: int, now: int) -> int:
+        return self.reserve(subaccount_id, now)
+
+    def observe(self, subaccount_id: int, nonce: int):
+        """
+        Record a nonce chosen by the caller, the following generated nonces are larger.
+        """
+        with self._lock:
+            if nonce > self._last.get(subaccount_id, 0):
+                self._last[subaccount_id] = nonce
+                if self.shared is not None:
+                    self.shared.observe(subaccount_id, nonce)
+
+    def last(self, subaccount_id: int) -> int:
+        with self._lock:
+            return self._last.get(subaccount_id, 0)
+
+    def snapshot(self) -> Dict[int, int]:
+        """
+        Last nonce of every subaccount used by this process.
+        """
+        with self._lock:
+            return dict(self._last)
+
+    def close(self):
+        if self.shared is not None:
+            self.shared.close()
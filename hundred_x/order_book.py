@@ -0,0 +1,336 @@
+"""
+Local L2 order book maintained from depth snapshots and deltas.
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import accumulate
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from hundred_x.fixed_point import DEFAULT_SCALE, WEI, ladder_to_units
+
+if TYPE_CHECKING:
+    from hundred_x.streams import DepthEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 1024
+DEFAULT_BUFFER_SIZE = 1024
+# seconds before retrying a failed snapshot, doubled after each failure
+DEFAULT_RESYNC_BACKOFF = 0.1
+MAX_RESYNC_BACKOFF = 5.0
+
+Level = Tuple[int, int]
+
+
+class BookSide:
+    """
+    One side of the book, held in preallocated arrays of scaled integers.
+
+    Levels are kept sorted from the worst to the best price so that updates at the top of the book,
+    which are the most frequent, only touch the tail of the arrays. Asks are stored with negated keys
+    so both sides share the same ordering. `totals` holds the running sum of the quantities from the
+    worst level, so depth queries take a lookup or two. Updates only record the lowest level they
+    touched, the next query rebuilds the totals from there to the best level.
+    """
+
+    def __init__(self, is_bid: bool, capacity: int = DEFAULT_CAPACITY):
+        self.sign = 1 if is_bid else -1
+        self.keys = array("q", bytes(8 * capacity))
+        self.quantities = array("q", bytes(8 * capacity))
+        self.totals = array("q", bytes(8 * capacity))
+        self.size = 0
+        # first level whose running total is out of date
+        self._stale = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def clear(self):
+        self.size = 0
+        self._stale = 0
+
+    def _grow(self):
+        self.keys.extend(self.keys)
+        self.quantities.extend(self.quantities)
+        self.totals.extend(self.totals)
+
+    def _accumulate(self):
+        """
+        Bring the running totals up to date.
+        """
+        start, size = self._stale, self.size
+        if start < size:
+            initial = self.totals[start - 1] if start else 0
+            self.totals[start:size] = array("q", accumulate(self.quantities[start:size], initial=initial))[1:]
+        self._stale = size
+
+    def load(self, levels: Iterable[Level]):
+        """
+        Replace the side with the given (price, quantity) levels.
+        """
+        self.size = 0
+        for key, quantity in sorted((self.sign * price, quantity) for price, quantity in levels if quantity):
+            if self.size == len(self.keys):
+                self._grow()
+            self.keys[self.size] = key
+            self.quantities[self.size] = quantity
+            self.size += 1
+        self._stale = 0
+
+    def update(self, price: int, quantity: int):
+        """
+        Set the quantity at a price level, a zero quantity removes the level.
+        """
+        key = self.sign * price
+        size = self.size
+        index = bisect_left(self.keys, key, 0, size)
+        if index < size and self.keys[index] == key:
+            if quantity:
+                self.quantities[index] = quantity
+            else:
+                self.keys[index : size - 1] = self.keys[index + 1 : size]
+                self.quantities[index : size - 1] = self.quantities[index + 1 : size]
+                self.size = size - 1
+        elif quantity:
+            if size == len(self.keys):
+                self._grow()
+            self.keys[index + 1 : size + 1] = self.keys[index:size]
+            self.quantities[index + 1 : size + 1] = self.quantities[index:size]
+            self.keys[index] = key
+            self.quantities[index] = quantity
+            self.size = size + 1
+        else:
+            return
+        if index < self._stale:
+            self._stale = index
+
+    @property
+    def best(self) -> Optional[int]:
+        return self.sign * self.keys[self.size - 1] if self.size else None
+
+    @property
+    def best_quantity(self) -> Optional[int]:
+        return self.quantities[self.size - 1] if self.size else None
+
+    def quantity_at(self, price: int) -> int:
+        """
+        Quantity resting at exactly the given price.
+        """
+        key = self.sign * price
+        index = bisect_left(self.keys, key, 0, self.size)
+        if index < self.size and self.keys[index] == key:
+            return self.quantities[index]
+        return 0
+
+    def quantity_through(self, price: int) -> int:
+        """
+        Cumulative quantity resting at the given price or better.
+        """
+        size = self.size
+        if not size:
+            return 0
+        if self._stale < size:
+            self._accumulate()
+        index = bisect_left(self.keys, self.sign * price, 0, size)
+        return self.totals[size - 1] - (self.totals[index - 1] if index else 0)
+
+    def cumulative_quantity(self, levels: int) -> int:
+        """
+        Cumulative quantity over the best `levels` levels.
+        """
+        size = self.size
+        if not size or levels <= 0:
+            return 0
+        if self._stale < size:
+            self._accumulate()
+        start = size - levels
+        return self.totals[size - 1] - (self.totals[start - 1] if start > 0 else 0)
+
+    def levels(self, limit: int = None) -> List[Level]:
+        """
+        Price levels from the best price outwards.
+        """
+        start = 0 if limit is None else max(self.size - limit, 0)
+        return [(self.sign * self.keys[index], self.quantities[index]) for index in range(self.size - 1, start - 1, -1)]
+
+
+class OrderBook:
+    """
+    Incrementally maintained L2 order book for a single symbol.
+
+    Prices and quantities are stored as integers in units of 1 / scale, converted from the 1e18 scaled
+    values used by the exchange. The book is seeded from a `/v1/depth` snapshot and updated with depth
+    deltas. When a gap in the delta sequence is detected the book marks itself out of sync, buffers
+    incoming deltas and reloads a snapshot through `snapshot_loader`, which may be a plain callable or
+    return an awaitable such as `AsyncHundredXClient.get_depth`. One snapshot is loaded at a time, a
+    failed one is retried on a later delta after `resync_backoff` seconds, doubled after each failure.
+    """
+
+    def __init__(
+        self,
+        symbol: str,
+        snapshot_loader: Callable[[], Any] = None,
+        scale: int = DEFAULT_SCALE,
+        capacity: int = DEFAULT_CAPACITY,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        resync_backoff: float = DEFAULT_RESYNC_BACKOFF,
+    ):
+        if WEI % scale:
+            raise ValueError(f"Scale must divide 1e18 exactly. It is instead: {scale}")
+        self.symbol = symbol
+        self.snapshot_loader = snapshot_loader
+        self.scale = scale
+        self.divisor = WEI // scale
+        self.bids = BookSide(is_bid=True, capacity=capacity)
+        self.asks = BookSide(is_bid=False, capacity=capacity)
+        self.sequence: Optional[int] = None
+        self.synced = False
+        self.resyncs = 0
+        self.resync_backoff = resync_backoff
+        self._backoff = resync_backoff
+        self._retry_at = 0.0
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._pending = None
+        self._loading = False
+        self._replaying = False
+
+    def apply_snapshot(self, snapshot: Dict[str, Any]):
+        """
+        Replace the book with a depth snapshot, replaying any buffered deltas newer than it.
+        """
+        self.bids.load(zip(*ladder_to_units(snapshot["bids"], self.scale)))
+        self.asks.load(zip(*ladder_to_units(snapshot["asks"], self.scale)))
+        sequence = next(
+            (snapshot[key] for key in ("lastUpdateId", "u", "sequence") if snapshot.get(key) is not None), None
+        )
+        self.sequence = None if sequence is None else int(sequence)
+        self.synced = True
+        self._backoff = self.resync_backoff
+        self._retry_at = 0.0
+        buffered = list(self._buffer)
+        self._buffer.clear()
+        # a gap in the buffered deltas leaves the book out of sync, the next delta reloads it
+        self._replaying = True
+        try:
+            for index, delta in enumerate(buffered):
+                if not self.apply_delta(*delta):
+                    self._buffer.extend(buffered[index + 1 :])
+                    break
+        finally:
+            self._replaying = False
+
+    def apply_event(self, event: "DepthEvent") -> bool:
+        """
+        Apply a depth event from the market data stream.
+        """
+        return self.apply_delta(event.bids, event.asks, event.sequence, event.first_sequence)
+
+    def apply_delta(
+        self,
+        bids: Iterable[Level],
+        asks: Iterable[Level],
+        sequence: int = None,
+        first_sequence: int = None,
+    ) -> bool:
+        """
+        Apply a delta of 1e18 scaled (price, quantity) levels.
+
+        Returns False when the delta could not be applied because the book is out of sync.
+        """
+        if not self.synced:
+            self._buffer.append((bids, asks, sequence, first_sequence))
+            if not self._replaying and time.monotonic() >= self._retry_at:
+                # no snapshot is on its way, the last one failed or was older than the buffered deltas
+                self.resync()
+            return False
+        if sequence is not None and self.sequence is not None:
+            if sequence <= self.sequence:
+                return True
+            first = sequence if first_sequence is None else first_sequence
+            if first > self.sequence + 1:
+                self.synced = False
+                self._buffer.append((bids, asks, sequence, first_sequence))
+                if not self._replaying:
+                    self.resync()
+                return False
+        divisor = self.divisor
+        for price, quantity in bids:
+            self.bids.update(int(price) // divisor, int(quantity) // divisor)
+        for price, quantity in asks:
+            self.asks.update(int(price) // divisor, int(quantity) // divisor)
+        if sequence is not None:
+            self.sequence = sequence
+        return True
+
+    def resync(self):
+        """
+        Reload the book from a fresh snapshot.
+        """
+        self.synced = False
+        if self.snapshot_loader is None or self._pending is not None or self._loading:
+            return
+        self.resyncs += 1
+        self._loading = True
+        try:
+            snapshot = self.snapshot_loader()
+            if inspect.isawaitable(snapshot):
+                self._pending = asyncio.ensure_future(self._await_snapshot(snapshot))
+            else:
+                self.apply_snapshot(snapshot)
+        except Exception:  # pylint: disable=broad-except
+            self._snapshot_failed()
+        finally:
+            self._loading = False
+
+    async def _await_snapshot(self, snapshot):
+        try:
+            snapshot = await snapshot
+        except Exception:  # pylint: disable=broad-except
+            self._snapshot_failed()
+            return
+        finally:
+            self._pending = None
+        self.apply_snapshot(snapshot)
+
+    def _snapshot_failed(self):
+        logger.exception("Order book snapshot failed, retrying in %.2fs", self._backoff)
+        self._retry_at = time.monotonic() + self._backoff
+        self._backoff = min(self._backoff * 2, MAX_RESYNC_BACKOFF)
+
+    @property
+    def best_bid(self) -> Optional[int]:
+        return self.bids.best
+
+    @property
+    def best_ask(self) -> Optional[int]:
+        return self.asks.best
+
+    @property
+    def mid(self) -> Optional[float]:
+        if not (self.bids.size and self.asks.size):
+            return None
+        return (self.bids.best + self.asks.best) / 2
+
+    @property
+    def spread(self) -> Optional[int]:
+        if not (self.bids.size and self.asks.size):
+            return None
+        return self.asks.best - self.bids.best
+
+    def to_scaled(self, value: int) -> int:
+        """
+        Convert a 1e18 scaled exchange value into the units of the book.
+        """
+        return int(value) // self.divisor
+
+    def levels(self, limit: int = None) -> Dict[str, List[Level]]:
+        """
+        Bid and ask levels from the best price outwards.
+        """
+        return {"bids": self.bids.levels(limit), "asks": self.asks.levels(limit)}
@@ -0,0 +1,306 @@
+"""
+Timeouts, retries and hedging of the REST requests.
+
+Every (method, endpoint) has a `RequestPolicy`. Failed idempotent requests are sent again after an exponential
+backoff with full jitter when their error is retryable, non idempotent ones such as orders are never sent twice.
+A hedged request sends a duplicate when the first attempt is still pending after the 95th percentile of the
+recent latencies of the endpoint and keeps the first answer, so one slow connection does not hold up a whole
+cycle of a strategy.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from hundred_x.batch import DEFAULT_MAX_IN_FLIGHT
+from hundred_x.exceptions import (
+    ApiError,
+    AuthenticationError,
+    BadRequestError,
+    NotFoundError,
+    RateLimitError,
+    ServerError,
+)
+from hundred_x.transport import Timeout
+
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.05
+DEFAULT_MAX_BACKOFF = 2.0
+DEFAULT_HEDGE_DELAY = 0.5
+DEFAULT_HEDGE_QUANTILE = 0.95
+MIN_HEDGE_DELAY = 0.005
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 256
+# two attempts for each request of a full batch
+HEDGE_WORKERS = 2 * DEFAULT_MAX_IN_FLIGHT
+
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+
+
+@dataclass(frozen=True)
+class RequestPolicy:
+    """
+    How a request is sent.
+
+    `timeout` is a (connect, read) pair in seconds, None leaves it to the transport. `retries` is the number of
+    attempts after the first one, only made for idempotent requests, by default those read with GET. Hedging
+    waits `hedge_delay` seconds, or the `hedge_quantile` of the recent latencies once enough are known.
+    """
+
+    timeout: Optional[Timeout] = None
+    retries: int = DEFAULT_RETRIES
+    backoff: float = DEFAULT_BACKOFF
+    max_backoff: float = DEFAULT_MAX_BACKOFF
+    hedge: bool = False
+    hedge_delay: float = DEFAULT_HEDGE_DELAY
+    hedge_quantile: float = DEFAULT_HEDGE_QUANTILE
+    idempotent: Optional[bool] = None
+
+    def is_idempotent(self, method: str) -> bool:
+        return method.upper() in IDEMPOTENT_METHODS if self.idempotent is None else self.idempotent
+
+    def backoff_delay(self, attempt: int, error: Exception = None) -> float:
+        """
+        Full jitter delay before the retry following `attempt`, at least what a rate limit asked for.
+        """
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+        retry_after = getattr(error, "retry_after", None)
+        return max(delay, retry_after) if retry_after else delay
+
+
+class LatencyWindow:
+    """
+    The most recent latencies of an endpoint, in seconds.
+    """
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self.samples = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def record(self, latency: float):
+        self.samples.append(latency)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _retry_after(response) -> Optional[float]:
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def error_for_response(response, method: str, url: str) -> ApiError:
+    """
+    Typed error of a response whose status is not 200.
+    """
+    status = response.status_code
+    message = f"Failed to send message: {response.text} {status} {method} {url}"
+    kwargs = {"status_code": status, "method": method, "url": url, "text": response.text}
+    if status == 429:
+        return RateLimitError(message, retry_after=_retry_after(response), **kwargs)
+    if status >= 500:
+        return ServerError(message, **kwargs)
+    if status in (401, 403):
+        return AuthenticationError(message, **kwargs)
+    if status == 404:
+        return NotFoundError(message, **kwargs)
+    if 400 <= status < 500:
+        return BadRequestError(message, **kwargs)
+    return ApiError(message, **kwargs)
+
+
+class RequestPolicies:
+    """
+    Policies of the requests by (method, endpoint), with the latencies used to time hedges.
+
+    `send(timeout)` makes one attempt and raises an `ApiError` when it fails, the endpoint is the one passed to
+    `send_message_to_endpoint` before its path parameters are filled. Sync hedged requests run their attempts on
+    at most `hedge_workers` threads, size it to twice the number of threads sending hedged requests at once.
+    """
+
+    def __init__(
+        self,
+        default: RequestPolicy = None,
+        endpoints: Dict[Tuple[str, str], RequestPolicy] = None,
+        hedge_workers: int = HEDGE_WORKERS,
+    ):
+        self.default = default if default is not None else RequestPolicy()
+        self.endpoints = {
+            (method.upper(), endpoint): policy for (method, endpoint), policy in (endpoints or {}).items()
+        }
+        self.latencies: Dict[Tuple[str, str], LatencyWindow] = {}
+        self.hedge_workers = hedge_workers
+        self._attempts = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def policy(self, method: str, endpoint: str) -> RequestPolicy:
+        return self.endpoints.get((method.upper(), endpoint), self.default)
+
+    def latency(self, method: str, endpoint: str) -> LatencyWindow:
+        key = (method.upper(), endpoint)
+        window = self.latencies.get(key)
+        if window is None:
+            window = self.latencies.setdefault(key, LatencyWindow())
+        return window
+
+    def single_attempt(self, method: str, endpoint: str) -> RequestPolicy:
+        """
+        Policy of an endpoint sent once, without retries nor hedges, keeping its timeout.
+        """
+        return replace(self.policy(method, endpoint), retries=0, hedge=False)
+
+    def hedge_delay(self, method: str, endpoint: str, policy: RequestPolicy = None) -> float:
+        policy = policy or self.policy(method, endpoint)
+        window = self.latency(method, endpoint)
+        if len(window) < HEDGE_MIN_SAMPLES:
+            return policy.hedge_delay
+        return max(MIN_HEDGE_DELAY, window.quantile(policy.hedge_quantile))
+
+    def _timed(self, send: Callable[[Optional[Timeout]], Any], window: LatencyWindow, timeout: Optional[Timeout]):
+        started = time.monotonic()
+        result = send(timeout)
+        window.record(time.monotonic() - started)
+        return result
+
+    def _executor_for_hedges(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(1, self.hedge_workers), thread_name_prefix="hundred_x-hedge"
+                )
+            return self._executor
+
+    def _submit(self, executor: ThreadPoolExecutor, send, window: LatencyWindow, timeout: Optional[Timeout]):
+        """
+        Start an attempt on an idle worker, None when every worker is busy so that no attempt waits in the queue.
+        """
+        with self._lock:
+            if self._attempts >= self.hedge_workers:
+                return None
+            self._attempts += 1
+        future = executor.submit(self._timed, send, window, timeout)
+        future.add_done_callback(self._attempt_done)
+        return future
+
+    def _attempt_done(self, _future):
+        with self._lock:
+            self._attempts -= 1
+
+    def _hedged(self, send, window: LatencyWindow, policy: RequestPolicy, delay: float):
+        executor = self._executor_for_hedges()
+        first = self._submit(executor, send, window, policy.timeout)
+        if first is None:
+            # the pool is full, send without a hedge rather than queue behind other requests
+            return self._timed(send, window, policy.timeout)
+        pending = {first}
+        done, _ = wait(pending, timeout=delay)
+        if not done:
+            hedge = self._submit(executor, send, window, policy.timeout)
+            if hedge is not None:
+                pending.add(hedge)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    def call(
+        self, method: str, endpoint: str, send: Callable[[Optional[Timeout]], Any], policy: RequestPolicy = None
+    ) -> Any:
+        """
+        Send a request under its policy, or `policy` when given, from the calling thread, hedges run on a small
+        thread pool.
+        """
+        policy = policy or self.policy(method, endpoint)
+        window = self.latency(method, endpoint)
+        idempotent = policy.is_idempotent(method)
+        retries = policy.retries if idempotent else 0
+        for attempt in range(retries + 1):
+            try:
+                if policy.hedge and idempotent:
+                    return self._hedged(send, window, policy, self.hedge_delay(method, endpoint, policy))
+                return self._timed(send, window, policy.timeout)
+            except ApiError as error:
+                if not error.retryable or attempt == retries:
+                    raise
+                time.sleep(policy.backoff_delay(attempt, error))
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    async def _hedged_async(self, send, window: LatencyWindow, policy: RequestPolicy, delay: float):
+        async def _timed():
+            started = time.monotonic()
+            result = await send(policy.timeout)
+            window.record(time.monotonic() - started)
+            return result
+
+        pending = {asyncio.ensure_future(_timed())}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                pending.add(asyncio.ensure_future(_timed()))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call_async(
+        self,
+        method: str,
+        endpoint: str,
+        send: Callable[[Optional[Timeout]], Awaitable[Any]],
+        policy: RequestPolicy = None,
+    ) -> Any:
+        """
+        Send a request under its policy, or `policy` when given, on the event loop, the slower of two hedged attempts
+        is cancelled.
+        """
+        policy = policy or self.policy(method, endpoint)
+        window = self.latency(method, endpoint)
+        idempotent = policy.is_idempotent(method)
+        retries = policy.retries if idempotent else 0
+        for attempt in range(retries + 1):
+            try:
+                if policy.hedge and idempotent:
+                    return await self._hedged_async(send, window, policy, self.hedge_delay(method, endpoint, policy))
+                started = time.monotonic()
+                result = await send(policy.timeout)
+                window.record(time.monotonic() - started)
+                return result
+            except ApiError as error:
+                if not error.retryable or attempt == retries:
+                    raise
+                await asyncio.sleep(policy.backoff_delay(attempt, error))
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def close(self):
+        """
+        Stop the threads of the hedged requests, attempts still running are left to finish.
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
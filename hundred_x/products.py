@@ -0,0 +1,212 @@
+"""
+Product catalogue cached on the client, indexed by symbol and product id.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from hundred_x.exceptions import UserInputValidationError
+from hundred_x.fixed_point import to_wei
+
+DEFAULT_PRODUCTS_TTL = 60 * 60
+# seconds before a failed background refresh is tried again
+DEFAULT_PRODUCTS_RETRY = 30.0
+
+# field names of the increments in the `/v1/products` payload, the first one present is used,
+# `minQuantity` is only a lower bound and never taken as the lot size
+TICK_SIZE_KEYS = ("increment", "tickSize", "priceIncrement")
+LOT_SIZE_KEYS = ("quantityIncrement", "lotSize", "stepSize")
+MIN_QUANTITY_KEYS = ("minQuantity",)
+MAX_QUANTITY_KEYS = ("maxQuantity",)
+MIN_NOTIONAL_KEYS = ("minNotional", "minNotionalValue")
+
+logger = logging.getLogger(__name__)
+
+ProductKey = Union[int, str]
+
+
+def _wei(product: Dict[str, Any], keys, default: int = 0) -> int:
+    """
+    Read an amount as 1e18 scaled integer, accepting wei integers, wei strings and decimal strings.
+    """
+    for key in keys:
+        value = product.get(key)
+        if value is None:
+            continue
+        if isinstance(value, str) and "." in value:
+            return to_wei(value)
+        return int(value)
+    return default
+
+
+@dataclass(frozen=True)
+class Product:
+    """
+    Trading rules of a product, amounts are 1e18 scaled integers.
+    """
+
+    id: int
+    symbol: str
+    tick_size: int = 0
+    lot_size: int = 0
+    min_quantity: int = 0
+    max_quantity: int = 0
+    min_notional: int = 0
+    raw: Dict[str, Any] = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def from_dict(cls, product: Dict[str, Any]) -> "Product":
+        lot_size = _wei(product, LOT_SIZE_KEYS)
+        return cls(
+            id=int(product["id"]),
+            symbol=product["symbol"],
+            tick_size=_wei(product, TICK_SIZE_KEYS),
+            lot_size=lot_size,
+            min_quantity=_wei(product, MIN_QUANTITY_KEYS, lot_size),
+            max_quantity=_wei(product, MAX_QUANTITY_KEYS),
+            min_notional=_wei(product, MIN_NOTIONAL_KEYS),
+            raw=product,
+        )
+
+
+class ProductRegistry:
+    """
+    Products loaded once from `/v1/products` and refreshed when older than the ttl or on demand.
+
+    With a loader the registry refreshes itself, without one the owner calls `load()`. Only a lookup on an empty
+    registry waits for the loader, a stale catalogue keeps being served while it reloads in the background.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], List[Dict[str, Any]]] = None,
+        ttl: float = DEFAULT_PRODUCTS_TTL,
+        retry: float = DEFAULT_PRODUCTS_RETRY,
+    ):
+        self.loader = loader
+        self.ttl = ttl
+        self.retry = retry
+        self.fetched = 0.0
+        self._by_id: Dict[int, Product] = {}
+        self._by_symbol: Dict[str, Product] = {}
+        self._lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._retry_at = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.fetched)
+
+    @property
+    def stale(self) -> bool:
+        return time.time() - self.fetched >= self.ttl
+
+    def load(self, products: List[Dict[str, Any]], fetched: float = None):
+        """
+        Replace the catalogue with the `/v1/products` payload.
+
+        Any other payload keeps the current catalogue until the ttl runs out, so a bad response is not refetched
+        on every lookup.
+        """
+        self.fetched = time.time() if fetched is None else fetched
+        if not isinstance(products, list):
+            return
+        parsed = [
+            Product.from_dict(product)
+            for product in products
+            if isinstance(product, dict) and "id" in product and "symbol" in product
+        ]
+        self._by_id = {product.id: product for product in parsed}
+        self._by_symbol = {product.symbol.lower(): product for product in parsed}
+
+    def refresh(self):
+        """
+        Reload the catalogue through the loader.
+        """
+        if self.loader is None:
+            raise UserInputValidationError("The product registry has no loader, load the products first.")
+        with self._lock:
+            self.load(self.loader())
+
+    def refresh_in_background(self) -> Optional[threading.Thread]:
+        """
+        Reload the catalogue on a daemon thread, unless a reload is running or the last one failed recently.
+        """
+        if self.loader is None or time.time() < self._retry_at:
+            return None
+        with self._thread_lock:
+            thread = self._refresher
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._refresh_quietly, name="hundred-x-products", daemon=True)
+                self._refresher = thread
+                thread.start()
+        return thread
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+        except Exception:  # pylint: disable=broad-except
+            self._retry_at = time.time() + self.retry
+            logger.warning("Product catalogue refresh failed, retrying in %.0fs", self.retry, exc_info=True)
+
+    def _ensure_fresh(self):
+        if self.loader is None or not self.stale:
+            return
+        if self.loaded:
+            self.refresh_in_background()
+            return
+        with self._lock:
+            if not self.stale:
+                return
+            self.load(self.loader())
+
+    def _lookup(self, key: ProductKey) -> Optional[Product]:
+        return self._by_symbol.get(key.lower()) if isinstance(key, str) else self._by_id.get(int(key))
+
+    def get(self, key: ProductKey) -> Product:
+        """
+        Get a product by symbol or by product id, an empty registry is loaded first.
+        """
+        self._ensure_fresh()
+        product = self._lookup(key)
+        if product is None:
+            raise UserInputValidationError(f"Unknown product: {key}")
+        return product
+
+    def find(self, key: ProductKey) -> Optional[Product]:
+        """
+        Get a product by symbol or by product id without waiting for the loader, None when it is unknown.
+
+        A stale or empty catalogue is reloaded in the background, until the first load the lookup finds nothing.
+        """
+        if self.stale:
+            self.refresh_in_background()
+        product = self._lookup(key)
+        if product is None and not self.loaded:
+            logger.warning("Product catalogue unavailable, skipping the rules of product %s", key)
+        return product
+
+    def product_id(self, key: ProductKey) -> int:
+        """
+        Resolve a symbol to its product id, ids are returned as they are.
+        """
+        if isinstance(key, str):
+            return self.get(key).id
+        return key
+
+    def symbol(self, key: ProductKey) -> str:
+        return self.get(key).symbol
+
+    def __iter__(self) -> Iterator[Product]:
+        self._ensure_fresh()
+        return iter(list(self._by_id.values()))
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, key: ProductKey) -> bool:
+        return self.find(key) is not None
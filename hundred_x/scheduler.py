@@ -0,0 +1,330 @@
+"""
+Client side rate limits and priorities of the REST requests.
+
+Every request belongs to a class (cancels, order entry, account queries or market data) and weighs a number of
+tokens. It first takes its tokens from the bucket of its class, in arrival order, then waits in a priority queue
+for the resources shared by all classes: the tokens of the global bucket and a slot among `max_in_flight`. Only
+the head of the queue is served, so while requests are held back a cancel overtakes every order entry, account
+query and market data request that is still waiting.
+
+One scheduler can be shared by threads and event loops, e.g. by a sync and an async client of the same account.
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from hundred_x.enums import RequestClass
+
+# (rate per second, burst) of the buckets, kept below the limits of the exchange
+DEFAULT_LIMITS = {
+    RequestClass.CANCEL: (20.0, 20.0),
+    RequestClass.ORDER_ENTRY: (10.0, 20.0),
+    RequestClass.ACCOUNT: (5.0, 10.0),
+    RequestClass.MARKET_DATA: (10.0, 20.0),
+}
+DEFAULT_GLOBAL_LIMIT = (20.0, 40.0)
+
+# class and weight of the endpoints by (method, endpoint), as the endpoint is passed before its path is formatted
+ENDPOINT_WEIGHTS: Dict[Tuple[str, str], Tuple[RequestClass, float]] = {
+    ("DELETE", "/v1/order"): (RequestClass.CANCEL, 1),
+    ("DELETE", "/v1/openOrders"): (RequestClass.CANCEL, 1),
+    ("POST", "/v1/order"): (RequestClass.ORDER_ENTRY, 1),
+    ("POST", "/v1/order/cancel-and-replace"): (RequestClass.ORDER_ENTRY, 2),
+    ("POST", "/v1/withdraw"): (RequestClass.ORDER_ENTRY, 1),
+    ("GET", "/v1/orders"): (RequestClass.ACCOUNT, 2),
+    ("GET", "/v1/openOrders"): (RequestClass.ACCOUNT, 1),
+    ("GET", "/v1/balances"): (RequestClass.ACCOUNT, 1),
+    ("GET", "/v1/positionRisk"): (RequestClass.ACCOUNT, 1),
+    ("GET", "/v1/approved-signers"): (RequestClass.ACCOUNT, 1),
+    ("GET", "/v1/session/status"): (RequestClass.ACCOUNT, 1),
+    ("GET", "/v1/session/logout"): (RequestClass.ACCOUNT, 1),
+    ("GET", "/v1/uiKlines"): (RequestClass.MARKET_DATA, 2),
+    ("GET", "/v1/trade-history"): (RequestClass.MARKET_DATA, 2),
+    ("GET", "/v1/depth"): (RequestClass.MARKET_DATA, 1),
+}
+
+
+def classify(
+    method: str, endpoint: str, weights: Dict[Tuple[str, str], Tuple[RequestClass, float]] = None
+) -> Tuple[RequestClass, float]:
+    """
+    Class and weight of a request, unknown reads count as market data and unknown writes as order entry.
+    """
+    key = (method.upper(), endpoint)
+    found = (ENDPOINT_WEIGHTS if weights is None else weights).get(key)
+    if found is not None:
+        return found
+    return (RequestClass.MARKET_DATA if key[0] == "GET" else RequestClass.ORDER_ENTRY), 1
+
+
+class TokenBucket:
+    """
+    Bucket of `capacity` tokens refilled at `rate` per second, a rate of None never runs out.
+    """
+
+    def __init__(self, rate: Optional[float], capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else (rate or 0.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _weight(self, weight: float) -> float:
+        # a request heavier than the bucket would never fit, it waits for a full bucket instead
+        return min(weight, self.capacity)
+
+    def take(self, weight: float, now: float) -> bool:
+        if self.rate is None:
+            return True
+        self._refill(now)
+        weight = self._weight(weight)
+        if self.tokens < weight:
+            return False
+        self.tokens -= weight
+        return True
+
+    def time_until(self, weight: float, now: float) -> float:
+        if self.rate is None:
+            return 0.0
+        self._refill(now)
+        return max(0.0, (self._weight(weight) - self.tokens) / self.rate)
+
+    def reserve(self, weight: float, now: float) -> float:
+        """
+        Take the tokens ahead of time, returning how long to wait until they would have been available.
+        """
+        if self.rate is None:
+            return 0.0
+        self._refill(now)
+        self.tokens -= self._weight(weight)
+        return max(0.0, -self.tokens / self.rate)
+
+
+@dataclass
+class SchedulerMetrics:
+    """
+    Snapshot of a scheduler, counts by request class.
+    """
+
+    in_flight: int = 0
+    queued: Dict[RequestClass, int] = field(default_factory=lambda: dict.fromkeys(RequestClass, 0))
+    sent: Dict[RequestClass, int] = field(default_factory=lambda: dict.fromkeys(RequestClass, 0))
+    waited: Dict[RequestClass, float] = field(default_factory=lambda: dict.fromkeys(RequestClass, 0.0))
+    max_queued: int = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(self.queued.values())
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "request_class", "weight", "event", "loop", "cancelled")
+
+    def __init__(self, priority, seq, request_class, weight, event, loop=None):
+        self.priority = priority
+        self.seq = seq
+        self.request_class = request_class
+        self.weight = weight
+        self.event = event
+        self.loop = loop
+        self.cancelled = False
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self.event.set)
+
+
+class Scheduler:
+    """
+    Token buckets per request class in front of a priority queue for the global bucket and the in-flight slots.
+
+    `limits` maps request classes to (rate per second, burst), a rate of None lifts the limit of a class.
+    `weights` adds or overrides the (class, weight) of endpoints, see `ENDPOINT_WEIGHTS`.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[RequestClass, Tuple[Optional[float], float]] = None,
+        global_limit: Tuple[Optional[float], float] = DEFAULT_GLOBAL_LIMIT,
+        max_in_flight: int = None,
+        weights: Dict[Tuple[str, str], Tuple[RequestClass, float]] = None,
+    ):
+        limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.buckets = {request_class: TokenBucket(*limit) for request_class, limit in limits.items()}
+        self.global_bucket = TokenBucket(*global_limit) if global_limit else TokenBucket(None)
+        self.max_in_flight = max_in_flight
+        self.weights = {**ENDPOINT_WEIGHTS, **(weights or {})}
+        self._lock = threading.Lock()
+        self._queue = []
+        self._seq = itertools.count()
+        self._metrics = SchedulerMetrics()
+
+    def metrics(self) -> SchedulerMetrics:
+        with self._lock:
+            metrics = self._metrics
+            return SchedulerMetrics(
+                metrics.in_flight, dict(metrics.queued), dict(metrics.sent), dict(metrics.waited), metrics.max_queued
+            )
+
+    def queue_depth(self, request_class: RequestClass = None) -> int:
+        with self._lock:
+            if request_class is None:
+                return self._metrics.queue_depth
+            return self._metrics.queued[request_class]
+
+    def _enqueue(self, request_class: RequestClass, weight: float) -> float:
+        with self._lock:
+            self._metrics.queued[request_class] += 1
+            self._metrics.max_queued = max(self._metrics.max_queued, self._metrics.queue_depth)
+            return self.buckets[request_class].reserve(weight, time.monotonic())
+
+    def _dequeue(self, request_class: RequestClass):
+        with self._lock:
+            self._metrics.queued[request_class] -= 1
+
+    def _push(self, waiter: _Waiter):
+        with self._lock:
+            heapq.heappush(self._queue, waiter)
+
+    def _try_grant(self, waiter: _Waiter) -> Tuple[bool, Optional[float]]:
+        """
+        Serve the waiter if it heads the queue and the shared resources allow, else how long it may sleep.
+
+        Called under the lock, None means until it is woken.
+        """
+        queue = self._queue
+        while queue and queue[0].cancelled:
+            heapq.heappop(queue)
+        if queue[0] is not waiter:
+            return False, None
+        if self.max_in_flight is not None and self._metrics.in_flight >= self.max_in_flight:
+            return False, None
+        now = time.monotonic()
+        if not self.global_bucket.take(waiter.weight, now):
+            return False, self.global_bucket.time_until(waiter.weight, now)
+        heapq.heappop(queue)
+        self._metrics.in_flight += 1
+        self._metrics.queued[waiter.request_class] -= 1
+        self._wake_head()
+        return True, None
+
+    def _wake_head(self):
+        queue = self._queue
+        while queue and queue[0].cancelled:
+            heapq.heappop(queue)
+        if queue:
+            queue[0].wake()
+
+    def _abandon(self, waiter: _Waiter):
+        with self._lock:
+            waiter.cancelled = True
+            self._metrics.queued[waiter.request_class] -= 1
+            self._wake_head()
+
+    def _release(self, request_class: RequestClass, waited: float):
+        with self._lock:
+            self._metrics.in_flight -= 1
+            self._metrics.sent[request_class] += 1
+            self._metrics.waited[request_class] += waited
+            self._wake_head()
+
+    def _waiter(self, request_class: RequestClass, weight: float, event, loop=None) -> _Waiter:
+        return _Waiter(request_class.value, next(self._seq), request_class, weight, event, loop)
+
+    def acquire(self, method: str, endpoint: str) -> Tuple[RequestClass, float]:
+        """
+        Block until a request may be sent, returning its class and how long it waited.
+        """
+        started = time.monotonic()
+        request_class, weight = classify(method, endpoint, self.weights)
+        try:
+            time.sleep(self._enqueue(request_class, weight))
+        except BaseException:
+            self._dequeue(request_class)
+            raise
+        waiter = self._waiter(request_class, weight, threading.Event())
+        self._push(waiter)
+        try:
+            while True:
+                with self._lock:
+                    waiter.event.clear()
+                    granted, timeout = self._try_grant(waiter)
+                if granted:
+                    return request_class, time.monotonic() - started
+                waiter.event.wait(timeout)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    async def acquire_async(self, method: str, endpoint: str) -> Tuple[RequestClass, float]:
+        """
+        Wait until a request may be sent, returning its class and how long it waited.
+        """
+        started = time.monotonic()
+        request_class, weight = classify(method, endpoint, self.weights)
+        try:
+            await asyncio.sleep(self._enqueue(request_class, weight))
+        except BaseException:
+            self._dequeue(request_class)
+            raise
+        waiter = self._waiter(request_class, weight, asyncio.Event(), asyncio.get_running_loop())
+        self._push(waiter)
+        try:
+            while True:
+                with self._lock:
+                    waiter.event.clear()
+                    granted, timeout = self._try_grant(waiter)
+                if granted:
+                    return request_class, time.monotonic() - started
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def slot(self, method: str, endpoint: str) -> "_Slot":
+        """
+        Context manager holding an in-flight slot for one request, `with` blocks and `async with` awaits.
+        """
+        return _Slot(self, method, endpoint)
+
+
+class _Slot:
+    __slots__ = ("scheduler", "method", "endpoint", "request_class", "waited")
+
+    def __init__(self, scheduler: Scheduler, method: str, endpoint: str):
+        self.scheduler = scheduler
+        self.method = method
+        self.endpoint = endpoint
+        self.request_class = None
+        self.waited = 0.0
+
+    def __enter__(self) -> "_Slot":
+        self.request_class, self.waited = self.scheduler.acquire(self.method, self.endpoint)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.scheduler._release(self.request_class, self.waited)  # pylint: disable=protected-access
+
+    async def __aenter__(self) -> "_Slot":
+        self.request_class, self.waited = await self.scheduler.acquire_async(self.method, self.endpoint)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.scheduler._release(self.request_class, self.waited)  # pylint: disable=protected-access
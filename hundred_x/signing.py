@@ -0,0 +1,212 @@
+"""
+Precompiled EIP-712 signing for the hundred_x messages.
+
+The domain separator and the struct type hashes are computed once, fields are encoded straight from
+python values and the digest is signed with the raw key. Signatures are identical to those produced by
+`eth_account.messages.encode_structured_data` and `LocalAccount.sign_message`. ECDSA signing uses the
+`eth_keys` backend, which picks up `coincurve` when it is installed.
+"""
+
+import math
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+from eip712_structs import EIP712Struct
+from eip712_structs.types import Address, Boolean, String, Uint
+from eth_keys.datatypes import PrivateKey, PublicKey, Signature
+from eth_utils.crypto import keccak
+
+from hundred_x.eip_712 import CancelOrder, CancelOrders, Order
+
+EIP712_PREFIX = b"\x19\x01"
+PRECOMPILED_STRUCTS = (Order, CancelOrder, CancelOrders)
+
+Encoder = Callable[[Any], bytes]
+
+_ZERO = bytes(32)
+_ONE = (1).to_bytes(32, "big")
+
+
+def _uint_encoder(length: int) -> Encoder:
+    limit = 1 << length
+
+    def encode(value: Any) -> bytes:
+        if value is None:
+            return _ZERO
+        if not 0 <= value < limit:
+            raise OverflowError(f"Value {value} does not fit in uint{length}")
+        return value.to_bytes(32, "big")
+
+    return encode
+
+
+def _encode_address(value: Any) -> bytes:
+    if value is None:
+        return _ZERO
+    if isinstance(value, str):
+        value = bytes.fromhex(value[2:] if value[:2] in ("0x", "0X") else value)
+    return bytes(value).rjust(32, b"\0")
+
+
+def _encode_bool(value: Any) -> bytes:
+    if value is None or value is False:
+        return _ZERO
+    if value is True:
+        return _ONE
+    raise ValueError(f"Must be True or False. Got: {value!r}")
+
+
+def _encode_string(value: Any) -> bytes:
+    return keccak(text=value or "")
+
+
+def _member_encoder(member_type) -> Encoder:
+    if isinstance(member_type, Uint):
+        return _uint_encoder(member_type.length)
+    if isinstance(member_type, Address):
+        return _encode_address
+    if isinstance(member_type, Boolean):
+        return _encode_bool
+    if isinstance(member_type, String):
+        return _encode_string
+    raise NotImplementedError(f"No precompiled encoder for {member_type.type_name}")
+
+
+class StructEncoder:
+    """
+    Encoder for a flat EIP712Struct with its type hash computed up front.
+    """
+
+    def __init__(self, struct_class: Type[EIP712Struct]):
+        self.struct_class = struct_class
+        self.type_hash = struct_class.type_hash()
+        self.members: List[Tuple[str, Encoder]] = [
+            (name, _member_encoder(member_type)) for name, member_type in struct_class.get_members()
+        ]
+        self.names = [name for name, _ in self.members]
+
+    def hash_struct(self, values: Dict[str, Any]) -> bytes:
+        return keccak(self.type_hash + b"".join(encode(values.get(name)) for name, encode in self.members))
+
+
+@lru_cache(maxsize=None)
+def get_struct_encoder(struct_class: Type[EIP712Struct]) -> StructEncoder:
+    """
+    Get the cached encoder for a struct class.
+    """
+    return StructEncoder(struct_class)
+
+
+class EIP712Signer:
+    """
+    Signs hundred_x messages for a single domain and key.
+    """
+
+    def __init__(self, domain: EIP712Struct, private_key: bytes):
+        self.domain_separator = domain.hash_struct()
+        self.prefix = EIP712_PREFIX + self.domain_separator
+        self.private_key = PrivateKey(bytes(private_key))
+        for struct_class in PRECOMPILED_STRUCTS:
+            get_struct_encoder(struct_class)
+
+    def __getstate__(self):
+        return {"domain_separator": self.domain_separator, "private_key": self.private_key.to_bytes()}
+
+    def __setstate__(self, state):
+        self.domain_separator = state["domain_separator"]
+        self.prefix = EIP712_PREFIX + self.domain_separator
+        self.private_key = PrivateKey(state["private_key"])
+
+    def digest(self, message_class: Type[EIP712Struct], values: Dict[str, Any]) -> bytes:
+        """
+        The EIP-712 digest of a message.
+        """
+        return keccak(self.prefix + get_struct_encoder(message_class).hash_struct(values))
+
+    def sign_digest(self, digest: bytes) -> str:
+        """
+        Sign a digest, returning the hex encoded r || s || v signature.
+        """
+        signature = self.private_key.sign_msg_hash(digest)
+        return (
+            "0x" + (signature.r.to_bytes(32, "big") + signature.s.to_bytes(32, "big") + bytes([signature.v + 27])).hex()
+        )
+
+    def sign(self, message_class: Type[EIP712Struct], **kwargs) -> Dict[str, Any]:
+        """
+        Build and sign a message, returning its fields along with the signature.
+        """
+        encoder = get_struct_encoder(message_class)
+        message = {name: kwargs.get(name) for name in encoder.names}
+        message["signature"] = self.sign_digest(keccak(self.prefix + encoder.hash_struct(message)))
+        return message
+
+    def sign_batch(
+        self,
+        message_class: Type[EIP712Struct],
+        messages: List[Dict[str, Any]],
+        executor: Executor = None,
+        workers: int = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Sign a batch of messages, spreading the work over the executor when one is given.
+        The batch is cut into one chunk per worker, `workers` defaults to the number of cores.
+        Results are returned in the order of the input.
+        """
+        if executor is None or len(messages) < 2:
+            return [self.sign(message_class, **message) for message in messages]
+        workers = workers or os.cpu_count() or 1
+        chunksize = math.ceil(len(messages) / workers)
+        return list(executor.map(partial(_sign_message, self, message_class), messages, chunksize=chunksize))
+
+
+class EIP712Verifier:
+    """
+    Recovers the signers of hundred_x messages for a single domain.
+    """
+
+    def __init__(self, domain: EIP712Struct):
+        self.domain_separator = domain.hash_struct()
+        self.prefix = EIP712_PREFIX + self.domain_separator
+
+    def digest(self, message_class: Type[EIP712Struct], values: Dict[str, Any]) -> bytes:
+        """
+        The EIP-712 digest of a message.
+        """
+        return keccak(self.prefix + get_struct_encoder(message_class).hash_struct(values))
+
+    def recover(self, message_class: Type[EIP712Struct], values: Dict[str, Any], signature: str) -> str:
+        """
+        Recover the checksummed address that signed a message from its hex encoded r || s || v signature.
+        """
+        return self.recover_digest(self.digest(message_class, values), signature).to_checksum_address()
+
+    @staticmethod
+    def recover_digest(digest: bytes, signature: str) -> PublicKey:
+        """
+        Recover the public key that signed a digest.
+        """
+        raw = bytes.fromhex(signature[2:] if signature[:2] in ("0x", "0X") else signature)
+        if len(raw) != 65:
+            raise ValueError(f"Signature must be 65 bytes long. It is instead: {len(raw)}")
+        v = raw[64] - 27 if raw[64] >= 27 else raw[64]
+        vrs = (v, int.from_bytes(raw[:32], "big"), int.from_bytes(raw[32:64], "big"))
+        return Signature(vrs=vrs).recover_public_key_from_msg_hash(digest)
+
+
+def _sign_message(signer: EIP712Signer, message_class: Type[EIP712Struct], message: Dict[str, Any]):
+    return signer.sign(message_class, **message)
+
+
+def create_signing_executor(max_workers: int = None, use_processes: bool = True) -> Executor:
+    """
+    Create an executor for batch signing.
+
+    A process pool scales with the number of cores, a thread pool is enough when the ECDSA backend
+    releases the GIL, as `coincurve` does.
+    """
+    if use_processes:
+        return ProcessPoolExecutor(max_workers=max_workers)
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hundred-x-signer")
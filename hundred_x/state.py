@@ -0,0 +1,132 @@
+"""
+Client state persisted across process restarts.
+
+The state file holds one entry per (rest url, account) with the session cookie and its expiry, whether the referral
+is registered, the product catalogue, the server clock offset and the last used nonce per subaccount. Every update
+re-reads the file under an exclusive lock and replaces it atomically, so several processes can share one file.
+"""
+
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Dict, List, Optional
+
+from hundred_x.products import DEFAULT_PRODUCTS_TTL
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # no advisory locks on windows, the file is still replaced atomically
+    fcntl = None
+
+STATE_VERSION = 1
+DEFAULT_SESSION_TTL = 12 * 60 * 60
+
+
+@dataclass
+class ClientState:
+    """
+    Persisted state of a client for one (rest url, account).
+    """
+
+    session_cookie: Optional[str] = None
+    session_expiry: float = 0.0
+    referred: bool = False
+    products: Optional[List[Dict[str, Any]]] = None
+    products_fetched: float = 0.0
+    clock_offset: float = 0.0
+    nonces: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ClientState":
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
+
+    def session_valid(self, now: float = None) -> bool:
+        return bool(self.session_cookie) and self.session_expiry > (time.time() if now is None else now)
+
+    def products_fresh(self, ttl: float = DEFAULT_PRODUCTS_TTL, now: float = None) -> bool:
+        return self.products is not None and (time.time() if now is None else now) - self.products_fetched < ttl
+
+    def last_nonce(self, subaccount_id: int) -> int:
+        return self.nonces.get(str(subaccount_id), 0)
+
+
+class StateStore:
+    """
+    Json state file written atomically under an exclusive lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.lock_path = self.path + ".lock"
+
+    @staticmethod
+    def key(rest_url: str, account: str) -> str:
+        return f"{rest_url}|{account}"
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.lock_path, "a", encoding="utf-8") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"version": STATE_VERSION, "clients": {}}
+        if data.get("version") != STATE_VERSION:
+            return {"version": STATE_VERSION, "clients": {}}
+        return data
+
+    def _write(self, data: Dict[str, Any]):
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".state-", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, self.path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def load(self, key: str) -> ClientState:
+        """
+        Load the state stored under a key, an empty state when there is none.
+        """
+        with self._locked():
+            return ClientState.from_dict(self._read()["clients"].get(key, {}))
+
+    def save(self, key: str, state: ClientState):
+        """
+        Store the state under a key, keeping the highest nonce seen per subaccount by any process.
+        """
+        with self._locked():
+            data = self._read()
+            stored = data["clients"].get(key, {})
+            nonces = dict(stored.get("nonces", {}))
+            for subaccount_id, nonce in state.nonces.items():
+                nonces[subaccount_id] = max(nonce, nonces.get(subaccount_id, 0))
+            data["clients"][key] = {**asdict(state), "nonces": nonces}
+            self._write(data)
+
+    def clear(self, key: str):
+        """
+        Forget the state stored under a key.
+        """
+        with self._locked():
+            data = self._read()
+            if data["clients"].pop(key, None) is not None:
+                self._write(data)
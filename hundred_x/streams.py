@@ -0,0 +1,547 @@
+"""
+Streaming market data client for the HundredX websocket API.
+
+The async client is the primary implementation, the sync client runs it on a background event loop.
+"""
+
+import asyncio
+import inspect
+import itertools
+import json
+import logging
+import queue
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, ClassVar, Dict, Iterable, List, Optional, Tuple, Union
+
+import websockets
+
+from hundred_x.enums import Channel
+from hundred_x.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 10_000
+DEFAULT_KLINE_INTERVAL = "1m"
+
+EVENT_TYPES = {
+    "24hrTicker": Channel.TICKER,
+    "ticker": Channel.TICKER,
+    "depthUpdate": Channel.DEPTH,
+    "depth": Channel.DEPTH,
+    "trade": Channel.TRADE,
+    "kline": Channel.KLINE,
+}
+
+Level = Tuple[int, int]
+Callback = Callable[["StreamEvent"], Any]
+
+_CLOSED = object()
+
+
+def to_websocket_url(url: str) -> str:
+    """Map an http(s) stream url onto the matching ws(s) url."""
+    if url.startswith("http"):
+        return "ws" + url[4:]
+    return url
+
+
+def stream_name(channel: Channel, symbol: str, interval: str = None) -> str:
+    """Build the name of the stream for a channel and symbol."""
+    if channel is Channel.KLINE:
+        return f"{symbol}@{channel.value}_{interval or DEFAULT_KLINE_INTERVAL}"
+    return f"{symbol}@{channel.value}"
+
+
+def _first(data: Dict[str, Any], *keys: str) -> Any:
+    for key in keys:
+        value = data.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def _to_int(value: Any) -> Optional[int]:
+    return None if value is None else int(value)
+
+
+def _to_levels(levels: Iterable) -> Tuple[Level, ...]:
+    return tuple((int(price), int(quantity)) for price, quantity, *_ in levels or ())
+
+
+@dataclass(frozen=True)
+class StreamEvent:
+    """
+    Base class for all events delivered by the stream clients.
+    Prices and quantities are kept as the 1e18 scaled integers sent by the exchange.
+    """
+
+    channel: ClassVar[Channel]
+
+    symbol: str
+    timestamp: Optional[int]
+    raw: Dict[str, Any] = field(repr=False, compare=False)
+
+
+@dataclass(frozen=True)
+class TickerEvent(StreamEvent):
+    """
+    24hr ticker update for a symbol.
+    """
+
+    channel: ClassVar[Channel] = Channel.TICKER
+
+    last_price: Optional[int]
+    mark_price: Optional[int]
+    best_bid: Optional[int]
+    best_ask: Optional[int]
+    volume: Optional[int]
+
+    @classmethod
+    def from_data(cls, symbol: str, data: Dict[str, Any]) -> "TickerEvent":
+        return cls(
+            symbol=symbol,
+            timestamp=_to_int(_first(data, "E", "timestamp")),
+            raw=data,
+            last_price=_to_int(_first(data, "lastPrice", "c")),
+            mark_price=_to_int(_first(data, "markPrice")),
+            best_bid=_to_int(_first(data, "bestBidPrice", "b")),
+            best_ask=_to_int(_first(data, "bestAskPrice", "a")),
+            volume=_to_int(_first(data, "volume", "v")),
+        )
+
+
+@dataclass(frozen=True)
+class DepthEvent(StreamEvent):
+    """
+    Order book delta for a symbol, levels are (price, quantity) pairs and a zero quantity removes the level.
+    """
+
+    channel: ClassVar[Channel] = Channel.DEPTH
+
+    bids: Tuple[Level, ...]
+    asks: Tuple[Level, ...]
+    first_sequence: Optional[int]
+    sequence: Optional[int]
+
+    @classmethod
+    def from_data(cls, symbol: str, data: Dict[str, Any]) -> "DepthEvent":
+        sequence = _to_int(_first(data, "u", "lastUpdateId"))
+        first_sequence = _to_int(_first(data, "U", "firstUpdateId"))
+        return cls(
+            symbol=symbol,
+            timestamp=_to_int(_first(data, "E", "timestamp")),
+            raw=data,
+            bids=_to_levels(_first(data, "b", "bids")),
+            asks=_to_levels(_first(data, "a", "asks")),
+            first_sequence=sequence if first_sequence is None else first_sequence,
+            sequence=sequence,
+        )
+
+
+@dataclass(frozen=True)
+class TradeEvent(StreamEvent):
+    """
+    Public trade for a symbol.
+    """
+
+    channel: ClassVar[Channel] = Channel.TRADE
+
+    trade_id: Optional[str]
+    price: int
+    quantity: int
+    is_buyer_maker: Optional[bool]
+
+    @classmethod
+    def from_data(cls, symbol: str, data: Dict[str, Any]) -> "TradeEvent":
+        trade_id = _first(data, "t", "id")
+        return cls(
+            symbol=symbol,
+            timestamp=_to_int(_first(data, "T", "E", "time", "timestamp")),
+            raw=data,
+            trade_id=None if trade_id is None else str(trade_id),
+            price=int(_first(data, "p", "price")),
+            quantity=int(_first(data, "q", "quantity")),
+            is_buyer_maker=_first(data, "m", "isBuyerMaker"),
+        )
+
+
+@dataclass(frozen=True)
+class KlineEvent(StreamEvent):
+    """
+    Candlestick update for a symbol and interval.
+    """
+
+    channel: ClassVar[Channel] = Channel.KLINE
+
+    interval: Optional[str]
+    open_time: int
+    close_time: Optional[int]
+    open: int
+    high: int
+    low: int
+    close: int
+    volume: int
+    closed: bool
+
+    @classmethod
+    def from_data(cls, symbol: str, data: Dict[str, Any]) -> "KlineEvent":
+        kline = data.get("k", data)
+        return cls(
+            symbol=symbol,
+            timestamp=_to_int(_first(data, "E", "timestamp")),
+            raw=data,
+            interval=_first(kline, "i", "interval"),
+            open_time=int(_first(kline, "t", "openTime")),
+            close_time=_to_int(_first(kline, "T", "closeTime")),
+            open=int(_first(kline, "o", "open")),
+            high=int(_first(kline, "h", "high")),
+            low=int(_first(kline, "l", "low")),
+            close=int(_first(kline, "c", "close")),
+            volume=int(_first(kline, "v", "volume")),
+            closed=bool(_first(kline, "x", "closed")),
+        )
+
+
+EVENT_CLASSES = {
+    Channel.TICKER: TickerEvent,
+    Channel.DEPTH: DepthEvent,
+    Channel.TRADE: TradeEvent,
+    Channel.KLINE: KlineEvent,
+}
+
+
+def parse_event(message: Dict[str, Any]) -> Optional[StreamEvent]:
+    """
+    Parse a decoded websocket message into a typed event.
+    Control messages such as subscription acknowledgements return None.
+    """
+    if "stream" in message:
+        symbol, _, name = message["stream"].partition("@")
+        try:
+            channel = Channel(name.split("_", 1)[0].rstrip("0123456789"))
+        except ValueError:
+            return None
+        data = message.get("data") or {}
+    elif message.get("e") in EVENT_TYPES:
+        channel = EVENT_TYPES[message["e"]]
+        symbol = str(_first(message, "s", "symbol")).lower()
+        data = message
+    else:
+        return None
+    return EVENT_CLASSES[channel].from_data(symbol, data)
+
+
+class AsyncStreamClient:
+    """
+    Asynchronous market data stream.
+
+    Events are delivered to callbacks registered with `on` and through async iteration over the client.
+    Subscriptions are restored after a reconnect.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 30.0,
+        ping_interval: Optional[float] = 20.0,
+    ):
+        self.url = to_websocket_url(url)
+        self.queue_size = queue_size
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.ping_interval = ping_interval
+        self.dropped = 0
+        self._subscriptions: Dict[str, Tuple[Channel, str]] = {}
+        self._callbacks: Dict[Optional[Channel], List[Callback]] = defaultdict(list)
+        self._request_ids = itertools.count(1)
+        self._queue: Optional[asyncio.Queue] = None
+        self._connection = None
+        self._reader: Optional[asyncio.Task] = None
+        self._closed = True
+
+    @property
+    def subscriptions(self) -> List[str]:
+        return list(self._subscriptions)
+
+    @property
+    def connected(self) -> bool:
+        return not self._closed and self._connection is not None
+
+    def on(self, channel: Optional[Channel], callback: Callback):
+        """
+        Register a callback for a channel, or for every channel when channel is None.
+        Coroutine functions are awaited on the stream task.
+        """
+        self._callbacks[channel].append(callback)
+
+    async def subscribe(self, channel: Channel, symbols: Union[str, List[str]], interval: str = None):
+        """
+        Subscribe to a channel for one or more symbols.
+        """
+        names = self._add_subscriptions(channel, symbols, interval)
+        if names and self.connected:
+            try:
+                await self._send(self._connection, "SUBSCRIBE", names)
+            except websockets.ConnectionClosed:
+                # the subscription is restored when the reader reconnects
+                pass
+
+    async def unsubscribe(self, channel: Channel, symbols: Union[str, List[str]], interval: str = None):
+        """
+        Unsubscribe from a channel for one or more symbols.
+        """
+        symbols = [symbols] if isinstance(symbols, str) else symbols
+        names = [stream_name(channel, symbol, interval) for symbol in symbols]
+        names = [name for name in names if self._subscriptions.pop(name, None) is not None]
+        if names and self.connected:
+            try:
+                await self._send(self._connection, "UNSUBSCRIBE", names)
+            except websockets.ConnectionClosed:
+                pass
+
+    def _add_subscriptions(self, channel: Channel, symbols: Union[str, List[str]], interval: str = None) -> List[str]:
+        symbols = [symbols] if isinstance(symbols, str) else symbols
+        names = []
+        for symbol in symbols:
+            name = stream_name(channel, symbol, interval)
+            if name not in self._subscriptions:
+                self._subscriptions[name] = (channel, symbol)
+                names.append(name)
+        return names
+
+    async def connect(self):
+        """
+        Open the connection and start delivering events.
+        """
+        if not self._closed:
+            return
+        if self.queue_size and self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        try:
+            self._connection = await self._open()
+        except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as error:
+            raise ClientError(f"Failed to connect to {self.url}: {error}") from error
+        self._closed = False
+        self._reader = asyncio.ensure_future(self._read_forever())
+
+    async def close(self):
+        """
+        Close the connection and stop any pending iteration.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+        if self._queue is not None:
+            self._put(_CLOSED)
+
+    async def _open(self):
+        connection = await websockets.connect(self.url, ping_interval=self.ping_interval)
+        if self._subscriptions:
+            await self._send(connection, "SUBSCRIBE", list(self._subscriptions))
+        return connection
+
+    async def _send(self, connection, method: str, names: List[str]):
+        await connection.send(json.dumps({"method": method, "params": names, "id": next(self._request_ids)}))
+
+    async def _read_forever(self):
+        delay = self.reconnect_delay
+        while not self._closed:
+            try:
+                async for raw in self._connection:
+                    await self._dispatch(raw)
+            except websockets.ConnectionClosed:
+                pass
+            while not self._closed:
+                await asyncio.sleep(delay)
+                try:
+                    self._connection = await self._open()
+                    delay = self.reconnect_delay
+                    break
+                except (OSError, asyncio.TimeoutError, websockets.WebSocketException):
+                    delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _dispatch(self, raw: Union[str, bytes]):
+        try:
+            messages = json.loads(raw)
+        except ValueError:
+            logger.warning("Discarding malformed stream message: %r", raw)
+            return
+        for message in messages if isinstance(messages, list) else [messages]:
+            try:
+                event = parse_event(message)
+            except (KeyError, TypeError, ValueError):
+                logger.warning("Discarding unparseable stream message: %r", message)
+                continue
+            if event is None:
+                continue
+            for callback in self._callbacks.get(event.channel, []) + self._callbacks.get(None, []):
+                try:
+                    result = callback(event)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception("Stream callback %s failed for %s", callback, event)
+            if self._queue is not None:
+                self._put(event)
+
+    def _put(self, item: Any):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(item)
+
+    def __aiter__(self):
+        if not self.queue_size:
+            raise ClientError("Iteration requires a stream created with a queue_size.")
+        return self
+
+    async def __anext__(self) -> StreamEvent:
+        if self._queue is None or (self._closed and self._queue.empty()):
+            raise StopAsyncIteration
+        event = await self._queue.get()
+        if event is _CLOSED:
+            raise StopAsyncIteration
+        return event
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+
+class StreamClient:
+    """
+    Synchronous market data stream.
+
+    Runs an AsyncStreamClient on a background event loop, callbacks are invoked on that thread
+    and events can be consumed by iterating over the client.
+    """
+
+    def __init__(self, url: str, queue_size: int = DEFAULT_QUEUE_SIZE, **kwargs):
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._stream = AsyncStreamClient(url, queue_size=0, **kwargs)
+        self._events: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        if queue_size:
+            self._stream.on(None, self._put)
+
+    @property
+    def subscriptions(self) -> List[str]:
+        return self._stream.subscriptions
+
+    @property
+    def connected(self) -> bool:
+        return self._stream.connected
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def on(self, channel: Optional[Channel], callback: Callback):
+        """
+        Register a callback for a channel, or for every channel when channel is None.
+        """
+        self._stream.on(channel, callback)
+
+    def subscribe(self, channel: Channel, symbols: Union[str, List[str]], interval: str = None):
+        """
+        Subscribe to a channel for one or more symbols.
+        """
+        if self._loop is None:
+            self._stream._add_subscriptions(channel, symbols, interval)  # pylint: disable=protected-access
+            return
+        self._call(self._stream.subscribe(channel, symbols, interval))
+
+    def unsubscribe(self, channel: Channel, symbols: Union[str, List[str]], interval: str = None):
+        """
+        Unsubscribe from a channel for one or more symbols.
+        """
+        if self._loop is None:
+            raise ClientError("Stream is not connected.")
+        self._call(self._stream.unsubscribe(channel, symbols, interval))
+
+    def connect(self):
+        """
+        Start the background loop and open the connection.
+        """
+        if self._loop is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="hundred-x-stream", daemon=True)
+        self._thread.start()
+        try:
+            self._call(self._stream.connect())
+        except Exception:
+            self._stop_loop()
+            raise
+
+    def close(self):
+        """
+        Close the connection and stop the background loop.
+        """
+        if self._loop is None:
+            return
+        self._call(self._stream.close())
+        self._stop_loop()
+        if self.queue_size:
+            self._put(_CLOSED)
+
+    def _stop_loop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+
+    def _put(self, item: Any):
+        while True:
+            try:
+                self._events.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._events.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: float = None) -> Optional[StreamEvent]:
+        """
+        Wait for the next event, returning None on timeout or once the stream is closed.
+        """
+        try:
+            event = self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return None if event is _CLOSED else event
+
+    def __iter__(self):
+        while True:
+            event = self._events.get()
+            if event is _CLOSED:
+                return
+            yield event
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,175 @@
+"""
+Trade tape followed by polling `/v1/trade-history`.
+
+The endpoint only returns the `lookback` most recent trades, so the tape keeps a cursor made of the time of the last
+trade it yielded and the ids of the trades at that time, and yields the trades past it oldest first. The lookback of
+the next poll is sized from the number of new trades of the last one and the poll interval shrinks while trades
+arrive and backs off while the tape is quiet, so a quiet market costs few small requests. When every trade of a
+poll is new the window may have skipped some, the poll is repeated with twice the lookback up to `max_lookback`
+before the gap is counted.
+
+Polls are only made when the consumer asks for more trades, so a slow consumer holds back the polling rather than
+a buffer growing, and the tape holds at most one poll of trades at a time.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set
+
+from hundred_x.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOOKBACK = 50
+DEFAULT_MIN_LOOKBACK = 10
+DEFAULT_MAX_LOOKBACK = 1000
+DEFAULT_MIN_INTERVAL = 0.25
+DEFAULT_MAX_INTERVAL = 5.0
+BACKOFF = 2.0
+
+
+@dataclass
+class TapeCursor:
+    """
+    Position of a tape, the time of the last trade yielded and the ids of the trades yielded at that time.
+    """
+
+    time: int = -1
+    ids: Set[Any] = field(default_factory=set)
+
+    def is_new(self, trade: Dict[str, Any]) -> bool:
+        trade_time = int(trade["time"])
+        return trade_time > self.time or (trade_time == self.time and trade["id"] not in self.ids)
+
+    def advance(self, trade: Dict[str, Any]):
+        trade_time = int(trade["time"])
+        if trade_time > self.time:
+            self.time = trade_time
+            self.ids = set()
+        self.ids.add(trade["id"])
+
+
+class TradeTape:
+    """
+    Trades of a symbol, yielded oldest first as they happen.
+
+    `since` starts the tape at a time in ms, a `cursor` from a previous tape resumes where it stopped. Without either
+    the first poll yields the `lookback` most recent trades.
+    """
+
+    def __init__(
+        self,
+        client,
+        symbol: str,
+        since: int = None,
+        cursor: TapeCursor = None,
+        lookback: int = DEFAULT_LOOKBACK,
+        min_lookback: int = DEFAULT_MIN_LOOKBACK,
+        max_lookback: int = DEFAULT_MAX_LOOKBACK,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+    ):
+        self.client = client
+        self.symbol = symbol
+        self.cursor = cursor or TapeCursor(time=-1 if since is None else since)
+        self.min_lookback = min(min_lookback, max_lookback)
+        self.max_lookback = max_lookback
+        self.lookback = max(self.min_lookback, min(lookback, max_lookback))
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.interval = min_interval
+        self.polls = 0
+        self.gaps = 0
+        self._closed = False
+
+    @property
+    def last_time(self) -> Optional[int]:
+        return None if self.cursor.time < 0 else self.cursor.time
+
+    def close(self):
+        """
+        Stop the tape after the trades of the current poll.
+        """
+        self._closed = True
+
+    def _params(self) -> Dict[str, Any]:
+        return {"symbol": self.symbol, "lookback": self.lookback}
+
+    def _accept(self, response: Any) -> Optional[List[Dict[str, Any]]]:
+        """
+        New trades of a poll oldest first, None when the poll has to be repeated with a larger lookback.
+        """
+        if not isinstance(response, list):
+            raise ClientError(f"Unexpected trade history response: {response}")
+        self.polls += 1
+        trades = [trade for trade in response if self.cursor.is_new(trade)]
+        if trades and len(trades) == len(response) >= self.lookback and self.cursor.time >= 0:
+            if self.lookback < self.max_lookback:
+                self.lookback = min(self.lookback * 2, self.max_lookback)
+                return None
+            self.gaps += 1
+            logger.warning("Trade tape of %s fell behind by more than %s trades", self.symbol, self.max_lookback)
+        trades.reverse()
+        trades.sort(key=lambda trade: int(trade["time"]))
+        for trade in trades:
+            self.cursor.advance(trade)
+        self.lookback = max(self.min_lookback, min(2 * len(trades), self.max_lookback))
+        if trades:
+            self.interval = max(self.min_interval, self.interval / BACKOFF)
+        else:
+            self.interval = min(self.max_interval, max(self.interval * BACKOFF, self.min_interval))
+        return trades
+
+    def _poll(self) -> List[Dict[str, Any]]:
+        while True:
+            trades = self._accept(self.client.get_trade_history(**self._params()))
+            if trades is not None:
+                return trades
+
+    def batches(self) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield the new trades of every poll that has some, waiting the poll interval between polls.
+        """
+        while not self._closed:
+            trades = self._poll()
+            if trades:
+                yield trades
+            if not self._closed:
+                time.sleep(self.interval)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for trades in self.batches():
+            yield from trades
+
+
+class AsyncTradeTape(TradeTape):
+    """
+    Trades of a symbol followed by an asynchronous client, yielded oldest first as they happen.
+    """
+
+    async def _poll(self) -> List[Dict[str, Any]]:
+        while True:
+            trades = self._accept(await self.client.get_trade_history(**self._params()))
+            if trades is not None:
+                return trades
+
+    async def batches(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield the new trades of every poll that has some, waiting the poll interval between polls.
+        """
+        while not self._closed:
+            trades = await self._poll()
+            if trades:
+                yield trades
+            if not self._closed:
+                await asyncio.sleep(self.interval)
+
+    def __iter__(self):
+        raise TypeError("Use `async for` to follow an asynchronous trade tape")
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        async for trades in self.batches():
+            for trade in trades:
+                yield trade
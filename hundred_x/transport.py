@@ -0,0 +1,250 @@
+"""
+Http transports used by the clients to reach the REST API.
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Any, Dict, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from hundred_x.exceptions import ConnectionFailedError, RequestTimeoutError
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "Content-Type": "application/json",
+}
+
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 16
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_MAX_CONNECTIONS = 16
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+
+# (connect, read) timeouts in seconds
+Timeout = Tuple[float, float]
+
+# http2 support in httpx requires the optional `h2` package, installed with the `http2` extra.
+HTTP2_AVAILABLE = find_spec("h2") is not None
+_http1_fallback_logged = False
+
+
+def _log_http1_fallback():
+    global _http1_fallback_logged  # pylint: disable=global-statement
+    if not _http1_fallback_logged:
+        _http1_fallback_logged = True
+        logger.debug("h2 is not installed, the async transport uses HTTP/1.1, install hundred-x[http2] for HTTP/2")
+
+
+class Transport(ABC):
+    """
+    Interface of the transports used by the sync client.
+
+    A transport sends a single request and returns a response exposing `status_code`, `text` and `json()`.
+    Timeouts and connection failures raise `RequestTimeoutError` and `ConnectionFailedError`. The clients only pass
+    `timeout` when a request policy sets one.
+    """
+
+    @abstractmethod
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: Dict[str, Any] = None,
+        headers: Dict[str, str] = None,
+        json: Any = None,
+        timeout: Timeout = None,
+    ):
+        """
+        Send a request and return its response.
+        """
+
+    def warm_up(self, url: str):
+        """
+        Open connections ahead of the first request.
+        """
+
+    def close(self):
+        """
+        Release the connections held by the transport.
+        """
+
+
+class RequestsTransport(Transport):
+    """
+    Transport over a single keep-alive `requests.Session` with a bounded connection pool.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        prewarm: int = 0,
+        session: requests.Session = None,
+        timeout: Timeout = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_TIMEOUT),
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.prewarm = min(prewarm, pool_maxsize)
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: Dict[str, Any] = None,
+        headers: Dict[str, str] = None,
+        json: Any = None,
+        timeout: Timeout = None,
+    ) -> requests.Response:
+        try:
+            return self.session.request(
+                method, url, params=params, headers=headers, json=json, timeout=timeout or self.timeout
+            )
+        except requests.Timeout as error:
+            raise RequestTimeoutError(f"Timed out: {method} {url}", method=method, url=url) from error
+        except requests.ConnectionError as error:
+            raise ConnectionFailedError(f"Connection failed: {method} {url} {error}", method=method, url=url) from error
+
+    def warm_up(self, url: str):
+        """
+        Open `prewarm` connections concurrently so the first requests skip the TCP and TLS handshakes.
+        """
+        if not self.prewarm:
+            return
+
+        def _touch(_):
+            try:
+                self.session.get(url)
+            except requests.RequestException:
+                pass
+
+        with ThreadPoolExecutor(max_workers=self.prewarm) as executor:
+            list(executor.map(_touch, range(self.prewarm)))
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncTransport(ABC):
+    """
+    Interface of the transports used by the async client, errors are raised as by `Transport`.
+    """
+
+    @abstractmethod
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: Dict[str, Any] = None,
+        headers: Dict[str, str] = None,
+        json: Any = None,
+        timeout: Timeout = None,
+    ):
+        """
+        Send a request and return its response.
+        """
+
+    async def warm_up(self, url: str):
+        """
+        Open connections ahead of the first request.
+        """
+
+    async def aclose(self):
+        """
+        Release the connections held by the transport.
+        """
+
+
+class HttpxTransport(AsyncTransport):
+    """
+    Transport over a single long-lived `httpx.AsyncClient`.
+
+    Requests are multiplexed over http2 connections with the `http2` extra installed, falling back to a pool of
+    http1.1 keep-alive connections otherwise. httpx is only imported here, so the sync client does not pay for it.
+    """
+
+    def __init__(
+        self,
+        http2: bool = True,
+        limits: "httpx.Limits" = None,
+        timeout: "httpx.Timeout" = None,
+        prewarm: int = 0,
+        client: "httpx.AsyncClient" = None,
+    ):
+        import httpx  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        self.http2 = http2 and HTTP2_AVAILABLE
+        if http2 and not HTTP2_AVAILABLE:
+            _log_http1_fallback()
+        self.prewarm = prewarm
+        self.client = client or httpx.AsyncClient(
+            http2=self.http2,
+            limits=limits
+            or httpx.Limits(
+                max_connections=DEFAULT_MAX_CONNECTIONS,
+                max_keepalive_connections=DEFAULT_MAX_CONNECTIONS,
+                keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY,
+            ),
+            timeout=timeout or httpx.Timeout(DEFAULT_TIMEOUT, connect=DEFAULT_CONNECT_TIMEOUT),
+            headers=DEFAULT_HEADERS,
+        )
+        self._errors = httpx.HTTPError
+        self._timeout_errors = httpx.TimeoutException
+        self._transport_errors = httpx.TransportError
+        self._timeout_class = httpx.Timeout
+
+    @property
+    def closed(self) -> bool:
+        return self.client.is_closed
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: Dict[str, Any] = None,
+        headers: Dict[str, str] = None,
+        json: Any = None,
+        timeout: Timeout = None,
+    ) -> "httpx.Response":
+        kwargs = {}
+        if timeout is not None:
+            kwargs["timeout"] = self._timeout_class(timeout[1], connect=timeout[0])
+        try:
+            return await self.client.request(method, url, params=params, headers=headers, json=json, **kwargs)
+        except self._timeout_errors as error:
+            raise RequestTimeoutError(f"Timed out: {method} {url}", method=method, url=url) from error
+        except self._transport_errors as error:
+            raise ConnectionFailedError(f"Connection failed: {method} {url} {error}", method=method, url=url) from error
+
+    async def warm_up(self, url: str):
+        """
+        Open `prewarm` connections concurrently so the first requests skip the TCP and TLS handshakes.
+        """
+
+        async def _touch():
+            try:
+                await self.client.get(url)
+            except self._errors:
+                pass
+
+        await asyncio.gather(*(_touch() for _ in range(self.prewarm)))
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -4,6 +4,7 @@ Utils module for hundred_x package.
 
 import json
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict
 
@@ -22,8 +23,9 @@ def get_base_url(envirnment: Environment):
     """Map the environment to the corresponding base URL."""
 
 
+@lru_cache(maxsize=None)
 def get_abi(contract_name: str):
-    """Get the ABI of the contract."""
+    """Get the ABI of the contract, loaded once on first use."""
     with open(Path(INSTALL_DIR) / "abis" / f"{contract_name}.json", "r", encoding=DEFAULT_ENCODING) as f:
         return json.load(f)
 
@@ -0,0 +1,161 @@
+"""
+Local checks of orders against the product rules, made before an order is signed.
+
+Prices and quantities off the product increments are rejected or snapped depending on the rounding mode, so an order
+the exchange would refuse fails without a round trip.
+"""
+
+from typing import Any, Dict, Optional
+
+from eip712_structs import Uint
+
+from hundred_x.eip_712 import Order
+from hundred_x.enums import OrderType, Rounding
+from hundred_x.exceptions import (
+    ExpirationError,
+    FieldRangeError,
+    InvalidPriceError,
+    InvalidQuantityError,
+    MinNotionalError,
+    UserInputValidationError,
+)
+from hundred_x.fixed_point import WEI
+from hundred_x.products import Product
+
+# order expirations are sent in microseconds, the bounds are in milliseconds
+EXPIRATION_SCALE = 1000
+DEFAULT_MAX_EXPIRY = 1000 * 60 * 60 * 24 * 30
+
+ORDER_FIELD_BITS = {name: member.length for name, member in Order.get_members() if isinstance(member, Uint)}
+
+
+def snap(value: int, increment: int, rounding: Rounding, is_buy: bool = True) -> Optional[int]:
+    """
+    Snap a 1e18 scaled amount to a multiple of the increment, None when it is off and the rounding is REJECT.
+    """
+    if not increment:
+        return value
+    remainder = value % increment
+    if not remainder:
+        return value
+    if rounding is Rounding.REJECT:
+        return None
+    if rounding is Rounding.PASSIVE:
+        rounding = Rounding.DOWN if is_buy else Rounding.UP
+    down = value - remainder
+    if rounding is Rounding.DOWN:
+        return down
+    if rounding is Rounding.UP:
+        return down + increment
+    return down + increment if remainder * 2 >= increment else down
+
+
+def check_widths(params: Dict[str, Any], field_bits: Dict[str, int] = None):
+    """
+    Check that every integer field fits the width of its EIP-712 field.
+    """
+    for name, bits in (field_bits or ORDER_FIELD_BITS).items():
+        value = params.get(name)
+        if value is None:
+            continue
+        if not 0 <= int(value) < 1 << bits:
+            raise FieldRangeError(f"{name} {value} does not fit in uint{bits}.", name, value)
+
+
+class OrderValidator:
+    """
+    Checks the fields of an Order message against the trading rules of its product.
+
+    Prices and quantities off the increments raise unless a rounding mode other than REJECT is set, PASSIVE rounds
+    buy prices down and sell prices up. Quantities are never rounded up past what was asked, PASSIVE rounds them down
+    and UP or NEAREST are refused.
+    """
+
+    def __init__(
+        self,
+        price_rounding: Rounding = Rounding.REJECT,
+        quantity_rounding: Rounding = Rounding.REJECT,
+        max_expiry: int = DEFAULT_MAX_EXPIRY,
+    ):
+        if quantity_rounding in (Rounding.UP, Rounding.NEAREST):
+            raise UserInputValidationError(
+                f"Quantities are only rounded down, {quantity_rounding} could exceed the requested quantity."
+            )
+        self.price_rounding = price_rounding
+        self.quantity_rounding = quantity_rounding
+        self.max_expiry = max_expiry
+
+    def validate(self, params: Dict[str, Any], product: Product = None, now: int = None) -> Dict[str, Any]:
+        """
+        Check the fields of an Order message, snapping price and quantity in place.
+
+        The product rules are skipped when the product is unknown, `now` is the current time in ms.
+        """
+        if product is not None:
+            self._check_quantity(params, product)
+            if params.get("orderType") != OrderType.MARKET.value:
+                self._check_price(params, product)
+        if now is not None:
+            self._check_expiration(params, now)
+        check_widths(params)
+        return params
+
+    def _check_price(self, params: Dict[str, Any], product: Product):
+        price = params.get("price")
+        if price is None:
+            return
+        if price <= 0:
+            raise InvalidPriceError(f"Price must be positive. It is instead: {price}", "price", price)
+        snapped = snap(price, product.tick_size, self.price_rounding, params["isBuy"])
+        if snapped is None:
+            raise InvalidPriceError(
+                f"Price {price} is not a multiple of the tick size {product.tick_size} of {product.symbol}.",
+                "price",
+                price,
+            )
+        if snapped <= 0:
+            raise InvalidPriceError(f"Price {price} rounds to zero on {product.symbol}.", "price", price)
+        params["price"] = snapped
+        if product.min_notional and snapped * params["quantity"] < product.min_notional * WEI:
+            raise MinNotionalError(
+                f"Notional {snapped * params['quantity'] // WEI} is below the minimum {product.min_notional} "
+                f"of {product.symbol}.",
+                "price",
+                snapped,
+            )
+
+    def _check_quantity(self, params: Dict[str, Any], product: Product):
+        quantity = params["quantity"]
+        rounding = Rounding.DOWN if self.quantity_rounding is Rounding.PASSIVE else self.quantity_rounding
+        snapped = snap(quantity, product.lot_size, rounding)
+        if snapped is None:
+            raise InvalidQuantityError(
+                f"Quantity {quantity} is not a multiple of the lot size {product.lot_size} of {product.symbol}.",
+                "quantity",
+                quantity,
+            )
+        if snapped <= 0 or snapped < product.min_quantity:
+            raise InvalidQuantityError(
+                f"Quantity {quantity} is below the minimum {max(product.min_quantity, 1)} of {product.symbol}.",
+                "quantity",
+                quantity,
+            )
+        if product.max_quantity and snapped > product.max_quantity:
+            raise InvalidQuantityError(
+                f"Quantity {quantity} is above the maximum {product.max_quantity} of {product.symbol}.",
+                "quantity",
+                quantity,
+            )
+        params["quantity"] = snapped
+
+    def _check_expiration(self, params: Dict[str, Any], now: int):
+        expiration = params.get("expiration")
+        if expiration is None:
+            return
+        expiration_ms = expiration // EXPIRATION_SCALE
+        if expiration_ms <= now:
+            raise ExpirationError(f"Expiration {expiration} is in the past.", "expiration", expiration)
+        if self.max_expiry and expiration_ms > now + self.max_expiry:
+            raise ExpirationError(
+                f"Expiration {expiration} is more than {self.max_expiry} ms ahead.", "expiration", expiration
+            )
@@ -0,0 +1,91 @@
+"""
+Tests for the multi subaccount manager.
+"""
+
+import pytest
+
+from hundred_x.accounts import AccountTable, AsyncAccountManager
+from hundred_x.async_client import AsyncHundredXClient
+from hundred_x.client import HundredXClient
+from hundred_x.enums import Environment, OrderSide
+from hundred_x.exceptions import UserInputValidationError
+from hundred_x.mock_server import MockServer
+from tests.test_data import TEST_ORDER, TEST_PRIVATE_KEY
+from tests.test_transport import FakeTransport
+
+ORDER = {key: value for key, value in TEST_ORDER.items() if key != "subaccount_id"}
+
+
+def test_reads_take_a_subaccount():
+    transport = FakeTransport()
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, subaccount_id=1, transport=transport)
+    client.get_position()
+    client.get_position(subaccount_id=7)
+    client.get_open_orders("ethperp", subaccount_id=0)
+    subaccounts = [params["subAccountId"] for _, _, params, _, _ in transport.requests if params]
+    assert subaccounts[-3:] == [1, 7, 0]
+
+
+def test_manager_fans_out_over_one_session():
+    with MockServer() as server:
+        with HundredXClient(private_key=TEST_PRIVATE_KEY, **server.client_kwargs()) as client:
+            manager = client.create_account_manager(range(1, 4), max_in_flight=3)
+            manager[1].create_order(**ORDER)
+            manager[2].create_order(**{**ORDER, "price": 2990})
+            manager[3].create_order(**{**ORDER, "side": OrderSide.SELL, "price": 3100})
+            orders = manager.open_orders()
+            balances = manager.balances()
+            assert len(server.exchange.sessions) == 1
+
+    assert orders.ok and len(orders) == 3
+    assert {row["subAccountId"] for row in orders} == {1, 2, 3}
+    assert sorted(orders.by_subaccount()) == [1, 2, 3]
+    assert [row["subAccountId"] for row in balances] == [1, 2, 3]
+
+
+def test_failed_subaccounts_are_reported():
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=FakeTransport())
+    manager = client.create_account_manager([0, 1])
+
+    def read(view):
+        if view.subaccount_id == 1:
+            raise RuntimeError("down")
+        return [{"asset": "USDB"}]
+
+    table = manager.fan_out(read)
+    assert not table.ok and list(table.errors) == [1]
+    assert table == [{"asset": "USDB", "subAccountId": 0}]
+    with pytest.raises(UserInputValidationError):
+        client.create_account_manager([256])
+
+
+def test_typed_rows_are_dicts():
+    transport = FakeTransport({"/v1/positionRisk": [{"productSymbol": "ethperp", "quantity": "1"}]})
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=transport, typed_responses=True)
+    table = client.create_account_manager([2]).positions()
+    assert isinstance(table, AccountTable)
+    assert table == [{**table[0], "productSymbol": "ethperp", "quantity": "1", "subAccountId": 2}]
+
+
+@pytest.mark.asyncio
+async def test_async_manager():
+    with MockServer() as server:
+        async with await AsyncHundredXClient.create(private_key=TEST_PRIVATE_KEY, **server.client_kwargs()) as client:
+            manager = client.create_account_manager([4, 5])
+            await manager[5].create_order(**ORDER)
+            orders = await manager.open_orders()
+    assert [row["subAccountId"] for row in orders] == [5]
+
+
+@pytest.mark.asyncio
+async def test_async_failures_are_keyed_by_subaccount():
+    manager = AsyncAccountManager(None, [3, 9], max_in_flight=1)
+
+    async def read(view):
+        if view.subaccount_id == 9:
+            raise RuntimeError("down")
+        return {"asset": "USDB"}
+
+    table = await manager.fan_out(read)
+    assert list(table.errors) == [9] and isinstance(table.errors[9], RuntimeError)
+    assert table == [{"asset": "USDB", "subAccountId": 3}]
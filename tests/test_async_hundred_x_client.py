@@ -2,19 +2,26 @@
 Tests for the async client.
 """
 
+import asyncio
+
 import pytest
 import respx
 from httpx import Response
 
 from hundred_x.async_client import AsyncHundredXClient
 from hundred_x.enums import Environment
+from hundred_x.transport import HTTP2_AVAILABLE
 from tests.test_data import TEST_ORDER_ID, TEST_PRICE, TEST_PRIVATE_KEY, TEST_SYMBOL
+from tests.test_transport import FakeTransport
 
 
 @pytest.fixture
 def client():
     env = Environment.PROD
-    return AsyncHundredXClient(env, TEST_PRIVATE_KEY)
+    client = AsyncHundredXClient(env, TEST_PRIVATE_KEY)
+    # skip the lazy login, the session is covered by its own tests
+    client.session_cookie = "session"
+    return client
 
 
 @pytest.mark.asyncio
@@ -30,11 +37,12 @@ async def test_get_symbol(
 
 
 @pytest.mark.asyncio
+@respx.mock
 async def test_get_depth(client):
     respx.get(f"{client.rest_url}/v1/depth", params={"symbol": TEST_SYMBOL, "limit": 5}).mock(
         return_value=Response(200, json={"bids": [], "asks": []})
     )
-    response = await client.get_depth(TEST_SYMBOL)
+    response = await client.get_depth(TEST_SYMBOL, limit=5)
     assert "bids" in response
     assert "asks" in response
 
@@ -92,3 +100,70 @@ async def test_cancel_order(client):
     ).mock(return_value=Response(200, json={"orderId": TEST_ORDER_ID}))
     response = await client.cancel_order(order_id=TEST_ORDER_ID, product_id=1002)
     assert response["orderId"] == TEST_ORDER_ID
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_shared_async_transport():
+    async with AsyncHundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=FakeTransport()) as client:
+        http_client = client.async_transport.client
+        route = respx.get(f"{client.rest_url}/v1/depth").mock(return_value=Response(200, json={"bids": []}))
+        await asyncio.gather(*(client.get_depth(TEST_SYMBOL) for _ in range(10)))
+        assert route.call_count == 10
+        assert client.async_transport.client is http_client
+        assert not client.async_transport.closed
+        assert client.async_transport.http2 is HTTP2_AVAILABLE
+    assert client.async_transport.closed
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_create_opens_session():
+    login = respx.post(f"{AsyncHundredXClient(Environment.PROD).rest_url}/v1/session/login").mock(
+        return_value=Response(200, json={"value": "session"})
+    )
+    referral = respx.post(url__regex=r".*/v1/referral/add-referee").mock(return_value=Response(200, json={}))
+    client = await AsyncHundredXClient.create(Environment.PROD, TEST_PRIVATE_KEY)
+    assert client.session_cookie == "session"
+    assert login.call_count == 1
+    assert referral.call_count == 1
+    assert referral.calls[0].request.headers["cookie"] == "connectedAddress=session"
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_lazy_login_happens_once():
+    client = AsyncHundredXClient(Environment.PROD, TEST_PRIVATE_KEY)
+    login = respx.post(f"{client.rest_url}/v1/session/login").mock(
+        return_value=Response(200, json={"value": "session"})
+    )
+    respx.get(f"{client.rest_url}/v1/balances").mock(return_value=Response(200, json={"balances": []}))
+    await asyncio.gather(*(client.get_spot_balances() for _ in range(5)))
+    assert login.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_public_endpoints_are_async(client):
+    respx.get(f"{client.rest_url}/v1/products").mock(return_value=Response(200, json=[{"symbol": TEST_SYMBOL}]))
+    respx.get(f"{client.rest_url}/v1/products/{TEST_SYMBOL}").mock(
+        return_value=Response(200, json={"symbol": TEST_SYMBOL})
+    )
+    respx.get(f"{client.rest_url}/v1/time").mock(return_value=Response(200, json={"serverTime": 1}))
+    respx.get(f"{client.rest_url}/v1/uiKlines", params={"symbol": TEST_SYMBOL, "interval": "1m"}).mock(
+        return_value=Response(200, json=[])
+    )
+    respx.get(f"{client.rest_url}/v1/orders").mock(return_value=Response(200, json=[]))
+    products, product, server_time, candles, orders = await asyncio.gather(
+        client.list_products(),
+        client.get_product(TEST_SYMBOL),
+        client.get_server_time(),
+        client.get_candlestick(TEST_SYMBOL, interval="1m"),
+        client.get_orders(),
+    )
+    assert products[0]["symbol"] == TEST_SYMBOL
+    assert product["symbol"] == TEST_SYMBOL
+    assert server_time["serverTime"] == 1
+    assert candles == []
+    assert orders == []
@@ -0,0 +1,105 @@
+"""
+Tests for the bulk order endpoints.
+"""
+
+import json
+
+import pytest
+import respx
+from httpx import Response
+
+from hundred_x.async_client import AsyncHundredXClient
+from hundred_x.batch import dispatch
+from hundred_x.client import HundredXClient
+from hundred_x.enums import Environment, OrderSide, OrderType
+from hundred_x.exceptions import UserInputValidationError
+from tests.test_data import TEST_PRIVATE_KEY
+from tests.test_signing import LADDER
+from tests.test_transport import FakeResponse, FakeTransport
+
+
+class FailingTransport(FakeTransport):
+    """
+    Transport rejecting orders above a price.
+    """
+
+    def request(self, method, url, params=None, headers=None, json=None):
+        if url.endswith("/v1/order") and method == "POST" and int(json["price"]) > 3005 * 10**18:
+            self.requests.append((method, url, params, headers, json))
+            return FakeResponse({"error": "rejected"}, status_code=400)
+        return super().request(method, url, params=params, headers=headers, json=json)
+
+
+@pytest.fixture
+def client():
+    return HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=FailingTransport())
+
+
+def test_dispatch_keeps_order():
+    results = dispatch(lambda message: message["value"] * 2, [{"value": value} for value in range(20)], 4)
+    assert results.responses == [value * 2 for value in range(20)]
+    assert results.ok
+
+
+def test_create_orders_reports_partial_failures(client):
+    results = client.create_orders(LADDER, max_in_flight=4)
+    assert [result.index for result in results] == list(range(len(LADDER)))
+    assert len(results.succeeded) == 6
+    assert [result.index for result in results.failed] == [6, 7]
+    assert "rejected" in str(results.failed[0].error)
+    assert not results.ok
+
+
+def test_invalid_orders_fail_alone(client):
+    orders = [LADDER[0], {**LADDER[1], "order_type": OrderType.LIMIT, "price": None}, LADDER[2]]
+    results = client.create_orders(orders)
+    assert [result.index for result in results] == [0, 1, 2]
+    assert [result.index for result in results.succeeded] == [0, 2]
+    assert isinstance(results[1].error, UserInputValidationError) and results[1].message == orders[1]
+    sent = [body["price"] for method, url, _, _, body in client.transport.requests if url.endswith("/v1/order")]
+    assert sent[-2:] == [str(3000 * 10**18), str(3002 * 10**18)]
+    with pytest.raises(UserInputValidationError):
+        client.sign_orders(orders)
+
+
+def test_cancel_orders(client):
+    results = client.cancel_orders([{"product_id": 1002, "order_id": str(order_id)} for order_id in range(3)])
+    assert results.ok
+    cancels = [request for request in client.transport.requests if request[0] == "DELETE"]
+    assert sorted(request[4]["orderId"] for request in cancels) == ["0", "1", "2"]
+    assert all(request[4]["subAccountId"] == client.subaccount_id for request in cancels)
+
+
+def test_cancel_and_replace_orders(client):
+    replacements = [
+        {"product_id": 1002, "quantity": 1, "price": 3000 + index, "side": OrderSide.SELL, "order_id_to_cancel": index}
+        for index in range(4)
+    ]
+    results = client.cancel_and_replace_orders(replacements)
+    assert results.ok
+    messages = [result.message for result in results]
+    assert [message["idToCancel"] for message in messages] == list(range(4))
+    assert len({message["newOrder"]["nonce"] for message in messages}) == 4
+    assert messages[0]["newOrder"]["isBuy"] is False
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_async_create_orders():
+    client = AsyncHundredXClient(Environment.PROD, TEST_PRIVATE_KEY)
+    client.session_cookie = "session"
+
+    def respond(request):
+        price = int(json.loads(request.content)["price"])
+        if price > 3005 * 10**18:
+            return Response(400, json={"error": "rejected"})
+        return Response(200, json={"price": str(price)})
+
+    respx.get(f"{client.rest_url}/v1/products").mock(return_value=Response(200, json=[]))
+    route = respx.post(f"{client.rest_url}/v1/order").mock(side_effect=respond)
+    results = await client.create_orders(LADDER, max_in_flight=3)
+    assert route.call_count == len(LADDER)
+    assert [result.response["price"] for result in results.succeeded] == [
+        str((3000 + level) * 10**18) for level in range(6)
+    ]
+    assert [result.index for result in results.failed] == [6, 7]
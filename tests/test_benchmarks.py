@@ -0,0 +1,23 @@
+"""
+Tests for the benchmark suite.
+"""
+
+import json
+
+from benchmarks.run import compare, main
+
+
+def test_benchmarks_write_results_and_compare(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    arguments = ["--iterations", "2", "--warmup", "0", "--import-iterations", "1", "--save-baseline", str(baseline)]
+    assert main(arguments) == 0
+    results = json.loads(baseline.read_text())
+    assert {"sign_Order", "sync_create_order", "async_create_order", "validate_function", "import_client"} <= set(
+        results["results"]
+    )
+
+    slower = json.loads(baseline.read_text())
+    for stats in slower["results"].values():
+        stats["median_us"] *= 2
+    assert compare(slower, results, tolerance=0.5) == sorted(results["results"])
+    assert compare(results, slower, tolerance=0.5) == []
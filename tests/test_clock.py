@@ -0,0 +1,126 @@
+"""
+Tests for the server clock synchronisation.
+"""
+
+import time
+
+import pytest
+
+from hundred_x.async_client import AsyncHundredXClient
+from hundred_x.client import HundredXClient
+from hundred_x.clock import MAX_DRIFT, ClockEstimate, ClockSync
+from hundred_x.enums import Environment
+from hundred_x.exceptions import ServerError
+from hundred_x.mock_server import MockServer
+from hundred_x.policy import RequestPolicies, RequestPolicy
+from tests.test_data import TEST_ORDER, TEST_PRIVATE_KEY
+from tests.test_transport import FakeResponse, FakeTransport
+
+SKEW = 5000
+
+
+class SkewedTransport(FakeTransport):
+    """
+    Transport whose server clock runs `SKEW` ms ahead, the first `slow` time requests take 50 ms longer one way.
+    """
+
+    def __init__(self, slow=0):
+        super().__init__()
+        self.slow = slow
+
+    def request(self, method, url, params=None, headers=None, json=None, timeout=None):
+        if not url.endswith("/v1/time"):
+            return super().request(method, url, params, headers, json)
+        self.requests.append((method, url, params, headers, json))
+        server_time = int(time.time() * 1000) + SKEW
+        if self.slow:
+            self.slow -= 1
+            time.sleep(0.05)
+        return FakeResponse({"serverTime": server_time})
+
+
+class FailingTransport(FakeTransport):
+    """
+    Transport answering every request with a server error.
+    """
+
+    def request(self, method, url, params=None, headers=None, json=None, timeout=None):
+        self.requests.append((method, url, params, headers, json))
+        return FakeResponse({}, status_code=500)
+
+
+def test_estimate_follows_offset_and_drift():
+    estimate = ClockEstimate(alpha=0.3, beta=0.05)
+    # the server clock runs 100 ms ahead and gains 0.2 ms per second
+    for step in range(200):
+        now = 1000.0 + step * 10
+        estimate.update(int(100 + 0.2 * (now - 1000) + now * 1000), now - 0.001, now + 0.001)
+    assert estimate.drift == pytest.approx(0.2, abs=0.01)
+    later = now + 60
+    assert estimate.offset_at(later) == pytest.approx(100 + 0.2 * (later - 1000), abs=2)
+
+
+def test_estimate_smooths_noise_and_bounds_drift():
+    estimate = ClockEstimate()
+    estimate.update(1_000_000 + 50, 1000.0, 1000.0)
+    assert estimate.offset == 50
+    estimate.update(1_001_000 + 150, 1001.0, 1001.0)
+    assert 50 < estimate.offset < 150
+    estimate.update(1_002_000 + 10**6, 1002.0, 1002.0)
+    assert abs(estimate.drift) <= MAX_DRIFT
+
+
+def test_sync_uses_the_fastest_round_trip():
+    client = HundredXClient(Environment.PROD, transport=SkewedTransport(slow=2))
+    clock = ClockSync(client, samples=3)
+    client.clock = clock
+    offset = clock.sync()
+    assert offset == pytest.approx(SKEW, abs=10)
+    assert client.clock_offset == offset and clock.estimate.rtt < 0.05
+
+
+def test_background_sync_corrects_timestamps():
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=SkewedTransport())
+    clock = client.start_clock_sync(interval=0.05)
+    assert clock.wait_synced(timeout=5)
+    assert client._current_timestamp() - time.time() * 1000 == pytest.approx(SKEW, abs=50)
+    params = client._order_params(**TEST_ORDER)
+    assert params["nonce"] - time.time() * 1000 == pytest.approx(SKEW, abs=50)
+    assert client._login_message()["timestamp"] - time.time() * 1000 == pytest.approx(SKEW, abs=50)
+    client.close()
+    assert clock._thread is None
+
+
+def test_failed_syncs_keep_the_offset():
+    transport = SkewedTransport()
+    client = HundredXClient(Environment.PROD, transport=transport)
+    client.clock_offset = 42.0
+
+    def fail():
+        raise ConnectionError("down")
+
+    client._sample_server_time = fail
+    with client.start_clock_sync(interval=0.01) as clock:
+        while clock.failures < 2:
+            time.sleep(0.01)
+    assert client._current_timestamp() - time.time() * 1000 == pytest.approx(42, abs=20)
+
+
+def test_samples_are_sent_once():
+    transport = FailingTransport()
+    policies = RequestPolicies(RequestPolicy(retries=3, backoff=0, hedge=True, hedge_delay=0))
+    client = HundredXClient(Environment.PROD, transport=transport, policies=policies)
+    with pytest.raises(ServerError):
+        ClockSync(client, samples=1).sync()
+    assert len(transport.requests) == 1
+    policies.close()
+
+
+@pytest.mark.asyncio
+async def test_async_clock_sync():
+    with MockServer() as server:
+        async with AsyncHundredXClient(**server.client_kwargs()) as client:
+            clock = client.start_clock_sync(interval=0.05)
+            assert await clock.wait_synced(timeout=5)
+            assert abs(client.clock_offset) < 50
+        assert clock._task is None
@@ -0,0 +1,73 @@
+"""
+Tests for the wei fixed-point conversions.
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from hundred_x.fixed_point import (
+    WEI,
+    columns,
+    format_wei,
+    ladder_to_units,
+    to_decimal,
+    to_float,
+    to_units,
+    to_wei,
+    to_wei_many,
+)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [0, 1, 12, 0.1, 0.3, 3000.13, 4000.73, 1e-05, 1e21, -3.5, "1.5", "-0.25", "+2", ".5", "7.", Decimal("2.5")],
+)
+def test_to_wei_matches_decimal(value):
+    assert to_wei(value) == int(Decimal(str(value)) * Decimal(WEI))
+
+
+def test_to_wei_truncates_past_18_decimals():
+    assert to_wei("0.0000000000000000019") == 1
+    assert to_wei("-0.0000000000000000019") == -1
+    assert to_wei("123456789012345.123456789012345678") == 123456789012345123456789012345678
+    assert to_wei_many([1, "0.5"]) == [WEI, WEI // 2]
+    with pytest.raises(ValueError):
+        to_wei("abc")
+
+
+def test_from_wei():
+    assert to_decimal(str(3 * WEI // 2)) == Decimal("1.5")
+    assert to_float(WEI // 4) == 0.25
+    assert format_wei(3 * WEI) == "3"
+    assert format_wei(-3 * WEI // 2) == "-1.5"
+    assert format_wei(1) == "0.000000000000000001"
+    assert to_wei(format_wei(123456789123456789123)) == 123456789123456789123
+
+
+def test_columns():
+    assert list(to_units([str(3000 * WEI), 1], scale=10**9)) == [3000 * 10**9, 0]
+    assert list(to_units([str(3000 * WEI)], scale=1)) == [3000]
+    with pytest.raises(ValueError):
+        to_units([], scale=7)
+
+    prices, quantities = ladder_to_units([[str(3000 * WEI), str(WEI // 2), 1], [str(2999 * WEI), str(WEI)]])
+    assert list(prices) == [3000 * 10**9, 2999 * 10**9]
+    assert list(quantities) == [5 * 10**8, 10**9]
+
+    positions = [
+        {"quantity": str(WEI), "avgEntryPrice": str(3000 * WEI)},
+        {"quantity": str(WEI // 2), "avgEntryPrice": "0"},
+    ]
+    assert {key: list(column) for key, column in columns(positions, ["quantity", "avgEntryPrice"]).items()} == {
+        "quantity": [1.0, 0.5],
+        "avgEntryPrice": [3000.0, 0.0],
+    }
+    assert list(columns(iter(positions), ["quantity"], scale=10)["quantity"]) == [10, 5]
+
+
+def test_units_truncate_negative_amounts_towards_zero():
+    assert list(to_units([-3 * WEI // 2, str(-1), -2 * WEI], scale=1)) == [-1, 0, -2]
+    prices, quantities = ladder_to_units([[str(-3 * WEI // 2), str(-WEI // 4)]], scale=10)
+    assert (list(prices), list(quantities)) == ([-15], [-2])
+    assert list(columns([{"pnl": str(-3 * WEI // 2)}], ["pnl"], scale=1)["pnl"]) == [-1]
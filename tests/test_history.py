@@ -0,0 +1,159 @@
+"""
+Tests for the paginated candlestick history and its cache.
+"""
+
+import time
+
+import pytest
+
+from hundred_x.client import HundredXClient
+from hundred_x.exceptions import UserInputValidationError
+from hundred_x.fixed_point import WEI
+from hundred_x.history import AsyncKlineHistory, Candles, KlineCache, KlineHistory, RateLimiter, missing, pages
+from hundred_x.mock_server import MockServer
+
+MINUTE = 60_000
+NOW = 1_700_000_000_000 - 1_700_000_000_000 % MINUTE
+
+
+def kline(open_time, close=None):
+    price = str((close or open_time // MINUTE % 1000 + 1) * WEI)
+    return {
+        "openTime": open_time,
+        "open": price,
+        "high": price,
+        "low": price,
+        "close": price,
+        "volume": str(WEI),
+    }
+
+
+class FakeKlineClient:
+    """
+    Client answering every page with one candle per minute up to `now`, the open one closing at `close`.
+    """
+
+    def __init__(self, now=NOW):
+        self.now = now
+        self.close = None
+        self.requests = []
+
+    def _current_timestamp(self):
+        return self.now
+
+    def get_candlestick(self, symbol, interval, start_time, end_time, limit):
+        self.requests.append((start_time, end_time, limit))
+        first = start_time - start_time % MINUTE
+        # each page repeats the candle before it, as an api with inclusive bounds would
+        return [
+            kline(open_time, self.close if open_time + MINUTE > self.now else None)
+            for open_time in range(max(first - MINUTE, 0), min(end_time + 1, self.now), MINUTE)
+        ][-limit - 1 :]
+
+
+class AsyncFakeKlineClient(FakeKlineClient):
+    async def get_candlestick(self, *args, **kwargs):  # pylint: disable=invalid-overridden-method
+        return super().get_candlestick(*args, **kwargs)
+
+
+def test_pages_and_missing_ranges():
+    assert pages(0, 5 * MINUTE, MINUTE, page_limit=2) == [
+        (0, 2 * MINUTE),
+        (2 * MINUTE, 4 * MINUTE),
+        (4 * MINUTE, 5 * MINUTE),
+    ]
+    assert missing(None, 0, 10, MINUTE) == [(0, 10)]
+    meta = {"start": 10 * MINUTE, "end": 20 * MINUTE + 5, "count": 10}
+    assert missing(meta, 10 * MINUTE, 20 * MINUTE, MINUTE) == []
+    assert missing(meta, 5 * MINUTE, 30 * MINUTE, MINUTE) == [(5 * MINUTE, 10 * MINUTE), (20 * MINUTE, 30 * MINUTE)]
+
+
+def test_candles_dedupe_and_merge():
+    candles = Candles.from_klines([kline(2 * MINUTE), kline(MINUTE), kline(2 * MINUTE, close=7)])
+    assert list(candles.open_time) == [MINUTE, 2 * MINUTE]
+    assert list(candles.close) == [2.0, 7.0]
+    merged = candles.merge(Candles.from_klines([kline(2 * MINUTE, close=9), kline(3 * MINUTE)]))
+    assert list(merged.open_time) == [MINUTE, 2 * MINUTE, 3 * MINUTE]
+    assert list(merged.close) == [2.0, 9.0, 4.0]
+    assert list(merged.between(2 * MINUTE, 3 * MINUTE).open_time) == [2 * MINUTE]
+
+
+def test_fetch_without_cache_is_paginated():
+    client = FakeKlineClient()
+    history = KlineHistory(client, page_limit=100, rate_limit=0)
+    candles = history.get("ethperp", "1m", NOW - 1000 * MINUTE - 1)
+    assert len(client.requests) == 11
+    assert len(candles) == 1001
+    assert list(candles.open_time) == list(range(NOW - 1001 * MINUTE, NOW, MINUTE))
+    with pytest.raises(UserInputValidationError):
+        history.get("ethperp", "7m", 0)
+
+
+def test_cache_only_fetches_the_tail(tmp_path):
+    client = FakeKlineClient(now=NOW + 30_000)
+    client.close = 1
+    history = KlineHistory(client, cache_dir=str(tmp_path), page_limit=100, rate_limit=0)
+    start = NOW - 500 * MINUTE
+    first = history.get("ethperp", "1m", start)
+    assert len(first) == 501 and len(client.requests) == 6
+    assert isinstance(first.close, memoryview)
+    assert first.close[-1] == 1.0
+
+    client.requests.clear()
+    assert list(history.get("ethperp", "1m", start).open_time) == list(first.open_time)
+    assert client.requests == []
+
+    # 80 seconds later the candle that was open is fetched again along with the new one
+    client.now += 80_000
+    client.close = 2
+    second = history.get("ethperp", "1m", start)
+    assert [request[0] for request in client.requests] == [NOW]
+    assert list(second.open_time[-3:]) == [NOW - MINUTE, NOW, NOW + MINUTE]
+    assert list(second.close[-2:]) == [NOW // MINUTE % 1000 + 1, 2.0]
+    assert KlineCache(str(tmp_path)).meta("ethperp", "1m") == {"start": start, "end": client.now, "count": 502}
+    # the earlier mapping stays readable and sees the corrected candle
+    assert len(first.open_time) == 501 and first.open_time[0] == start
+    assert first.close[-1] == NOW // MINUTE % 1000 + 1
+
+
+def test_cache_backfills_the_head(tmp_path):
+    client = FakeKlineClient()
+    history = KlineHistory(client, cache_dir=str(tmp_path), page_limit=100, rate_limit=0)
+    history.get("ethperp", "1m", NOW - 100 * MINUTE)
+    client.requests.clear()
+    candles = history.get("ethperp", "1m", NOW - 300 * MINUTE, NOW - 200 * MINUTE)
+    assert [request[0] for request in client.requests] == [NOW - 300 * MINUTE, NOW - 200 * MINUTE]
+    assert list(candles.open_time) == list(range(NOW - 300 * MINUTE, NOW - 200 * MINUTE, MINUTE))
+    assert len(KlineCache(str(tmp_path)).load("ethperp", "1m")) == 300
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rate=100)
+    delays = [limiter.delay() for _ in range(3)]
+    assert delays[0] == 0
+    assert delays[2] == pytest.approx(0.02, abs=0.005)
+
+
+@pytest.mark.asyncio
+async def test_async_history(tmp_path):
+    client = AsyncFakeKlineClient()
+    history = AsyncKlineHistory(client, cache_dir=str(tmp_path), page_limit=50, max_in_flight=3, rate_limit=0)
+    candles = await history.get("ethperp", "1m", NOW - 200 * MINUTE)
+    assert list(candles.open_time) == list(range(NOW - 200 * MINUTE, NOW, MINUTE))
+    client.requests.clear()
+    assert len(await history.get("ethperp", "1m", NOW - 200 * MINUTE)) == 200
+    assert client.requests == []
+
+
+def test_history_against_mock_server(tmp_path):
+    with MockServer() as server:
+        now = int(time.time() * 1000)
+        book = server.exchange.books[1002]
+        for minutes in range(30, 0, -1):
+            book.trades.append({"price": str(3000 * WEI), "quantity": str(WEI), "time": now - minutes * MINUTE})
+        client = HundredXClient(**server.client_kwargs())
+        history = client.create_kline_history(str(tmp_path), page_limit=10)
+        candles = history.get("ethperp", "1m", now - 40 * MINUTE)
+        assert len(candles) == 30
+        assert set(candles.close) == {3000.0}
+        assert sum(candles.volume) == 30.0
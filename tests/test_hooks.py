@@ -0,0 +1,122 @@
+"""
+Tests for the request hooks and the sampling profiler.
+"""
+
+import pytest
+
+from hundred_x.async_client import AsyncHundredXClient
+from hundred_x.client import HundredXClient
+from hundred_x.enums import Environment
+from hundred_x.exceptions import BadRequestError
+from hundred_x.hooks import (
+    AFTER_RECEIVE,
+    AFTER_SIGN,
+    BEFORE_SEND,
+    BEFORE_SIGN,
+    ON_ERROR,
+    RequestHook,
+    SamplingProfiler,
+    payload_size,
+)
+from hundred_x.mock_server import MockServer
+from hundred_x.policy import RequestPolicies, RequestPolicy
+from tests.test_data import TEST_ORDER, TEST_PRIVATE_KEY
+from tests.test_policy import ScriptedTransport
+from tests.test_transport import FakeTransport
+
+
+class RecordingHook(RequestHook):
+    def __init__(self):
+        self.events = []
+
+    def _record(self, event):
+        self.events.append(event.copy())
+
+    before_sign = after_sign = before_send = after_receive = on_error = _record
+
+    @property
+    def stages(self):
+        return [event.stage for event in self.events]
+
+
+class FailingHook(RequestHook):
+    def before_send(self, event):
+        raise RuntimeError("broken hook")
+
+
+def test_hooks_follow_an_order():
+    hook = RecordingHook()
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=FakeTransport(), hooks=[hook])
+    # forget the login
+    hook.events.clear()
+    client.create_order(**TEST_ORDER, nonce=1711722373000)
+    # the product catalogue may be loaded first
+    assert hook.stages[-4:] == [BEFORE_SIGN, AFTER_SIGN, BEFORE_SEND, AFTER_RECEIVE]
+    before_sign, after_sign, before_send, after_receive = hook.events[-4:]
+    assert before_sign.message_type == "Order" and before_sign.nonce == 1711722373000
+    assert after_sign.elapsed > 0 and after_sign.wall_time > 0
+    assert before_send.method == "POST" and before_send.endpoint == "/v1/order"
+    assert before_send.nonce == 1711722373000 and before_send.payload_size > 0
+    assert after_receive.status_code == 200 and after_receive.timestamp >= before_send.timestamp
+
+
+def test_batches_are_one_step():
+    hook = RecordingHook()
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=FakeTransport(), hooks=[hook])
+    # forget the login
+    hook.events.clear()
+    client.sign_orders([TEST_ORDER, TEST_ORDER])
+    assert hook.stages[-2:] == [BEFORE_SIGN, AFTER_SIGN] and BEFORE_SIGN not in hook.stages[:-2]
+    assert hook.events[-1].count == 2
+
+
+def test_failed_requests_call_on_error():
+    hook = RecordingHook()
+    client = HundredXClient(
+        Environment.PROD,
+        transport=ScriptedTransport([400]),
+        policies=RequestPolicies(RequestPolicy(backoff=0)),
+        hooks=[hook],
+    )
+    with pytest.raises(BadRequestError):
+        client.get_server_time()
+    assert hook.stages == [BEFORE_SEND, AFTER_RECEIVE, ON_ERROR]
+    assert hook.events[-1].status_code == 400 and isinstance(hook.events[-1].error, BadRequestError)
+
+
+def test_failing_hooks_are_logged(caplog):
+    hook = RecordingHook()
+    client = HundredXClient(Environment.PROD, transport=FakeTransport(), hooks=[FailingHook(), hook])
+    assert client.get_server_time()
+    assert hook.stages == [BEFORE_SEND, AFTER_RECEIVE]
+    assert "broken hook" in caplog.text
+
+
+def test_payload_size():
+    assert payload_size({}) == 0
+    assert payload_size({"a": 1}) == len('{"a":1}')
+
+
+def test_sampling_profiler():
+    profiler = SamplingProfiler(every=2)
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=FakeTransport(), hooks=[profiler])
+    profiler.reset()
+    for _ in range(4):
+        client.sign_orders([TEST_ORDER])
+    assert profiler.samples == 2
+    assert "sign" in profiler.report(limit=5)
+
+    profiler.reset()
+    profiler.enabled = False
+    client.sign_orders([TEST_ORDER])
+    assert profiler.samples == 0 and profiler.report() == ""
+
+
+@pytest.mark.asyncio
+async def test_async_client_calls_hooks():
+    hook = RecordingHook()
+    with MockServer() as server:
+        async with AsyncHundredXClient(hooks=[hook], **server.client_kwargs()) as client:
+            await client.get_depth("ethperp")
+    assert hook.stages[-2:] == [BEFORE_SEND, AFTER_RECEIVE]
+    assert hook.events[-1].endpoint == "/v1/depth" and hook.events[-1].status_code == 200
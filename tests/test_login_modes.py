@@ -0,0 +1,134 @@
+"""
+Tests for the lazy construction and deferred login of the clients.
+"""
+
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from hundred_x.async_client import AsyncHundredXClient
+from hundred_x.client import HundredXClient
+from hundred_x.enums import Environment, LoginMode
+from hundred_x.state import ClientState, StateStore
+from tests.test_data import TEST_ADDRESS, TEST_PRIVATE_KEY
+from tests.test_transport import FakeResponse, FakeTransport
+
+
+def paths(client, transport):
+    return [url.replace(client.rest_url, "") for _, url, *_ in transport.requests]
+
+
+def test_import_is_light():
+    heavy = "{'web3', 'eth_account', 'httpx', 'websockets', 'hundred_x.streams'}"
+    code = f"import sys, hundred_x.client; print(sorted({heavy} & set(sys.modules)))"
+    assert subprocess.check_output([sys.executable, "-c", code], text=True).strip() == "[]"
+
+
+def test_async_client_builds_no_sync_transport():
+    client = AsyncHundredXClient(Environment.PROD, TEST_PRIVATE_KEY, login_mode=LoginMode.LAZY)
+    assert client.transport is None
+    transport = FakeTransport()
+    assert AsyncHundredXClient(Environment.PROD, transport=transport).transport is transport
+
+
+def test_lazy_construction():
+    transport = FakeTransport()
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=transport, login_mode=LoginMode.LAZY)
+    assert transport.requests == []
+    assert client._web3 is None and client._wallet is None
+    assert client.public_key == TEST_ADDRESS
+    assert client.wallet.address == TEST_ADDRESS
+
+    client.get_open_orders()
+    assert paths(client, transport) == ["/v1/session/login", "/v1/referral/add-referee", "/v1/openOrders"]
+    client.get_open_orders()
+    assert paths(client, transport)[3:] == ["/v1/openOrders"]
+
+
+def test_public_requests_do_not_login():
+    transport = FakeTransport()
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=transport, login_mode=LoginMode.LAZY)
+    client.get_server_time()
+    assert paths(client, transport) == ["/v1/time"]
+
+
+def test_background_login():
+    released = threading.Event()
+
+    class SlowTransport(FakeTransport):
+        def request(self, method, url, params=None, headers=None, json=None):
+            if url.endswith("/v1/session/login"):
+                assert released.wait(5)
+            return super().request(method, url, params, headers, json)
+
+    transport = SlowTransport()
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=transport, login_mode=LoginMode.BACKGROUND)
+    assert not client.session_cookie
+    thread = client._session_thread
+    released.set()
+    client.get_open_orders()
+    # the catalogue loads after the login on the same thread
+    thread.join()
+    sent = paths(client, transport)
+    assert sent[:2] == ["/v1/session/login", "/v1/referral/add-referee"]
+    assert sorted(sent[2:]) == ["/v1/openOrders", "/v1/products"]
+    assert client.session_cookie == "cookie"
+
+
+def test_background_login_failure_is_raised_on_first_private_request():
+    class FailingTransport(FakeTransport):
+        def request(self, method, url, params=None, headers=None, json=None):
+            raise ConnectionError("unreachable")
+
+    client = HundredXClient(
+        Environment.PROD, TEST_PRIVATE_KEY, transport=FailingTransport(), login_mode=LoginMode.BACKGROUND
+    )
+    with pytest.raises(ConnectionError):
+        client.get_open_orders()
+
+
+def test_referral_is_skipped_once_registered(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    first, second = FakeTransport(), FakeTransport()
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=first, state_file=state_file)
+    client.session_cookie = {}
+    client.save_state()
+    HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=second, state_file=state_file)
+    assert paths(client, first) == ["/v1/session/login", "/v1/referral/add-referee", "/v1/products"]
+    assert paths(client, second) == ["/v1/session/login", "/v1/products"]
+
+
+def test_referral_already_referred_is_remembered():
+    class ReferredTransport(FakeTransport):
+        def request(self, method, url, params=None, headers=None, json=None):
+            if url.endswith("/v1/referral/add-referee"):
+                self.requests.append((method, url, params, headers, json))
+                return FakeResponse({"error": "user already referred"}, status_code=400)
+            return super().request(method, url, params, headers, json)
+
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=ReferredTransport())
+    assert client.state.referred
+    assert not HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, login_mode=LoginMode.LAZY).state.referred
+
+
+@pytest.mark.asyncio
+async def test_async_client_skips_known_referral(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    rest_url = HundredXClient(Environment.PROD).rest_url
+    StateStore(state_file).save(StateStore.key(rest_url, TEST_ADDRESS), ClientState(referred=True))
+
+    class Transport:
+        def __init__(self):
+            self.urls = []
+
+        async def request(self, method, url, params=None, headers=None, json=None):
+            self.urls.append(url)
+            return FakeResponse({"value": "cookie"})
+
+    transport = Transport()
+    await AsyncHundredXClient.create(
+        Environment.PROD, TEST_PRIVATE_KEY, async_transport=transport, state_file=state_file
+    )
+    assert [url.rsplit("/v1", 1)[1] for url in transport.urls] == ["/session/login"]
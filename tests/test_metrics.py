@@ -0,0 +1,123 @@
+"""
+Tests for the latency histograms and the client instrumentation.
+"""
+
+import pytest
+import requests
+
+from hundred_x.async_client import AsyncHundredXClient
+from hundred_x.client import HundredXClient
+from hundred_x.eip_712 import Order
+from hundred_x.enums import Environment
+from hundred_x.exceptions import BadRequestError
+from hundred_x.metrics import (
+    ERROR,
+    PHASE,
+    REQUEST,
+    STATUS,
+    Histogram,
+    Metrics,
+    PrometheusExporter,
+    bucket_index,
+    bucket_value,
+)
+from hundred_x.mock_server import MockServer
+from hundred_x.policy import RequestPolicies, RequestPolicy
+from tests.test_data import TEST_ORDER, TEST_PRIVATE_KEY
+from tests.test_policy import ScriptedTransport
+from tests.test_transport import FakeTransport
+
+
+def test_buckets_are_log_linear():
+    previous = -1
+    for value in list(range(200)) + [10**exponent + offset for exponent in range(3, 12) for offset in (-1, 0, 1)]:
+        index = bucket_index(value)
+        assert index >= previous
+        previous = index
+        low = bucket_value(index)
+        assert low <= value
+        assert value - low <= max(1, value / 32)
+    assert bucket_index(10**20) == bucket_index(10**21)
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    assert histogram.percentile(0.5) == 0
+    for value in range(1, 10_001):
+        histogram.record(value * 1000)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 10_000 and snapshot["min"] == 1000 and snapshot["max"] == 10_000_000
+    for key, expected in (("p50", 5_000_000), ("p90", 9_000_000), ("p99", 9_900_000)):
+        assert snapshot[key] == pytest.approx(expected, rel=0.035)
+
+    other = Histogram()
+    other.record(1)
+    histogram.merge(other)
+    assert histogram.count == 10_001 and histogram.min == 1
+
+
+def test_client_records_phases_and_requests():
+    metrics = Metrics()
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=FakeTransport(), metrics=metrics)
+    client.create_order(**TEST_ORDER)
+    snapshot = metrics.snapshot()
+    assert {"build", "encode", "sign", "payload", "network", "parse"} <= set(snapshot["histograms"][PHASE])
+    assert snapshot["histograms"][REQUEST]["POST /v1/order"]["count"] == 1
+    assert snapshot["counters"][STATUS]["POST /v1/order"] == {"200": 1}
+
+
+def test_signatures_do_not_change_with_metrics():
+    plain = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=FakeTransport())
+    timed = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=FakeTransport(), metrics=Metrics())
+    params = plain._order_params(**TEST_ORDER, ts=1711722373)
+    assert timed.generate_and_sign_message(Order, **params) == plain.generate_and_sign_message(Order, **params)
+
+
+def test_errors_are_counted():
+    metrics = Metrics()
+    transport = ScriptedTransport([400])
+    client = HundredXClient(
+        Environment.PROD, transport=transport, metrics=metrics, policies=RequestPolicies(RequestPolicy(backoff=0))
+    )
+    with pytest.raises(BadRequestError):
+        client.get_server_time()
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"][ERROR]["GET /v1/time"] == {"BadRequestError": 1}
+    assert snapshot["counters"][STATUS]["GET /v1/time"] == {"400": 1}
+    assert REQUEST not in snapshot["histograms"]
+
+
+def test_on_chain_phases():
+    metrics = Metrics()
+    client = HundredXClient(Environment.PROD, transport=FakeTransport(), metrics=metrics)
+    client._get_transaction_receipt = lambda txn_hash: {"status": 1}
+    assert client.wait_for_transaction("0x01")
+    assert {"receipt", "confirm"} <= set(metrics.snapshot()["histograms"][PHASE])
+
+
+def test_prometheus_exporter():
+    metrics = Metrics()
+    metrics.observe(REQUEST, 'GET /v1/"depth"', 2_000_000)
+    metrics.observe(PHASE, "sign", 50_000)
+    metrics.increment(STATUS, "GET /v1/depth", 200)
+    text = metrics.prometheus()
+    assert "# TYPE hundred_x_request_latency_seconds summary" in text
+    assert 'hundred_x_request_latency_seconds_count{endpoint="GET /v1/\\"depth\\""} 1' in text
+    assert 'hundred_x_phase_latency_seconds{phase="sign",quantile="0.99"} 0.000050' in text
+    assert 'hundred_x_status_total{endpoint="GET /v1/depth",status="200"} 1' in text
+    with PrometheusExporter(metrics) as exporter:
+        response = requests.get(exporter.url, timeout=5)
+        assert response.status_code == 200 and response.text == metrics.prometheus()
+        assert requests.get(exporter.url.replace("/metrics", "/other"), timeout=5).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_async_client_records_requests():
+    metrics = Metrics()
+    with MockServer() as server:
+        async with AsyncHundredXClient(metrics=metrics, **server.client_kwargs()) as client:
+            await client.get_depth("ethperp")
+    snapshot = metrics.snapshot()
+    assert snapshot["histograms"][REQUEST]["GET /v1/depth"]["count"] == 1
+    assert snapshot["counters"][STATUS]["GET /v1/depth"] == {"200": 1}
+    assert {"network", "parse"} <= set(snapshot["histograms"][PHASE])
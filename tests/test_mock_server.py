@@ -0,0 +1,167 @@
+"""
+Tests for the local mock exchange.
+"""
+
+import time
+
+import pytest
+import requests
+
+from hundred_x.async_client import AsyncHundredXClient
+from hundred_x.client import HundredXClient
+from hundred_x.eip_712 import Order
+from hundred_x.enums import OrderSide, OrderType, TimeInForce
+from hundred_x.exceptions import InvalidPriceError
+from hundred_x.mock_server import MockServer
+from hundred_x.utils import from_message_to_payload
+from tests.test_data import DEFAULT_SYMBOL, TEST_ADDRESS, TEST_ORDER, TEST_PRIVATE_KEY
+
+SELL_ORDER = {**TEST_ORDER, "side": OrderSide.SELL}
+
+
+@pytest.fixture
+def server():
+    with MockServer() as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    with HundredXClient(private_key=TEST_PRIVATE_KEY, subaccount_id=1, **server.client_kwargs()) as client:
+        yield client
+
+
+def test_login_opens_session(server, client):
+    assert client.session_cookie in server.exchange.sessions
+    assert client.get_session_status() == {"status": "active", "account": TEST_ADDRESS}
+    assert TEST_ADDRESS in server.exchange.referred
+
+
+def test_private_endpoint_requires_session(server):
+    response = requests.get(server.url + "/v1/openOrders", params={"account": TEST_ADDRESS, "subAccountId": 1})
+    assert response.status_code == 401
+
+
+def test_public_endpoints(client):
+    products = client.list_products()
+    assert {product["symbol"] for product in products} >= {DEFAULT_SYMBOL}
+    assert client.get_product(DEFAULT_SYMBOL)["id"] == 1002
+    assert "serverTime" in client.get_server_time()
+    assert client.get_symbol(DEFAULT_SYMBOL)["productSymbol"] == DEFAULT_SYMBOL
+
+
+def test_orders_match(client):
+    buy = client.create_order(**TEST_ORDER)
+    assert buy["status"] == "OPEN"
+    assert client.get_depth(DEFAULT_SYMBOL)["bids"] == [[str(3000 * 10**18), str(10**18)]]
+
+    sell = client.create_order(**{**SELL_ORDER, "quantity": 0.25, "price": 2990})
+    assert sell["status"] == "FILLED"
+    assert client.get_depth(DEFAULT_SYMBOL)["bids"] == [[str(3000 * 10**18), str(75 * 10**16)]]
+
+    (trade,) = client.get_trade_history(DEFAULT_SYMBOL, 10)
+    assert trade["price"] == str(3000 * 10**18)
+    assert trade["quantity"] == str(25 * 10**16)
+    assert [order["id"] for order in client.get_open_orders()] == [buy["id"]]
+    assert client.get_candlestick(DEFAULT_SYMBOL, interval="1m")[0]["volume"] == str(25 * 10**16)
+
+
+def test_limit_maker_does_not_cross(client):
+    client.create_order(**TEST_ORDER)
+    with pytest.raises(Exception, match="would cross"):
+        client.create_order(**{**SELL_ORDER, "order_type": OrderType.LIMIT_MAKER})
+
+
+def test_immediate_or_cancel_does_not_rest(client):
+    order = client.create_order(**{**TEST_ORDER, "time_in_force": TimeInForce.IOC})
+    assert order["status"] == "CANCELLED"
+    assert client.get_depth(DEFAULT_SYMBOL)["bids"] == []
+
+
+def test_cancel_and_replace(client):
+    order = client.create_order(**TEST_ORDER)
+    replacement = client.cancel_and_replace_order(
+        product_id=1002, quantity=1, price=2900, side=OrderSide.BUY, order_id_to_cancel=order["id"]
+    )
+    assert client.get_orders(ids=[order["id"]])[0]["status"] == "CANCELLED"
+    assert [order["id"] for order in client.get_open_orders()] == [replacement["id"]]
+
+    client.cancel_order(product_id=1002, order_id=replacement["id"])
+    assert client.get_open_orders() == []
+
+
+def test_cancel_all_orders(client):
+    client.create_orders([{**TEST_ORDER, "price": 3000 - index} for index in range(5)])
+    assert len(client.cancel_all_orders(subaccount_id=1, product_id=1002)["cancelled"]) == 5
+    assert client.get_open_orders() == []
+
+
+def test_invalid_signature_rejected(client):
+    (payload,) = client.sign_orders([TEST_ORDER])
+    payload["price"] = str(1 * 10**18)
+    with pytest.raises(Exception, match="401"):
+        client.send_message_to_endpoint("/v1/order", "POST", payload)
+
+
+def test_off_tick_price_rejected_locally(server, client):
+    with pytest.raises(InvalidPriceError, match="not a multiple"):
+        client.create_order(**{**TEST_ORDER, "price": 3000.001})
+    assert server.exchange.orders == {}
+
+
+def test_off_tick_price_rejected_by_exchange(client):
+    # without the catalogue only the exchange knows the tick size
+    client.products.load([])
+    with pytest.raises(Exception, match="not a multiple"):
+        client.create_order(**{**TEST_ORDER, "price": 3000.001})
+
+
+def test_expired_order_rejected_by_exchange(server, client):
+    # an order built two days ago expired a day ago, it passes the checks made at the time it was built
+    params = client._order_params(**TEST_ORDER, ts=int(time.time() * 1000) - 2 * 24 * 60 * 60 * 1000)
+    message = client.generate_and_sign_message(Order, **params)
+    with pytest.raises(Exception, match="Order expired"):
+        client.send_message_to_endpoint("/v1/order", "POST", message)
+    assert server.exchange.orders == {}
+
+
+def test_duplicate_nonce_rejected(client):
+    client.create_order(**TEST_ORDER, nonce=1)
+    with pytest.raises(Exception, match="already used"):
+        client.create_order(**{**TEST_ORDER, "price": 2999}, nonce=1)
+
+
+def test_withdraw_debits_balance(server, client):
+    client.withdraw(subaccount_id=1, quantity=10)
+    assert server.exchange.balances[(TEST_ADDRESS, 1)] == server.exchange.initial_balance - 10 * 10**18
+
+
+def test_referral_only_once(server, client):
+    referral = from_message_to_payload(client._referral_message())
+    assert server.exchange.handle("POST", "/v1/referral/add-referee", {}, referral, client.session_cookie) == (
+        400,
+        {"error": "user already referred"},
+    )
+
+
+def test_error_injection():
+    with MockServer(error_rate=1.0, error_status=503) as server:
+        response = requests.get(server.url + "/v1/time")
+        assert response.status_code == 503
+        assert server.faults.injected_errors == 1
+
+
+def test_latency_injection():
+    with MockServer(latency=0.05) as server:
+        start = time.perf_counter()
+        requests.get(server.url + "/v1/time")
+        assert time.perf_counter() - start >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_async_client_batch(server):
+    client = await AsyncHundredXClient.create(private_key=TEST_PRIVATE_KEY, subaccount_id=1, **server.client_kwargs())
+    async with client:
+        results = await client.create_orders([{**TEST_ORDER, "price": 3000 - index} for index in range(20)])
+        assert results.ok
+        assert len(await client.get_open_orders()) == 20
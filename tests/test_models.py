@@ -0,0 +1,137 @@
+"""
+Tests for the typed response models.
+"""
+
+import inspect
+import sys
+
+import pytest
+
+from hundred_x.async_client import AsyncHundredXClient
+from hundred_x.client import HundredXClient
+from hundred_x.enums import OrderSide, OrderType
+from hundred_x.fixed_point import WEI
+from hundred_x.mock_server import MockServer
+from hundred_x.models import Balance, Depth, Order, Position, Ticker, decode
+from tests.test_data import DEFAULT_SYMBOL, TEST_ORDER, TEST_PRIVATE_KEY
+
+POSITION = {
+    "account": "0xEEF7faba495b4875d67E3ED8FB3a32433d3DB3b3",
+    "subAccountId": 1,
+    "productId": 1002,
+    "productSymbol": "ethperp",
+    "quantity": str(WEI),
+    "avgEntryPrice": str(3000 * WEI),
+    "margin": "5",
+}
+
+
+def test_fields_decode_lazily():
+    position = Position.from_dict(POSITION)
+    assert position._extra == {"margin": "5"}
+    with pytest.raises(AttributeError):
+        position._cache_quantity  # pylint: disable=pointless-statement
+    assert position.quantity == WEI
+    assert position._cache_quantity == WEI
+    assert position.avg_entry_price == 3000 * WEI
+    assert position.product_symbol == "ethperp"
+    with pytest.raises(AttributeError):
+        position.quantity = 0
+
+
+def test_raw_access_is_unchanged():
+    position = Position.from_dict(POSITION)
+    assert position["quantity"] == str(WEI)
+    assert position["margin"] == "5"
+    assert position.get("missing", 1) == 1
+    assert "avgEntryPrice" in position and "margin" in position
+    with pytest.raises(KeyError):
+        position["missing"]  # pylint: disable=pointless-statement
+    assert position.to_dict() == POSITION
+    assert Position.from_dict(POSITION) == position
+
+
+def test_missing_fields_are_none():
+    order = Order.from_dict({"id": "0x01", "orderType": 1, "isBuy": "true"})
+    assert order.price is None
+    assert order.order_type is OrderType.LIMIT_MAKER
+    assert order.is_buy is True
+
+
+def test_models_are_smaller_than_dicts():
+    position = Position.from_dict(POSITION)
+    assert not hasattr(position, "__dict__")
+    assert sys.getsizeof(position) < sys.getsizeof(dict(POSITION))
+
+
+def test_depth_columns():
+    depth = Depth.from_dict(
+        {"bids": [[str(3000 * WEI), str(WEI)], [str(2999 * WEI), str(2 * WEI)]], "asks": [], "lastUpdateId": "7"}
+    )
+    assert depth.last_update_id == 7
+    assert len(depth.bids) == 2
+    assert depth.bids.best == 3000 * 10**9
+    assert list(depth.bids) == [(3000 * 10**9, 10**9), (2999 * 10**9, 2 * 10**9)]
+    assert depth.asks.best is None
+
+
+def test_decode_passes_errors_through():
+    assert decode(Position, {"error": "Unauthorized"}) == {"error": "Unauthorized"}
+    assert decode(Position, "text") == "text"
+    assert decode(Position, [POSITION])[0].quantity == WEI
+
+
+def test_typed_client_against_mock_server():
+    with MockServer() as server:
+        with HundredXClient(
+            private_key=TEST_PRIVATE_KEY, subaccount_id=1, typed_responses=True, **server.client_kwargs()
+        ) as client:
+            order = client.create_order(**TEST_ORDER)
+            client.create_order(**{**TEST_ORDER, "side": OrderSide.SELL, "quantity": 0.5, "price": 2990})
+
+            (open_order,) = client.get_open_orders()
+            assert isinstance(open_order, Order)
+            assert (open_order.id, open_order.price, open_order.residual_quantity) == (
+                order["id"],
+                3000 * WEI,
+                WEI // 2,
+            )
+            assert {order.status for order in client.get_orders()} == {"PARTIALLY_FILLED", "FILLED"}
+
+            # both sides of the fill belong to the same account, so seed a position directly
+            server.exchange.positions[(client.public_key, 1, 1002)] = {"quantity": WEI, "avgEntryPrice": 3000 * WEI}
+            (position,) = client.get_position()
+            assert isinstance(position, Position)
+            assert (position.product_id, position.quantity, position.avg_entry_price) == (1002, WEI, 3000 * WEI)
+            (balance,) = client.get_spot_balances()
+            assert isinstance(balance, Balance)
+
+            ticker = client.get_symbol(DEFAULT_SYMBOL)
+            assert isinstance(ticker, Ticker) and ticker.last_price == 3000 * WEI
+            depth = client.get_depth(DEFAULT_SYMBOL)
+            assert isinstance(depth, Depth) and list(depth.bids) == [(3000 * 10**9, 5 * 10**8)]
+            assert client.create_order_book(DEFAULT_SYMBOL).best_bid == 3000 * 10**9
+
+
+@pytest.mark.asyncio
+async def test_typed_async_client_against_mock_server():
+    with MockServer() as server:
+        async with await AsyncHundredXClient.create(
+            private_key=TEST_PRIVATE_KEY, subaccount_id=1, typed_responses=True, **server.client_kwargs()
+        ) as client:
+            typed = client._typed
+
+            def resolved(model, response):
+                # the async reads wrap the answer, never the pending request
+                assert not inspect.isawaitable(response)
+                return typed(model, response)
+
+            client._typed = resolved
+            await client.create_order(**TEST_ORDER)
+            (order,) = await client.get_open_orders()
+            assert isinstance(order, Order) and order.quantity == WEI
+            assert isinstance((await client.get_depth(DEFAULT_SYMBOL)).bids.best, int)
+            assert isinstance(await client.get_symbol(DEFAULT_SYMBOL), Ticker)
+            assert await client.get_position() == []
+            assert all(isinstance(balance, Balance) for balance in await client.get_spot_balances())
+            assert all(isinstance(order, Order) for order in await client.get_orders())
@@ -0,0 +1,96 @@
+"""
+Tests for the nonce manager.
+"""
+
+import multiprocessing
+import threading
+
+import pytest
+
+from hundred_x.async_client import AsyncHundredXClient
+from hundred_x.client import HundredXClient
+from hundred_x.enums import Environment
+from hundred_x.nonce import NonceManager, SharedNonceCounter
+from tests.test_data import TEST_ORDER, TEST_PRIVATE_KEY
+from tests.test_transport import FakeTransport
+
+
+def _take_nonces(path, queue):
+    nonces = NonceManager(shared=path)
+    queue.put([nonces.next(0, 1000) for _ in range(200)])
+    nonces.close()
+
+
+def test_nonces_increase_within_a_millisecond():
+    nonces = NonceManager()
+    assert [nonces.next(0, 1000) for _ in range(3)] == [1000, 1001, 1002]
+    assert nonces.next(1, 1000) == 1000
+    # the nonces follow the clock again once it passes them
+    assert nonces.next(0, 2000) == 2000
+    assert nonces.reserve(0, 2000, count=5) == 2001
+    assert nonces.next(0, 2000) == 2006
+
+
+def test_explicit_nonces_are_followed():
+    nonces = NonceManager({0: 5000})
+    assert nonces.next(0, 1000) == 5001
+    nonces.observe(0, 9000)
+    nonces.observe(0, 10)
+    assert nonces.next(0, 1000) == 9001
+    assert nonces.snapshot() == {0: 9001}
+
+
+def test_threads_never_collide():
+    nonces = NonceManager()
+    taken = []
+
+    def take():
+        values = [nonces.next(0, 1000) for _ in range(500)]
+        taken.extend(values)
+
+    threads = [threading.Thread(target=take) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(taken) == list(range(1000, 3000))
+
+
+def test_processes_share_a_counter(tmp_path):
+    path = str(tmp_path / "nonces")
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_take_nonces, args=(path, queue)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    taken = [nonce for _ in processes for nonce in queue.get(timeout=60)]
+    for process in processes:
+        process.join()
+    assert sorted(taken) == list(range(1000, 1600))
+
+    counter = SharedNonceCounter(path)
+    assert counter.last(0) == 1599 and counter.last(1) == 0
+    counter.close()
+
+
+def test_client_orders_get_distinct_nonces():
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=FakeTransport())
+    client._current_timestamp = lambda: 1711722373000
+    payloads = client.sign_orders([TEST_ORDER] * 3) + client.sign_orders([TEST_ORDER])
+    assert [payload["nonce"] for payload in payloads] == [1711722373000 + index for index in range(4)]
+    client.create_order(**TEST_ORDER)
+    assert client.nonces.last(TEST_ORDER["subaccount_id"]) == 1711722373004
+
+
+def test_clients_close_the_shared_counter(tmp_path):
+    nonces = NonceManager(shared=str(tmp_path / "nonces"))
+    with HundredXClient(Environment.PROD, transport=FakeTransport(), nonces=nonces):
+        pass
+    assert nonces.shared._map.closed
+
+
+@pytest.mark.asyncio
+async def test_async_client_closes_the_shared_counter(tmp_path):
+    nonces = NonceManager(shared=str(tmp_path / "nonces"))
+    async with AsyncHundredXClient(Environment.PROD, transport=FakeTransport(), nonces=nonces):
+        pass
+    assert nonces.shared._map.closed
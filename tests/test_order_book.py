@@ -0,0 +1,194 @@
+"""
+Tests for the local order book.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from hundred_x.order_book import OrderBook
+from hundred_x.streams import DepthEvent
+from tests.test_data import TEST_SYMBOL
+
+WEI = 10**18
+
+
+def wei(value) -> str:
+    return str(int(value * WEI))
+
+
+SNAPSHOT = {
+    "lastUpdateId": 10,
+    "bids": [[wei(99), wei(1)], [wei(100), wei(2)], [wei(98), wei(3)]],
+    "asks": [[wei(102), wei(1)], [wei(101), wei(5)]],
+}
+
+
+def scaled(book, value):
+    return int(value * book.scale)
+
+
+@pytest.fixture
+def book():
+    order_book = OrderBook(TEST_SYMBOL)
+    order_book.apply_snapshot(SNAPSHOT)
+    return order_book
+
+
+def test_snapshot_top_of_book(book):
+    assert book.synced
+    assert book.best_bid == scaled(book, 100)
+    assert book.best_ask == scaled(book, 101)
+    assert book.mid == scaled(book, 100.5)
+    assert book.spread == scaled(book, 1)
+    assert book.levels(2)["bids"] == [(scaled(book, 100), scaled(book, 2)), (scaled(book, 99), scaled(book, 1))]
+
+
+def test_depth_queries(book):
+    assert book.bids.quantity_at(scaled(book, 99)) == scaled(book, 1)
+    assert book.bids.quantity_at(scaled(book, 97)) == 0
+    assert book.bids.quantity_through(scaled(book, 99)) == scaled(book, 3)
+    assert book.asks.quantity_through(scaled(book, 102)) == scaled(book, 6)
+    assert book.asks.cumulative_quantity(1) == scaled(book, 5)
+
+
+def test_apply_delta(book):
+    assert book.apply_delta([(wei(100), 0), (wei(99.5), wei(4))], [(wei(100.5), wei(1))], sequence=11)
+    assert book.best_bid == scaled(book, 99.5)
+    assert book.best_ask == scaled(book, 100.5)
+    assert len(book.bids) == 3
+    assert book.sequence == 11
+    # stale deltas are ignored
+    assert book.apply_delta([(wei(1), wei(1))], [], sequence=11)
+    assert book.bids.quantity_at(scaled(book, 1)) == 0
+
+
+def test_depth_totals_follow_updates():
+    order_book = OrderBook(TEST_SYMBOL, capacity=2)
+    order_book.apply_snapshot(SNAPSHOT)
+    for price, quantity in [(97, 4), (100, 0), (99.5, 2), (99, 6), (98, 0), (101, 1)]:
+        order_book.apply_delta([(wei(price), wei(quantity))], [])
+    bids = order_book.bids
+    levels = bids.levels()
+    for count in range(len(levels) + 2):
+        assert bids.cumulative_quantity(count) == sum(quantity for _, quantity in levels[:count])
+    for price, _ in levels:
+        assert bids.quantity_through(price) == sum(quantity for level, quantity in levels if level >= price)
+    assert bids.quantity_through(scaled(order_book, 200)) == 0
+    assert OrderBook(TEST_SYMBOL).asks.quantity_through(1) == 0
+
+
+def test_capacity_grows():
+    order_book = OrderBook(TEST_SYMBOL, capacity=2)
+    order_book.apply_snapshot(SNAPSHOT)
+    for price in range(50, 60):
+        order_book.apply_delta([(wei(price), wei(1))], [])
+    assert len(order_book.bids) == 13
+    assert order_book.best_bid == scaled(order_book, 100)
+
+
+def test_gap_triggers_resync():
+    snapshots = [SNAPSHOT, dict(SNAPSHOT, lastUpdateId=20)]
+    order_book = OrderBook(TEST_SYMBOL, snapshot_loader=lambda: snapshots.pop(0))
+    order_book.resync()
+    assert order_book.sequence == 10
+    event = DepthEvent(
+        symbol=TEST_SYMBOL,
+        timestamp=None,
+        raw={},
+        bids=((int(wei(100)), int(wei(7))),),
+        asks=(),
+        first_sequence=15,
+        sequence=21,
+    )
+    assert not order_book.apply_event(event)
+    assert order_book.resyncs == 2
+    assert order_book.synced
+    assert order_book.sequence == 21
+    assert order_book.bids.best_quantity == scaled(order_book, 7)
+
+
+@pytest.mark.asyncio
+async def test_async_resync():
+    async def loader():
+        await asyncio.sleep(0)
+        return dict(SNAPSHOT, lastUpdateId=30)
+
+    order_book = OrderBook(TEST_SYMBOL, snapshot_loader=loader)
+    order_book.apply_snapshot(SNAPSHOT)
+    assert not order_book.apply_delta([], [(wei(101), 0)], sequence=32, first_sequence=25)
+    assert not order_book.apply_delta([], [(wei(102), 0)], sequence=33, first_sequence=33)
+    await asyncio.sleep(0.01)
+    assert order_book.synced
+    assert order_book.sequence == 33
+    assert order_book.best_ask is None
+
+
+def test_failed_snapshot_is_retried(caplog):
+    snapshots = [ConnectionError("down"), dict(SNAPSHOT, lastUpdateId=20)]
+
+    def loader():
+        snapshot = snapshots.pop(0)
+        if isinstance(snapshot, Exception):
+            raise snapshot
+        return snapshot
+
+    order_book = OrderBook(TEST_SYMBOL, snapshot_loader=loader, resync_backoff=0)
+    order_book.resync()
+    assert not order_book.synced and "snapshot failed" in caplog.text
+    # buffered, then replayed over the new snapshot
+    assert not order_book.apply_delta([(wei(100), wei(7))], [], sequence=21, first_sequence=21)
+    assert order_book.synced and order_book.resyncs == 2
+    assert order_book.sequence == 21
+    assert order_book.bids.best_quantity == scaled(order_book, 7)
+
+
+@pytest.mark.asyncio
+async def test_failed_async_snapshot_is_retried():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("down")
+        return dict(SNAPSHOT, lastUpdateId=20)
+
+    order_book = OrderBook(TEST_SYMBOL, snapshot_loader=loader, resync_backoff=0)
+    order_book.resync()
+    await asyncio.sleep(0.01)
+    assert not order_book.synced and order_book._pending is None
+    assert not order_book.apply_delta([], [(wei(101), 0)], sequence=21, first_sequence=21)
+    await asyncio.sleep(0.01)
+    assert order_book.synced and order_book.sequence == 21 and len(calls) == 2
+
+
+def test_failed_snapshots_back_off():
+    calls = []
+
+    def loader():
+        calls.append(time.monotonic())
+        raise ConnectionError("down")
+
+    order_book = OrderBook(TEST_SYMBOL, snapshot_loader=loader, resync_backoff=0.05)
+    order_book.resync()
+    for sequence in range(11, 31):
+        assert not order_book.apply_delta([], [], sequence=sequence)
+    assert len(calls) == 1 and len(order_book._buffer) == 20
+    time.sleep(0.06)
+    order_book.apply_delta([], [], sequence=31)
+    order_book.apply_delta([], [], sequence=32)
+    assert len(calls) == 2 and order_book._backoff == pytest.approx(0.2)
+
+
+def test_gap_while_replaying_waits_for_the_next_delta():
+    snapshots = [dict(SNAPSHOT, lastUpdateId=20), dict(SNAPSHOT, lastUpdateId=40)]
+    order_book = OrderBook(TEST_SYMBOL, snapshot_loader=lambda: snapshots.pop(0))
+    order_book.apply_snapshot(SNAPSHOT)
+    assert not order_book.apply_delta([], [], sequence=25, first_sequence=22)
+    # replayed over the snapshot at 20 the delta still leaves a gap, it stays buffered without a nested resync
+    assert order_book.resyncs == 1 and not order_book.synced
+    assert [delta[2] for delta in order_book._buffer] == [25]
+    assert not order_book.apply_delta([(wei(100), wei(9))], [], sequence=41, first_sequence=41)
+    assert order_book.resyncs == 2 and order_book.synced and order_book.sequence == 41
+    assert order_book.bids.best_quantity == scaled(order_book, 9)
@@ -0,0 +1,205 @@
+"""
+Tests for the request policies and the typed api errors.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from hundred_x.async_client import AsyncHundredXClient
+from hundred_x.client import HundredXClient
+from hundred_x.enums import Environment
+from hundred_x.exceptions import (
+    ApiError,
+    AuthenticationError,
+    BadRequestError,
+    ClientError,
+    ConnectionFailedError,
+    NotFoundError,
+    RateLimitError,
+    RequestTimeoutError,
+    ServerError,
+)
+from hundred_x.policy import HEDGE_MIN_SAMPLES, RequestPolicies, RequestPolicy, error_for_response
+from hundred_x.transport import AsyncTransport, RequestsTransport
+from tests.test_transport import FakeResponse, FakeTransport
+
+NO_BACKOFF = RequestPolicy(backoff=0)
+
+
+class ScriptedTransport(FakeTransport):
+    """
+    Transport answering the requests to a path from a script of statuses, then with 200.
+    """
+
+    def __init__(self, script=None, delays=None):
+        super().__init__({"/v1/time": {"serverTime": 1}})
+        self.script = list(script or [])
+        self.delays = list(delays or [])
+        self.timeouts = []
+        self.lock = threading.Lock()
+
+    def request(self, method, url, params=None, headers=None, json=None, timeout=None):
+        with self.lock:
+            self.timeouts.append(timeout)
+            status = self.script.pop(0) if self.script else 200
+            delay = self.delays.pop(0) if self.delays else 0
+        time.sleep(delay)
+        if status != 200:
+            self.requests.append((method, url, params, headers, json))
+            return FakeResponse({"error": f"status {status}"}, status_code=status)
+        return super().request(method, url, params, headers, json)
+
+
+class ScriptedAsyncTransport(AsyncTransport):
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.calls = 0
+
+    async def request(self, method, url, params=None, headers=None, json=None, timeout=None):
+        self.calls += 1
+        delay = self.delays.pop(0) if self.delays else 0
+        await asyncio.sleep(delay)
+        return FakeResponse({"serverTime": delay})
+
+
+def client_for(transport, policies):
+    return HundredXClient(Environment.PROD, transport=transport, policies=policies)
+
+
+def test_error_for_response():
+    cases = {
+        400: BadRequestError,
+        401: AuthenticationError,
+        404: NotFoundError,
+        429: RateLimitError,
+        503: ServerError,
+    }
+    for status, error_class in cases.items():
+        error = error_for_response(FakeResponse({"error": "nope"}, status_code=status), "GET", "http://x/v1/time")
+        assert type(error) is error_class
+        assert isinstance(error, ClientError)
+        assert error.status_code == status and error.text == '{"error": "nope"}'
+        assert str(status) in str(error) and "nope" in str(error)
+        assert error.retryable is (status in (429, 503))
+    assert RequestTimeoutError("slow").retryable and isinstance(RequestTimeoutError("slow"), TimeoutError)
+    assert ConnectionFailedError("down").retryable and isinstance(ConnectionFailedError("down"), ConnectionError)
+
+
+def test_retry_after_sets_the_backoff():
+    response = FakeResponse({"error": "slow down"}, status_code=429)
+    response.headers = {"Retry-After": "1.5"}
+    error = error_for_response(response, "GET", "url")
+    assert error.retry_after == 1.5
+    assert RequestPolicy().backoff_delay(0, error) >= 1.5
+    assert 0 <= RequestPolicy(backoff=0.1, max_backoff=0.2).backoff_delay(5) <= 0.2
+
+
+def test_reads_are_retried():
+    transport = ScriptedTransport([503, 429])
+    client = client_for(transport, RequestPolicies(NO_BACKOFF))
+    assert client.get_server_time() == {"serverTime": 1}
+    assert len(transport.requests) == 3
+
+
+def test_retries_give_up():
+    transport = ScriptedTransport([503, 503, 503, 503])
+    client = client_for(transport, RequestPolicies(RequestPolicy(backoff=0, retries=1)))
+    with pytest.raises(ServerError, match="503"):
+        client.get_server_time()
+    assert len(transport.requests) == 2
+
+
+def test_rejections_and_writes_are_not_retried():
+    transport = ScriptedTransport([400])
+    client = client_for(transport, RequestPolicies(NO_BACKOFF))
+    with pytest.raises(BadRequestError):
+        client.get_server_time()
+    assert len(transport.requests) == 1
+
+    transport = ScriptedTransport([503])
+    client = client_for(transport, RequestPolicies(NO_BACKOFF))
+    with pytest.raises(ServerError):
+        client.send_message_to_endpoint("/v1/products", "POST", authenticated=False)
+    assert len(transport.requests) == 1
+
+
+def test_endpoint_policies_and_timeouts():
+    policies = RequestPolicies(NO_BACKOFF, {("get", "/v1/time"): RequestPolicy(timeout=(1.0, 2.0), retries=0)})
+    assert policies.policy("GET", "/v1/time").timeout == (1.0, 2.0)
+    assert policies.policy("GET", "/v1/depth") is policies.default
+    transport = ScriptedTransport([503])
+    client = client_for(transport, policies)
+    with pytest.raises(ServerError):
+        client.get_server_time()
+    assert transport.timeouts == [(1.0, 2.0)]
+
+
+def test_hedged_read_returns_the_first_answer():
+    transport = ScriptedTransport(delays=[1.0, 0])
+    policies = RequestPolicies(RequestPolicy(hedge=True, hedge_delay=0.05))
+    client = client_for(transport, policies)
+    started = time.monotonic()
+    assert client.get_server_time() == {"serverTime": 1}
+    assert time.monotonic() - started < 0.8
+    assert len(transport.timeouts) == 2
+    policies.close()
+
+
+def test_full_hedge_pool_sends_without_hedges():
+    transport = ScriptedTransport(delays=[0.2, 0])
+    policies = RequestPolicies(RequestPolicy(hedge=True, hedge_delay=0.05), hedge_workers=1)
+    client = client_for(transport, policies)
+    assert client.get_server_time() == {"serverTime": 1}
+    assert len(transport.timeouts) == 1
+    policies.hedge_workers = 0
+    assert client.get_server_time() == {"serverTime": 1}
+    assert len(transport.timeouts) == 2 and policies._attempts == 0
+    policies.close()
+
+
+def test_hedge_delay_follows_the_latencies():
+    policies = RequestPolicies(RequestPolicy(hedge=True, hedge_delay=0.5))
+    assert policies.hedge_delay("GET", "/v1/depth") == 0.5
+    window = policies.latency("GET", "/v1/depth")
+    for index in range(HEDGE_MIN_SAMPLES * 5):
+        window.record((index % 100) / 1000)
+    assert policies.hedge_delay("GET", "/v1/depth") == pytest.approx(0.095)
+
+
+def test_transport_errors_are_typed():
+    transport = RequestsTransport(timeout=(0.5, 0.5))
+    with pytest.raises(ConnectionFailedError) as error:
+        transport.request("GET", "http://127.0.0.1:1/v1/time")
+    assert error.value.retryable and isinstance(error.value, ApiError)
+    transport.close()
+
+
+@pytest.mark.asyncio
+async def test_async_hedge_and_retries():
+    transport = ScriptedAsyncTransport(delays=[1.0, 0])
+    policies = RequestPolicies(RequestPolicy(hedge=True, hedge_delay=0.05))
+    client = AsyncHundredXClient(
+        Environment.PROD, transport=FakeTransport(), async_transport=transport, policies=policies
+    )
+    started = time.monotonic()
+    assert await client.get_server_time() == {"serverTime": 0}
+    assert time.monotonic() - started < 0.8
+    assert transport.calls == 2
+
+    class FailingTransport(AsyncTransport):
+        calls = 0
+
+        async def request(self, *args, **kwargs):
+            self.calls += 1
+            raise RequestTimeoutError("slow")
+
+    failing = FailingTransport()
+    client = AsyncHundredXClient(
+        Environment.PROD, transport=FakeTransport(), async_transport=failing, policies=RequestPolicies(NO_BACKOFF)
+    )
+    with pytest.raises(RequestTimeoutError):
+        await client.get_server_time()
+    assert failing.calls == 3
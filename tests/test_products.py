@@ -0,0 +1,202 @@
+"""
+Tests for the product registry.
+"""
+
+import threading
+
+import pytest
+
+from hundred_x.async_client import AsyncHundredXClient
+from hundred_x.client import HundredXClient
+from hundred_x.enums import Environment, LoginMode, OrderSide, OrderType, TimeInForce
+from hundred_x.exceptions import UserInputValidationError
+from hundred_x.mock_server import MockServer
+from hundred_x.products import Product, ProductRegistry
+from tests.test_data import TEST_ORDER, TEST_PRIVATE_KEY
+from tests.test_transport import FakeTransport
+
+PRODUCTS = [
+    {"id": 1002, "symbol": "ethperp", "increment": str(10**16), "minQuantity": str(10**15), "maxQuantity": str(10**21)},
+    {"id": 1006, "symbol": "blastperp", "increment": "0.000001", "quantityIncrement": 10**18, "minNotional": "10.5"},
+]
+
+
+def test_product_from_dict():
+    eth = Product.from_dict(PRODUCTS[0])
+    assert (eth.id, eth.symbol, eth.tick_size, eth.lot_size, eth.min_quantity) == (
+        1002,
+        "ethperp",
+        10**16,
+        0,
+        10**15,
+    )
+    blast = Product.from_dict(PRODUCTS[1])
+    assert blast.tick_size == 10**12
+    assert blast.lot_size == 10**18
+    assert blast.min_quantity == 10**18
+    assert blast.min_notional == 105 * 10**17
+
+
+def test_registry_lookups():
+    registry = ProductRegistry()
+    registry.load(PRODUCTS)
+    assert registry.get("ethperp").id == 1002
+    assert registry.get("ETHPERP") is registry.get(1002)
+    assert registry.product_id("blastperp") == 1006
+    assert registry.product_id(1002) == 1002
+    assert registry.symbol(1006) == "blastperp"
+    assert "ethperp" in registry and 9999 not in registry
+    assert [product.id for product in registry] == [1002, 1006]
+    with pytest.raises(UserInputValidationError):
+        registry.get("dogeperp")
+
+
+def test_registry_refreshes_after_ttl():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return PRODUCTS
+
+    registry = ProductRegistry(loader, ttl=60)
+    registry.get("ethperp")
+    registry.get(1006)
+    assert len(calls) == 1
+    registry.fetched -= 61
+    # the stale catalogue is served while it reloads in the background
+    assert registry.get("ethperp").id == 1002
+    registry._refresher.join()
+    assert len(calls) == 2
+    assert not registry.stale
+
+
+def test_registry_find_never_waits_for_the_loader():
+    released = threading.Event()
+
+    def loader():
+        assert released.wait(5)
+        return PRODUCTS
+
+    registry = ProductRegistry(loader, ttl=60)
+    assert registry.find("ethperp") is None
+    released.set()
+    registry._refresher.join()
+    assert registry.find("ethperp").id == 1002
+
+
+def test_registry_backs_off_failed_background_refreshes():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        raise ConnectionError("unreachable")
+
+    registry = ProductRegistry(loader, ttl=60, retry=60)
+    registry.load(PRODUCTS, fetched=1.0)
+    registry.refresh_in_background().join()
+    assert registry.refresh_in_background() is None
+    assert registry.find("ethperp").id == 1002
+    assert len(calls) == 1
+
+
+def test_registry_serves_stale_catalogue_when_refresh_fails():
+    def loader():
+        raise ConnectionError("unreachable")
+
+    registry = ProductRegistry(loader, ttl=60)
+    with pytest.raises(ConnectionError):
+        registry.get("ethperp")
+    registry.load(PRODUCTS, fetched=1.0)
+    assert registry.get("ethperp").id == 1002
+
+
+def test_orders_skip_the_rules_during_a_catalogue_outage(caplog):
+    class OutageTransport(FakeTransport):
+        def request(self, method, url, params=None, headers=None, json=None, timeout=None):
+            if url.endswith("/v1/products"):
+                raise ConnectionError("unreachable")
+            return super().request(method, url, params, headers, json, timeout)
+
+    transport = OutageTransport()
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=transport)
+    client.create_order(**TEST_ORDER)
+    assert [url for _, url, *_ in transport.requests if url.endswith("/v1/order")]
+    assert "Product catalogue unavailable" in caplog.text
+    with pytest.raises(ConnectionError):
+        client.create_order(**{**TEST_ORDER, "product_id": "ethperp"})
+
+
+def test_client_orders_by_symbol():
+    transport = FakeTransport({"/v1/products": PRODUCTS})
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=transport)
+    client.create_order(**{**TEST_ORDER, "product_id": "ethperp"})
+    client.cancel_order("blastperp", "0x01")
+    client.create_order(**{**TEST_ORDER, "product_id": "ethperp"})
+    urls = [url.replace(client.rest_url, "") for _, url, *_ in transport.requests]
+    assert urls.count("/v1/products") == 1
+    # the catalogue is loaded with the session, before the first order
+    assert urls.index("/v1/products") < urls.index("/v1/order")
+    assert [json["productId"] for _, url, _, _, json in transport.requests if url.endswith("/v1/order")] == [
+        1002,
+        1006,
+        1002,
+    ]
+
+
+def test_stale_catalogue_reloads_off_the_order_path():
+    released = threading.Event()
+
+    class SlowProductsTransport(FakeTransport):
+        def request(self, method, url, params=None, headers=None, json=None, timeout=None):
+            if url.endswith("/v1/products") and self.requests:
+                assert released.wait(5)
+            return super().request(method, url, params, headers, json, timeout)
+
+    transport = SlowProductsTransport({"/v1/products": PRODUCTS})
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=transport, login_mode=LoginMode.LAZY)
+    client.refresh_products()
+    client.products.fetched -= client.products.ttl
+    client.create_order(**{**TEST_ORDER, "product_id": "ethperp"})
+    assert transport.requests[-1][1].endswith("/v1/order")
+    released.set()
+    client.products._refresher.join()
+    assert not client.products.stale
+
+
+@pytest.mark.asyncio
+async def test_async_client_orders_by_symbol():
+    with MockServer() as server:
+        async with await AsyncHundredXClient.create(
+            private_key=TEST_PRIVATE_KEY, subaccount_id=1, **server.client_kwargs()
+        ) as client:
+            assert not client.products.loaded
+            order = await client.create_order(
+                subaccount_id=1,
+                product_id="btcperp",
+                quantity=0.001,
+                side=OrderSide.BUY,
+                order_type=OrderType.LIMIT,
+                time_in_force=TimeInForce.GTC,
+                price=60000,
+            )
+            assert order["productId"] == 1001
+            assert client.products.get("btcperp").tick_size == 10**17
+            await client.cancel_order("btcperp", order["id"])
+            assert await client.get_open_orders() == []
+
+
+@pytest.mark.asyncio
+async def test_async_orders_skip_the_rules_during_a_catalogue_outage(caplog):
+    async def list_products():
+        raise ConnectionError("unreachable")
+
+    with MockServer() as server:
+        async with await AsyncHundredXClient.create(
+            private_key=TEST_PRIVATE_KEY, subaccount_id=1, **server.client_kwargs()
+        ) as client:
+            client.list_products = list_products
+            order = await client.create_order(**TEST_ORDER)
+            assert order["productId"] == 1002
+            with pytest.raises(ConnectionError):
+                await client.create_order(**{**TEST_ORDER, "product_id": "ethperp"})
+    assert "Product catalogue unavailable" in caplog.text
@@ -0,0 +1,150 @@
+"""
+Tests for the request scheduler.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from hundred_x.async_client import AsyncHundredXClient
+from hundred_x.client import HundredXClient
+from hundred_x.enums import Environment, RequestClass
+from hundred_x.mock_server import MockServer
+from hundred_x.scheduler import Scheduler, TokenBucket, classify
+from tests.test_data import TEST_PRIVATE_KEY
+from tests.test_transport import FakeTransport
+
+UNLIMITED = dict.fromkeys(RequestClass, (None, 0))
+QUEUED = [("GET", "/v1/orders"), ("GET", "/v1/uiKlines"), ("POST", "/v1/order"), ("DELETE", "/v1/order")]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_classify():
+    assert classify("delete", "/v1/order") == (RequestClass.CANCEL, 1)
+    assert classify("GET", "/v1/uiKlines") == (RequestClass.MARKET_DATA, 2)
+    assert classify("GET", "/v1/unknown") == (RequestClass.MARKET_DATA, 1)
+    assert classify("POST", "/v1/unknown") == (RequestClass.ORDER_ENTRY, 1)
+    scheduler = Scheduler(weights={("GET", "/v1/depth"): (RequestClass.ACCOUNT, 5)})
+    assert classify("GET", "/v1/depth", scheduler.weights) == (RequestClass.ACCOUNT, 5)
+    assert classify("GET", "/v1/orders", scheduler.weights) == (RequestClass.ACCOUNT, 2)
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, capacity=2)
+    now = bucket.updated
+    assert bucket.take(1, now) and bucket.take(1, now)
+    assert not bucket.take(1, now)
+    assert bucket.time_until(1, now) == pytest.approx(0.1)
+    assert bucket.take(1, now + 0.11)
+    assert bucket.reserve(5, now + 0.11) == pytest.approx(0.19)
+    assert TokenBucket(None).take(100, now)
+
+
+def test_class_bucket_spaces_requests():
+    scheduler = Scheduler(limits={RequestClass.ACCOUNT: (50.0, 1.0)}, global_limit=None)
+    started = time.monotonic()
+    for _ in range(4):
+        with scheduler.slot("GET", "/v1/balances"):
+            pass
+    assert time.monotonic() - started >= 0.05
+    # other classes have their own buckets
+    with scheduler.slot("DELETE", "/v1/order"):
+        pass
+    assert scheduler.metrics().sent[RequestClass.ACCOUNT] == 4
+
+
+def test_cancels_overtake_queued_requests():
+    scheduler = Scheduler(limits=UNLIMITED, global_limit=None, max_in_flight=1)
+    served = []
+
+    def send(method, endpoint):
+        with scheduler.slot(method, endpoint) as slot:
+            served.append(slot.request_class)
+
+    with scheduler.slot("GET", "/v1/depth"):
+        threads = []
+        for method, endpoint in QUEUED:
+            threads.append(threading.Thread(target=send, args=(method, endpoint)))
+            threads[-1].start()
+            wait_for(lambda: len(scheduler._queue) == len(threads))
+        assert scheduler.queue_depth(RequestClass.ACCOUNT) == 1
+        assert scheduler.metrics().in_flight == 1
+    for thread in threads:
+        thread.join(5)
+    assert served == [RequestClass.CANCEL, RequestClass.ORDER_ENTRY, RequestClass.ACCOUNT, RequestClass.MARKET_DATA]
+    metrics = scheduler.metrics()
+    assert metrics.queue_depth == 0 and metrics.in_flight == 0 and metrics.max_queued == 4
+
+
+def test_global_bucket_is_shared_by_priority():
+    scheduler = Scheduler(limits=UNLIMITED, global_limit=(2.0, 1.0))
+    served = []
+
+    def send(method, endpoint):
+        with scheduler.slot(method, endpoint) as slot:
+            served.append(slot.request_class)
+
+    with scheduler.slot("GET", "/v1/depth"):
+        pass
+    threads = [threading.Thread(target=send, args=call) for call in (("GET", "/v1/depth"), ("DELETE", "/v1/order"))]
+    threads[0].start()
+    wait_for(lambda: scheduler.queue_depth() == 1)
+    threads[1].start()
+    for thread in threads:
+        thread.join(5)
+    assert served[0] is RequestClass.CANCEL
+
+
+@pytest.mark.asyncio
+async def test_async_priority_and_cancellation():
+    scheduler = Scheduler(limits=UNLIMITED, global_limit=None, max_in_flight=1)
+    served = []
+
+    async def send(method, endpoint):
+        async with scheduler.slot(method, endpoint) as slot:
+            served.append(slot.request_class)
+
+    async with scheduler.slot("GET", "/v1/depth"):
+        tasks = []
+        for method, endpoint in QUEUED:
+            tasks.append(asyncio.create_task(send(method, endpoint)))
+            await asyncio.sleep(0)
+        abandoned = asyncio.create_task(send("DELETE", "/v1/openOrders"))
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth() == 5
+        abandoned.cancel()
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth() == 4
+    await asyncio.wait_for(asyncio.gather(*tasks), 5)
+    assert served == [RequestClass.CANCEL, RequestClass.ORDER_ENTRY, RequestClass.ACCOUNT, RequestClass.MARKET_DATA]
+
+
+def test_clients_send_through_the_scheduler():
+    scheduler = Scheduler(limits=UNLIMITED)
+    client = HundredXClient(
+        Environment.PROD, TEST_PRIVATE_KEY, transport=FakeTransport({"/v1/orders": []}), scheduler=scheduler
+    )
+    client.get_orders()
+    client.get_server_time()
+    metrics = scheduler.metrics()
+    assert metrics.sent[RequestClass.ACCOUNT] == 1
+    # the product catalogue loaded with the session and the server time
+    assert metrics.sent[RequestClass.MARKET_DATA] == 2
+
+
+@pytest.mark.asyncio
+async def test_async_client_sends_through_the_scheduler():
+    scheduler = Scheduler(limits=UNLIMITED)
+    with MockServer() as server:
+        async with AsyncHundredXClient(scheduler=scheduler, **server.client_kwargs()) as client:
+            await client.get_server_time()
+            await client.get_depth("ethperp")
+    assert scheduler.metrics().sent[RequestClass.MARKET_DATA] == 2
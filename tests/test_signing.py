@@ -0,0 +1,177 @@
+"""
+Tests for the precompiled EIP-712 signer.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import eth_account
+import pytest
+import respx
+from eip712_structs import make_domain
+from eth_account.messages import encode_structured_data
+from httpx import Response
+
+from hundred_x.async_client import AsyncHundredXClient
+from hundred_x.client import HundredXClient
+from hundred_x.constants import CONTRACTS, LOGIN_MESSAGE, REFERRAL_CODE
+from hundred_x.eip_712 import CancelOrder, CancelOrders, LoginMessage, Order, Referral, Withdraw
+from hundred_x.enums import Environment, OrderSide, OrderType, TimeInForce
+from hundred_x.nonce import NonceManager
+from hundred_x.signing import EIP712Signer, EIP712Verifier, create_signing_executor
+from hundred_x.utils import from_message_to_payload
+from tests.test_data import TEST_ADDRESS, TEST_ORDER, TEST_PRIVATE_KEY
+from tests.test_transport import FakeTransport
+
+ORDER = {
+    "account": TEST_ADDRESS,
+    "subAccountId": 1,
+    "productId": 1002,
+    "isBuy": True,
+    "orderType": 0,
+    "timeInForce": 0,
+    "expiration": 1711808773000000,
+    "price": 3000 * 10**18,
+    "quantity": 10**18,
+    "nonce": 1711722373,
+}
+
+MESSAGES = [
+    (Order, ORDER),
+    (Order, dict(ORDER, isBuy=False, price=2**128 - 1)),
+    (CancelOrder, {"account": TEST_ADDRESS, "subAccountId": 255, "productId": 1006, "orderId": "0xabc"}),
+    (CancelOrders, {"account": TEST_ADDRESS, "subAccountId": 0, "productId": 1002}),
+    (Withdraw, {"account": TEST_ADDRESS, "subAccountId": 1, "asset": TEST_ADDRESS, "quantity": 10**20, "nonce": 1}),
+    (LoginMessage, {"account": TEST_ADDRESS, "message": LOGIN_MESSAGE, "timestamp": 1711722373}),
+    (Referral, {"account": TEST_ADDRESS, "code": REFERRAL_CODE}),
+]
+
+
+def reference_sign(domain, message_class, values):
+    """
+    The generic eip712_structs and eth_account signing path.
+    """
+    message = message_class(**values).to_message(domain)
+    signed = eth_account.Account.from_key(TEST_PRIVATE_KEY).sign_message(encode_structured_data(message))
+    message["message"]["signature"] = signed.signature.hex()
+    return message["message"]
+
+
+@pytest.mark.parametrize("env", list(Environment))
+@pytest.mark.parametrize("message_class, values", MESSAGES)
+def test_matches_reference_signing(env, message_class, values):
+    domain = make_domain(
+        name="100x",
+        version="0.0.0",
+        chainId=CONTRACTS[env]["CHAIN_ID"],
+        verifyingContract=CONTRACTS[env]["VERIFYING_CONTRACT"],
+    )
+    signer = EIP712Signer(domain, eth_account.Account.from_key(TEST_PRIVATE_KEY).key)
+    assert signer.sign(message_class, **values) == reference_sign(domain, message_class, values)
+
+
+@pytest.mark.parametrize("message_class, values", MESSAGES)
+def test_verifier_recovers_signer(message_class, values):
+    domain = make_domain(
+        name="100x",
+        version="0.0.0",
+        chainId=CONTRACTS[Environment.PROD]["CHAIN_ID"],
+        verifyingContract=CONTRACTS[Environment.PROD]["VERIFYING_CONTRACT"],
+    )
+    signature = reference_sign(domain, message_class, values)["signature"]
+    verifier = EIP712Verifier(domain)
+    assert verifier.recover(message_class, values, signature) == TEST_ADDRESS
+    assert verifier.recover(message_class, {**values, "account": None}, signature) != TEST_ADDRESS
+
+
+def test_out_of_range_values_are_rejected():
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=FakeTransport())
+    with pytest.raises(OverflowError):
+        client.generate_and_sign_message(Order, **dict(ORDER, subAccountId=256))
+
+
+@pytest.mark.parametrize(
+    "env, signature",
+    [
+        (
+            Environment.PROD,
+            "0x38c34757dd73104595871b471143d4ce0d95eec7d020e4950830921cb0eec0427ef284dfc6fc5c65b2319179a73d16f84f5d6a1d2e0d1a301caa665112d440601c",  # noqa: E501
+        ),
+        (
+            Environment.TESTNET,
+            "0xb7f6141dad52ff2a26c5834313dc07fac85ee66ce44997204c4df995447523e254f60b1eb0b7537158b4f23d5e648cffed503c29e05b972d4c100ce6680d4b611c",  # noqa: E501
+        ),
+    ],
+)
+def test_client_order_signature(env, signature):
+    client = HundredXClient(env, TEST_PRIVATE_KEY, transport=FakeTransport())
+    ts = 1711722373
+    message = client.generate_and_sign_message(
+        message_class=Order,
+        expiration=(ts + 1000 * 60 * 60 * 24) * 1000,
+        nonce=ts,
+        productId=TEST_ORDER["product_id"],
+        isBuy=TEST_ORDER["side"].value,
+        orderType=TEST_ORDER["order_type"].value,
+        price=TEST_ORDER["price"] * 10**18,
+        quantity=TEST_ORDER["quantity"] * 10**18,
+        timeInForce=TEST_ORDER["time_in_force"].value,
+        **client.get_shared_params(subaccount_id=TEST_ORDER["subaccount_id"], asset="USDB"),
+    )
+    assert message["signature"] == signature
+
+
+LADDER = [
+    {
+        "subaccount_id": 1,
+        "product_id": 1002,
+        "quantity": 0.1,
+        "price": 3000 + level,
+        "side": OrderSide.BUY,
+        "order_type": OrderType.LIMIT_MAKER,
+        "time_in_force": TimeInForce.GTC,
+    }
+    for level in range(8)
+]
+
+
+@pytest.mark.parametrize("use_processes", [True, False])
+def test_sign_orders_over_executor(use_processes):
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=FakeTransport())
+    client._current_timestamp = lambda: 1711722373
+    sequential = client.sign_orders(LADDER)
+    with create_signing_executor(max_workers=2, use_processes=use_processes) as executor:
+        client.signing_executor = executor
+        # the same nonces again, the clock is frozen
+        client.nonces = NonceManager()
+        assert client.sign_orders(LADDER) == sequential
+    assert [order["price"] for order in sequential] == [str((3000 + level) * 10**18) for level in range(8)]
+    assert len({order["nonce"] for order in sequential}) == len(LADDER)
+    client.nonces = NonceManager()
+    message = client.generate_and_sign_message(Order, **client._order_params(**LADDER[0], ts=1711722373))
+    assert sequential[0] == from_message_to_payload(message)
+
+
+def test_sign_batch_chunks_per_worker(monkeypatch):
+    class RecordingExecutor(ThreadPoolExecutor):
+        def map(self, fn, *iterables, timeout=None, chunksize=1):
+            chunks.append(chunksize)
+            return super().map(fn, *iterables, timeout=timeout)
+
+    chunks = []
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=FakeTransport(), signing_workers=4)
+    with RecordingExecutor(max_workers=2) as executor:
+        client.signing_executor = executor
+        client.sign_orders(LADDER)
+        monkeypatch.setattr(os, "cpu_count", lambda: 8)
+        client.signer.sign_batch(Order, [client._order_params(**order) for order in LADDER], executor)
+    assert chunks == [2, 1]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_async_sign_orders():
+    client = AsyncHundredXClient(Environment.PROD, TEST_PRIVATE_KEY)
+    respx.get(f"{client.rest_url}/v1/products").mock(return_value=Response(200, json=[]))
+    orders = await client.sign_orders(LADDER)
+    assert [order["price"] for order in orders] == [str((3000 + level) * 10**18) for level in range(8)]
@@ -0,0 +1,139 @@
+"""
+Tests for the persisted client state.
+"""
+
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from hundred_x.async_client import AsyncHundredXClient
+from hundred_x.client import HundredXClient
+from hundred_x.enums import Environment
+from hundred_x.mock_server import MockServer
+from hundred_x.state import ClientState, StateStore
+from tests.test_data import TEST_ADDRESS, TEST_ORDER, TEST_PRIVATE_KEY
+from tests.test_transport import FakeResponse, FakeTransport
+
+
+def paths(client, transport):
+    return [url.replace(client.rest_url, "") for _, url, *_ in transport.requests]
+
+
+def _save_nonces(path, subaccount_id):
+    store = StateStore(path)
+    for nonce in range(1, 51):
+        state = store.load("key")
+        state.nonces = {str(subaccount_id): nonce}
+        store.save("key", state)
+
+
+def test_store_round_trip(tmp_path):
+    store = StateStore(str(tmp_path / "state.json"))
+    assert store.load("key") == ClientState()
+
+    store.save("key", ClientState(session_cookie="cookie", session_expiry=1.0, nonces={"1": 5}))
+    assert store.load("key").session_cookie == "cookie"
+    assert store.load("other") == ClientState()
+    assert sorted(os.listdir(tmp_path)) == ["state.json", "state.json.lock"]
+
+    store.clear("key")
+    assert store.load("key") == ClientState()
+
+
+def test_store_keeps_highest_nonce(tmp_path):
+    store = StateStore(str(tmp_path / "state.json"))
+    store.save("key", ClientState(nonces={"0": 10, "1": 3}))
+    store.save("key", ClientState(nonces={"0": 7}))
+    assert store.load("key").nonces == {"0": 10, "1": 3}
+
+
+def test_store_ignores_unknown_versions(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text(json.dumps({"version": 0, "clients": {"key": {"session_cookie": "old"}}}))
+    assert StateStore(str(path)).load("key") == ClientState()
+    path.write_text("{not json")
+    assert StateStore(str(path)).load("key") == ClientState()
+
+
+def test_store_concurrent_processes(tmp_path):
+    path = str(tmp_path / "state.json")
+    processes = [multiprocessing.Process(target=_save_nonces, args=(path, index)) for index in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+    assert StateStore(path).load("key").nonces == {str(index): 50 for index in range(4)}
+
+
+def test_client_state_expiry():
+    state = ClientState(session_cookie="cookie", session_expiry=100.0, products=[], products_fetched=100.0)
+    assert state.session_valid(now=99.0)
+    assert not state.session_valid(now=101.0)
+    assert state.products_fresh(ttl=10, now=105.0)
+    assert not state.products_fresh(ttl=10, now=111.0)
+
+
+def test_warm_start(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    first = FakeTransport({"/v1/products": [{"id": 1002, "symbol": "ethperp"}]})
+    with HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=first, state_file=state_file) as client:
+        client.list_products()
+        client.clock_offset = 42.0
+        client.create_order(**TEST_ORDER, nonce=123)
+    assert paths(client, first)[:2] == ["/v1/session/login", "/v1/referral/add-referee"]
+
+    second = FakeTransport()
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=second, state_file=state_file)
+    assert paths(client, second) == ["/v1/session/status"]
+    assert client.session_cookie == "cookie"
+    assert client.clock_offset == 42.0
+    assert client._last_nonces == {TEST_ORDER["subaccount_id"]: 123}
+    assert client.state.products == [{"id": 1002, "symbol": "ethperp"}]
+    assert client.products.get("ethperp").id == 1002
+    assert paths(client, second) == ["/v1/session/status"]
+    assert client.state.referred
+
+
+def test_rejected_session_logs_in_again(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=FakeTransport(), state_file=state_file).close()
+
+    class ExpiredTransport(FakeTransport):
+        def request(self, method, url, params=None, headers=None, json=None):
+            if url.endswith("/v1/session/status"):
+                self.requests.append((method, url, params, headers, json))
+                return FakeResponse({"error": "Unauthorized"}, status_code=401)
+            return super().request(method, url, params, headers, json)
+
+    transport = ExpiredTransport()
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=transport, state_file=state_file)
+    assert paths(client, transport) == ["/v1/session/status", "/v1/session/login", "/v1/products"]
+    assert client.session_cookie == "cookie"
+
+
+def test_sync_clock():
+    transport = FakeTransport({"/v1/time": {"serverTime": 0}})
+    client = HundredXClient(Environment.PROD, transport=transport)
+    offset = client.sync_clock()
+    assert offset < 0
+    assert abs(client._current_timestamp()) < 1000
+
+
+@pytest.mark.asyncio
+async def test_async_warm_start_against_mock_server(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    with MockServer() as server:
+        async with await AsyncHundredXClient.create(
+            private_key=TEST_PRIVATE_KEY, state_file=state_file, **server.client_kwargs()
+        ) as client:
+            cookie = client.session_cookie
+        sessions = dict(server.exchange.sessions)
+
+        async with await AsyncHundredXClient.create(
+            private_key=TEST_PRIVATE_KEY, state_file=state_file, **server.client_kwargs()
+        ) as client:
+            assert client.session_cookie == cookie
+            assert await client.get_session_status() == {"status": "active", "account": TEST_ADDRESS}
+        assert server.exchange.sessions == sessions
@@ -0,0 +1,121 @@
+"""
+Tests for the streaming market data clients.
+"""
+
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+import websockets
+
+from hundred_x.enums import Channel
+from hundred_x.streams import (
+    AsyncStreamClient,
+    DepthEvent,
+    KlineEvent,
+    StreamClient,
+    TickerEvent,
+    TradeEvent,
+    parse_event,
+    stream_name,
+    to_websocket_url,
+)
+from tests.test_data import TEST_SYMBOL
+
+TRADE_MESSAGE = {
+    "stream": f"{TEST_SYMBOL}@trade",
+    "data": {"t": 7, "p": "50000000000000000000000", "q": "1000000000000000000", "T": 1711722371000, "m": True},
+}
+
+
+def test_to_websocket_url():
+    assert to_websocket_url("https://stream.100x.finance") == "wss://stream.100x.finance"
+    assert to_websocket_url("http://localhost:8080") == "ws://localhost:8080"
+
+
+def test_stream_name():
+    assert stream_name(Channel.TICKER, TEST_SYMBOL) == f"{TEST_SYMBOL}@ticker"
+    assert stream_name(Channel.KLINE, TEST_SYMBOL, "5m") == f"{TEST_SYMBOL}@kline_5m"
+
+
+def test_parse_trade_event():
+    event = parse_event(TRADE_MESSAGE)
+    assert isinstance(event, TradeEvent)
+    assert event.symbol == TEST_SYMBOL
+    assert event.trade_id == "7"
+    assert event.price == 50000 * 10**18
+    assert event.is_buyer_maker is True
+
+
+def test_parse_depth_event():
+    event = parse_event(
+        {"e": "depthUpdate", "s": "BTCPERP", "U": 4, "u": 6, "b": [["10", "1"]], "a": [["11", "0"]], "E": 1}
+    )
+    assert isinstance(event, DepthEvent)
+    assert event.symbol == TEST_SYMBOL
+    assert (event.first_sequence, event.sequence) == (4, 6)
+    assert event.bids == ((10, 1),)
+    assert event.asks == ((11, 0),)
+
+
+def test_parse_kline_and_ticker_events():
+    kline = parse_event(
+        {
+            "stream": f"{TEST_SYMBOL}@kline_1m",
+            "data": {"k": {"t": 1, "T": 2, "i": "1m", "o": "1", "h": "4", "l": "1", "c": "3", "v": "9", "x": True}},
+        }
+    )
+    assert isinstance(kline, KlineEvent)
+    assert (kline.open, kline.high, kline.close, kline.closed) == (1, 4, 3, True)
+    ticker = parse_event({"stream": f"{TEST_SYMBOL}@ticker", "data": {"lastPrice": "5", "markPrice": "6"}})
+    assert isinstance(ticker, TickerEvent)
+    assert (ticker.last_price, ticker.mark_price) == (5, 6)
+
+
+def test_parse_control_message():
+    assert parse_event({"result": None, "id": 1}) is None
+
+
+@pytest_asyncio.fixture
+async def server():
+    received = []
+
+    async def handler(connection, *args):
+        async for raw in connection:
+            request = json.loads(raw)
+            received.append(request)
+            await connection.send(json.dumps({"result": None, "id": request["id"]}))
+            await connection.send(json.dumps(TRADE_MESSAGE))
+
+    async with websockets.serve(handler, "127.0.0.1", 0) as ws_server:
+        port = ws_server.sockets[0].getsockname()[1]
+        yield f"http://127.0.0.1:{port}", received
+
+
+@pytest.mark.asyncio
+async def test_async_stream_iteration_and_callbacks(server):
+    url, received = server
+    seen = []
+    async with AsyncStreamClient(url) as stream:
+        stream.on(Channel.TRADE, seen.append)
+        await stream.subscribe(Channel.TRADE, [TEST_SYMBOL])
+        event = await asyncio.wait_for(stream.__anext__(), timeout=5)
+    assert isinstance(event, TradeEvent)
+    assert seen == [event]
+    assert received[0]["method"] == "SUBSCRIBE"
+    assert received[0]["params"] == [f"{TEST_SYMBOL}@trade"]
+
+
+@pytest.mark.asyncio
+async def test_sync_stream_client(server):
+    url, received = server
+    stream = StreamClient(url)
+    stream.subscribe(Channel.TRADE, TEST_SYMBOL)
+    await asyncio.to_thread(stream.connect)
+    try:
+        event = await asyncio.to_thread(stream.get, 5)
+    finally:
+        await asyncio.to_thread(stream.close)
+    assert isinstance(event, TradeEvent)
+    assert received[0]["params"] == [f"{TEST_SYMBOL}@trade"]
@@ -0,0 +1,158 @@
+"""
+Tests for the trade tape.
+"""
+
+from itertools import islice
+
+import pytest
+
+from hundred_x.client import HundredXClient
+from hundred_x.exceptions import ClientError
+from hundred_x.fixed_point import WEI
+from hundred_x.mock_server import MockServer
+from hundred_x.tape import AsyncTradeTape, TapeCursor, TradeTape
+
+NOW = 1_700_000_000_000
+
+
+def trade(trade_id, time=None):
+    return {
+        "id": trade_id,
+        "price": str(3000 * WEI),
+        "quantity": str(WEI),
+        "time": NOW + trade_id if time is None else time,
+    }
+
+
+class FakeTradeClient:
+    """
+    Client answering with the `lookback` most recent of its trades, newest first.
+    """
+
+    def __init__(self, count=0):
+        self.trades = [trade(trade_id) for trade_id in range(1, count + 1)]
+        self.lookbacks = []
+
+    def add(self, count, time=None):
+        first = len(self.trades) + 1
+        self.trades.extend(trade(trade_id, time) for trade_id in range(first, first + count))
+
+    def get_trade_history(self, symbol, lookback):
+        self.lookbacks.append(lookback)
+        return self.trades[-lookback:][::-1]
+
+
+class AsyncFakeTradeClient(FakeTradeClient):
+    async def get_trade_history(self, symbol, lookback):  # pylint: disable=invalid-overridden-method
+        return super().get_trade_history(symbol, lookback)
+
+
+def ids(trades):
+    return [trade["id"] for trade in trades]
+
+
+def test_polls_only_yield_new_trades():
+    client = FakeTradeClient(count=30)
+    tape = TradeTape(client, "ethperp", lookback=20, min_lookback=5, min_interval=0, max_interval=0)
+    assert ids(tape._poll()) == list(range(11, 31))
+    assert tape._poll() == []
+    client.add(3)
+    assert ids(tape._poll()) == [31, 32, 33]
+    assert tape.last_time == NOW + 33
+    assert client.lookbacks == [20, 40, 5]
+    assert tape.lookback == 6
+
+
+def test_trades_sharing_a_timestamp_are_not_repeated():
+    client = FakeTradeClient()
+    client.add(2, time=NOW)
+    tape = TradeTape(client, "ethperp", min_interval=0, max_interval=0)
+    assert ids(tape._poll()) == [1, 2]
+    client.add(2, time=NOW)
+    assert ids(tape._poll()) == [3, 4]
+    assert tape.cursor == TapeCursor(time=NOW, ids={1, 2, 3, 4})
+
+
+def test_catch_up_grows_the_lookback():
+    client = FakeTradeClient(count=5)
+    tape = TradeTape(client, "ethperp", lookback=10, min_lookback=10, max_lookback=40, min_interval=0)
+    tape._poll()
+    client.add(25)
+    assert ids(tape._poll()) == list(range(6, 31))
+    assert client.lookbacks == [10, 10, 20, 40]
+    assert tape.gaps == 0
+
+    client.add(100)
+    assert ids(tape._poll()) == list(range(91, 131))
+    assert tape.gaps == 1
+
+
+def test_poll_interval_adapts():
+    client = FakeTradeClient(count=5)
+    tape = TradeTape(client, "ethperp", min_interval=0.5, max_interval=4)
+    tape._poll()
+    assert tape.interval == 0.5
+    for expected in (1, 2, 4, 4):
+        tape._poll()
+        assert tape.interval == expected
+    client.add(1)
+    tape._poll()
+    assert tape.interval == 2
+
+
+def test_since_and_resume():
+    client = FakeTradeClient(count=10)
+    tape = TradeTape(client, "ethperp", since=NOW + 7, min_interval=0, max_interval=0)
+    assert ids(next(tape.batches())) == [7, 8, 9, 10]
+
+    client.add(2)
+    resumed = TradeTape(client, "ethperp", cursor=tape.cursor, min_interval=0, max_interval=0)
+    assert ids(islice(resumed, 2)) == [11, 12]
+
+
+def test_iteration_stops_when_closed():
+    client = FakeTradeClient(count=3)
+    tape = TradeTape(client, "ethperp", min_interval=0, max_interval=0)
+    seen = []
+    for item in tape:
+        seen.append(item["id"])
+        if len(seen) == 2:
+            tape.close()
+    assert seen == [1, 2, 3]
+
+
+def test_unexpected_response():
+    class ErrorClient:
+        def get_trade_history(self, symbol, lookback):
+            return {"error": "Unknown symbol"}
+
+    with pytest.raises(ClientError):
+        TradeTape(ErrorClient(), "ethperp")._poll()
+
+
+@pytest.mark.asyncio
+async def test_async_tape():
+    client = AsyncFakeTradeClient(count=3)
+    tape = AsyncTradeTape(client, "ethperp", min_interval=0, max_interval=0)
+    seen = []
+    async for item in tape:
+        seen.append(item["id"])
+        if len(seen) == 3:
+            client.add(2)
+        if len(seen) == 5:
+            break
+    assert seen == [1, 2, 3, 4, 5]
+    with pytest.raises(TypeError):
+        iter(tape)
+
+
+def test_tape_against_mock_server():
+    with MockServer() as server:
+        book = server.exchange.books[1002]
+        for trade_id in range(1, 6):
+            book.trades.append({**trade(trade_id), "symbol": "ethperp"})
+        client = HundredXClient(**server.client_kwargs())
+        tape = client.create_trade_tape("ethperp", lookback=2, min_lookback=2, min_interval=0, max_interval=0)
+        assert ids(islice(tape, 2)) == [4, 5]
+        book.trades.append({**trade(6), "symbol": "ethperp"})
+        assert ids(islice(tape, 1)) == [6]
@@ -0,0 +1,166 @@
+"""
+Tests for the http transports.
+"""
+
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from hundred_x import transport as transport_module
+from hundred_x.client import HundredXClient
+from hundred_x.enums import Environment
+from hundred_x.transport import AsyncTransport, HttpxTransport, RequestsTransport, Transport
+from tests.test_data import DEFAULT_SYMBOL, TEST_ADDRESS, TEST_PRIVATE_KEY
+
+
+class FakeResponse:
+    """
+    Minimal response returned by the fake transport.
+    """
+
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return self.payload
+
+
+class FakeTransport(Transport):
+    """
+    Transport recording every request and answering from a table of canned responses.
+    """
+
+    def __init__(self, responses=None):
+        self.responses = responses or {}
+        self.requests = []
+        self.closed = False
+
+    def request(self, method, url, params=None, headers=None, json=None, timeout=None):
+        self.requests.append((method, url, params, headers, json))
+        path = url.split("/", 3)[-1]
+        return FakeResponse(self.responses.get(f"/{path}", {"value": "cookie"}))
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def transport():
+    return FakeTransport()
+
+
+@pytest.fixture
+def client(transport):
+    return HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=transport)
+
+
+def test_login_goes_through_transport(client, transport):
+    methods_and_paths = [(method, url.replace(client.rest_url, "")) for method, url, *_ in transport.requests]
+    assert methods_and_paths[:2] == [("POST", "/v1/session/login"), ("POST", "/v1/referral/add-referee")]
+    assert client.http_client is transport
+    assert client.session_cookie == "cookie"
+    assert transport.requests[0][4]["account"] == TEST_ADDRESS
+
+
+@pytest.mark.parametrize(
+    "call, method, path",
+    [
+        (lambda c: c.list_products(), "GET", "/v1/products"),
+        (lambda c: c.get_product(DEFAULT_SYMBOL), "GET", f"/v1/products/{DEFAULT_SYMBOL}"),
+        (lambda c: c.get_server_time(), "GET", "/v1/time"),
+        (lambda c: c.get_candlestick(DEFAULT_SYMBOL, interval="1m"), "GET", "/v1/uiKlines"),
+        (lambda c: c.get_orders(), "GET", "/v1/orders"),
+        (lambda c: c.get_session_status(), "GET", "/v1/session/status"),
+        (lambda c: c.logout(), "GET", "/v1/session/logout"),
+        (lambda c: c.get_approved_signers(), "GET", "/v1/approved-signers"),
+    ],
+)
+def test_endpoints_use_transport(client, transport, call, method, path):
+    transport.requests.clear()
+    call(client)
+    assert [(m, url) for m, url, *_ in transport.requests] == [(method, client.rest_url + path)]
+    assert transport.requests[0][3] == client.authenticated_headers
+
+
+def test_client_close(client, transport):
+    with client:
+        pass
+    assert transport.closed
+
+
+def test_transports_must_implement_request():
+    for interface in (Transport, AsyncTransport):
+        with pytest.raises(TypeError):
+            interface()
+
+    class Incomplete(Transport):
+        def close(self):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_requests_transport_pool():
+    transport = RequestsTransport(pool_connections=2, pool_maxsize=8, prewarm=20)
+    adapter = transport.session.get_adapter("https://api.100x.finance")
+    assert adapter._pool_maxsize == 8
+    assert transport.prewarm == 8
+    assert transport.session.headers["Accept"] == "application/json"
+
+
+@pytest.mark.asyncio
+async def test_http1_fallback_is_logged_once(monkeypatch, caplog):
+    monkeypatch.setattr(transport_module, "HTTP2_AVAILABLE", False)
+    monkeypatch.setattr(transport_module, "_http1_fallback_logged", False)
+    caplog.set_level(logging.DEBUG, logger="hundred_x.transport")
+    transports = [HttpxTransport(), HttpxTransport()]
+    assert not any(transport.http2 for transport in transports)
+    assert caplog.text.count("HTTP/1.1") == 1
+    for transport in transports:
+        await transport.aclose()
+
+
+def test_requests_transport_warm_up():
+    connections = set()
+    barrier = threading.Barrier(3, timeout=5)
+    warming = threading.Event()
+    warming.set()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):  # noqa: N802
+            connections.add(self.client_address)
+            if warming.is_set():
+                # hold the requests open so each one needs its own connection
+                barrier.wait()
+            body = b"{}"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        transport = RequestsTransport(prewarm=3)
+        url = f"http://127.0.0.1:{server.server_address[1]}/v1/time"
+        transport.warm_up(url)
+        assert len(connections) == 3
+        warming.clear()
+        transport.request("GET", url)
+        assert len(connections) == 3
+        transport.close()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,141 @@
+"""
+Tests for the local order checks made before signing.
+"""
+
+import pytest
+
+from hundred_x.client import HundredXClient
+from hundred_x.enums import Environment, OrderSide, Rounding
+from hundred_x.exceptions import (
+    ExpirationError,
+    FieldRangeError,
+    InvalidPriceError,
+    InvalidQuantityError,
+    MinNotionalError,
+    UserInputValidationError,
+)
+from hundred_x.fixed_point import WEI
+from hundred_x.products import Product
+from hundred_x.validation import EXPIRATION_SCALE, OrderValidator, check_widths, snap
+from tests.test_data import TEST_ORDER, TEST_PRIVATE_KEY
+from tests.test_transport import FakeTransport
+
+NOW = 1711722373000
+ETH = Product(1002, "ethperp", tick_size=WEI // 100, lot_size=WEI // 1000, min_quantity=WEI // 100)
+PRODUCTS = [{"id": 1002, "symbol": "ethperp", "increment": str(WEI // 100), "quantityIncrement": str(WEI // 1000)}]
+
+
+def order(price=3000 * WEI, quantity=WEI, is_buy=True, expiration=(NOW + 60_000) * EXPIRATION_SCALE):
+    return {
+        "subAccountId": 1,
+        "productId": 1002,
+        "isBuy": is_buy,
+        "orderType": 0,
+        "timeInForce": 0,
+        "expiration": expiration,
+        "price": price,
+        "quantity": quantity,
+        "nonce": NOW,
+    }
+
+
+@pytest.mark.parametrize(
+    "rounding, is_buy, expected",
+    [
+        (Rounding.REJECT, True, None),
+        (Rounding.DOWN, True, 100),
+        (Rounding.UP, True, 110),
+        (Rounding.NEAREST, True, 110),
+        (Rounding.PASSIVE, True, 100),
+        (Rounding.PASSIVE, False, 110),
+    ],
+)
+def test_snap(rounding, is_buy, expected):
+    assert snap(105, 10, rounding, is_buy) == expected
+    assert snap(100, 10, rounding, is_buy) == 100
+    assert snap(105, 0, rounding, is_buy) == 105
+
+
+def test_valid_order_is_unchanged():
+    params = order()
+    assert OrderValidator().validate(dict(params), ETH, now=NOW) == params
+
+
+def test_off_tick_price():
+    with pytest.raises(InvalidPriceError) as error:
+        OrderValidator().validate(order(price=3000 * WEI + WEI // 1000), ETH, now=NOW)
+    assert error.value.field == "price"
+    assert isinstance(error.value, UserInputValidationError)
+
+    validator = OrderValidator(price_rounding=Rounding.PASSIVE)
+    assert validator.validate(order(price=3000 * WEI + WEI // 1000), ETH)["price"] == 3000 * WEI
+    assert (
+        validator.validate(order(price=3000 * WEI + WEI // 1000, is_buy=False), ETH)["price"] == 3000 * WEI + WEI // 100
+    )
+
+
+def test_quantity_rules():
+    with pytest.raises(InvalidQuantityError, match="not a multiple"):
+        OrderValidator().validate(order(quantity=WEI + 1), ETH)
+    with pytest.raises(InvalidQuantityError, match="below the minimum"):
+        OrderValidator().validate(order(quantity=WEI // 1000), ETH)
+    with pytest.raises(InvalidQuantityError, match="above the maximum"):
+        OrderValidator().validate(order(), Product(1002, "ethperp", max_quantity=WEI // 2))
+    assert OrderValidator(quantity_rounding=Rounding.PASSIVE).validate(order(quantity=WEI + 1), ETH)["quantity"] == WEI
+    with pytest.raises(InvalidQuantityError, match="below the minimum"):
+        OrderValidator(quantity_rounding=Rounding.DOWN).validate(order(quantity=WEI // 2000), ETH)
+
+
+@pytest.mark.parametrize("rounding", [Rounding.UP, Rounding.NEAREST])
+def test_quantities_are_never_rounded_up(rounding):
+    with pytest.raises(UserInputValidationError, match="only rounded down"):
+        OrderValidator(quantity_rounding=rounding)
+
+
+def test_min_notional():
+    product = Product(1002, "ethperp", min_notional=10 * WEI)
+    OrderValidator().validate(order(price=10 * WEI, quantity=WEI), product)
+    with pytest.raises(MinNotionalError):
+        OrderValidator().validate(order(price=9 * WEI, quantity=WEI), product)
+
+
+def test_expiration_bounds():
+    with pytest.raises(ExpirationError, match="in the past"):
+        OrderValidator().validate(order(expiration=(NOW - 1) * EXPIRATION_SCALE), now=NOW)
+    with pytest.raises(ExpirationError, match="ahead"):
+        OrderValidator(max_expiry=1000).validate(order(), now=NOW)
+
+
+def test_field_widths():
+    with pytest.raises(FieldRangeError) as error:
+        check_widths(order(quantity=1 << 128))
+    assert error.value.field == "quantity"
+    assert isinstance(error.value, OverflowError)
+    with pytest.raises(FieldRangeError):
+        OrderValidator().validate({**order(), "subAccountId": 256})
+
+
+def test_client_rejects_before_signing():
+    transport = FakeTransport({"/v1/products": PRODUCTS})
+    client = HundredXClient(Environment.PROD, TEST_PRIVATE_KEY, transport=transport)
+    with pytest.raises(InvalidQuantityError):
+        client.create_order(**{**TEST_ORDER, "quantity": 0.0001})
+    with pytest.raises(InvalidPriceError):
+        client.sign_orders([TEST_ORDER, {**TEST_ORDER, "price": 3000.001}])
+    assert [url.rsplit("/v1", 1)[1] for _, url, *_ in transport.requests] == [
+        "/session/login",
+        "/referral/add-referee",
+        "/products",
+    ]
+
+
+def test_client_snaps_with_rounding():
+    transport = FakeTransport({"/v1/products": PRODUCTS})
+    client = HundredXClient(
+        Environment.PROD,
+        TEST_PRIVATE_KEY,
+        transport=transport,
+        validator=OrderValidator(price_rounding=Rounding.PASSIVE),
+    )
+    (payload,) = client.sign_orders([{**TEST_ORDER, "price": 3000.019, "side": OrderSide.SELL}])
+    assert payload["price"] == str(300002 * WEI // 100)